@@ -0,0 +1,225 @@
+"""Individual-based humans for SimpleEcosystem, as NumPy column arrays.
+
+    population = AgentPopulation.attach(ecosystem)
+
+An attached population gives every human an age, a sex, hunting and farming
+skills and health. Each attribute is one NumPy column (a structure of arrays,
+not an object per person), so a day is a handful of array operations however
+many people there are. The ecosystem's humans count still drives the model;
+the agents follow every change to it, and the cause decides who is affected:
+plague and hunger take the frailest, migrants are mostly healthy young adults,
+newborns start at age zero and people arriving from sister settlements are
+adults. In return, agents age and die of old age, which the count follows.
+
+The carrying_capacity parameter lifts the 100-human cap for large
+populations. Checkpoints and replay logs keep the humans count but not the
+agents; undo snapshots keep them.
+"""
+import copy
+
+import numpy as np
+
+COLUMNS = (
+    ('age', np.int32),         # Days
+    ('female', np.bool_),
+    ('hunting', np.float32),   # Skills, 0-1
+    ('farming', np.float32),
+    ('health', np.float32),    # 0-1
+)
+
+CHILD_YEARS = 5
+ADULT_YEARS = 15
+FERTILE_YEARS = (15, 45)
+MIGRANT_YEARS = (15, 35)
+
+# Chance of dying of old age within a year, by year of age: infant mortality,
+# then a risk that doubles about every eight years
+YEARLY_MORTALITY = np.minimum(1.0, 0.0005 * np.exp(0.085 * np.arange(121)))
+YEARLY_MORTALITY[0] = 0.05
+
+
+class AgentPopulation:
+    """The people of one ecosystem, one column per attribute
+
+    days_per_year: days in a year of the ecosystem's calendar, for ages in years
+    """
+    def __init__(self, count=0, days_per_year=120, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.days_per_year = days_per_year
+        self.size = 0
+        self.columns = {name: np.zeros(max(16, count), dtype=dtype) for name, dtype in COLUMNS}
+        # Chance of dying on one day, by day of age
+        daily = 1.0 - (1.0 - YEARLY_MORTALITY) ** (1.0 / days_per_year)
+        self.daily_mortality = np.repeat(daily, days_per_year)
+        self._mortality_bound = np.maximum.accumulate(self.daily_mortality)  # Highest risk up to each age
+        self.add_adults(count)
+
+    def __deepcopy__(self, memo):
+        """Copy the live rows of the columns only, sharing the mortality tables
+
+        Undo snapshots the ecosystem before every command, so this keeps a
+        snapshot of a large population free of the columns' spare capacity.
+        """
+        population = object.__new__(type(self))
+        memo[id(self)] = population
+        vars(population).update(vars(self))
+        population.rng = copy.deepcopy(self.rng, memo)
+        population.columns = {name: values[:self.size].copy() for name, values in self.columns.items()}
+        return population
+
+    @classmethod
+    def attach(cls, ecosystem, seed=None):
+        """Give the ecosystem's current humans individual attributes and keep them in step
+
+        seed defaults to one drawn from a stream spawned off the ecosystem's, so
+        seeded runs stay reproducible.
+        """
+        if seed is None:
+            seed = ecosystem.rng.spawn(1)[0].getrandbits(128)
+        population = cls(ecosystem.humans, 4 * ecosystem.days_in_season, seed)
+        ecosystem.population = population
+        return population
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        """The live values of a column"""
+        return self.columns[name][:self.size]
+
+    def years(self):
+        return self['age'] // self.days_per_year
+
+    # Adding and removing people
+
+    def _append(self, count):
+        """Make room for count more people; returns the slice they occupy"""
+        start = self.size
+        stop = start + count
+        capacity = len(self.columns['age'])
+        if stop > capacity:
+            capacity = max(stop, 2 * capacity)
+            for name, values in self.columns.items():
+                grown = np.zeros(capacity, dtype=values.dtype)
+                grown[:start] = values[:start]
+                self.columns[name] = grown
+        self.size = stop
+        return slice(start, stop)
+
+    def add_births(self, count):
+        rows = self._append(count)
+        columns = self.columns
+        columns['age'][rows] = 0
+        columns['female'][rows] = self.rng.random(count) < 0.5
+        columns['hunting'][rows] = 0.0
+        columns['farming'][rows] = 0.0
+        columns['health'][rows] = 1.0
+
+    def add_adults(self, count):
+        rows = self._append(count)
+        columns = self.columns
+        columns['age'][rows] = self.rng.integers(ADULT_YEARS * self.days_per_year,
+                                                 40 * self.days_per_year, count)
+        columns['female'][rows] = self.rng.random(count) < 0.5
+        columns['hunting'][rows] = self.rng.uniform(0.3, 0.7, count)
+        columns['farming'][rows] = self.rng.uniform(0.3, 0.7, count)
+        columns['health'][rows] = self.rng.uniform(0.7, 1.0, count)
+
+    def remove(self, indices):
+        """Remove the people at the given indices (which may repeat)
+
+        The last people move into the gaps, so only as many rows are copied as
+        are removed, and the order of the others changes.
+        """
+        if not len(indices):
+            return
+        removed = np.zeros(self.size, dtype=bool)
+        removed[indices] = True
+        remaining = self.size - int(np.count_nonzero(removed))
+        gaps = np.flatnonzero(removed[:remaining])
+        movers = remaining + np.flatnonzero(~removed[remaining:])
+        for values in self.columns.values():
+            values[gaps] = values[movers]
+        self.size = remaining
+
+    def _weights(self, removed):
+        if removed == 'frail':
+            years = self.years()
+            return (1.1 - self['health']) * (1.0 + (years < CHILD_YEARS) + years / 40.0)
+        if removed == 'migrants':
+            years = self.years()
+            young = (years >= MIGRANT_YEARS[0]) & (years < MIGRANT_YEARS[1])
+            return np.where(young, self['health'], 0.3)
+        return np.ones(self.size)
+
+    def choose(self, count, weights):
+        """Indices of count people drawn without replacement, with chances proportional to weights"""
+        if count >= self.size:
+            return np.arange(self.size)
+        # Efraimidis-Spirakis: the count largest of u ** (1 / w)
+        keys = np.log(self.rng.random(self.size)) / np.maximum(weights, 1e-9)
+        return np.argpartition(keys, self.size - count)[self.size - count:]
+
+    def sync(self, count, removed='anyone', added='adults'):
+        """Add or remove people so there are count of them
+
+        removed: who leaves or dies, 'frail', 'migrants' or 'anyone'
+        added: who arrives, 'births' or 'adults'
+        """
+        change = count - self.size
+        if change > 0:
+            if added == 'births':
+                self.add_births(change)
+            else:
+                self.add_adults(change)
+        elif change < 0:
+            self.remove(self.choose(-change, self._weights(removed)))
+
+    # Daily life
+
+    def fertile_women(self):
+        age = self['age']
+        fertile = (age >= FERTILE_YEARS[0] * self.days_per_year) & (age < FERTILE_YEARS[1] * self.days_per_year)
+        return int(np.count_nonzero(fertile & self['female']))
+
+    def day(self, food_satisfaction, knowledge, plague=False):
+        """Age everyone a day, update health and skills, and remove those who die of old age
+
+        Returns the number of people left.
+        """
+        if not self.size:
+            return 0
+        age = self['age']
+        age += 1
+
+        # Health drifts up when fed and down when hungry or sick
+        health = self['health']
+        health += np.float32(0.02 * (min(food_satisfaction, 1.0) - 0.5) - (0.03 if plague else 0.0))
+        np.clip(health, 0.0, 1.0, out=health)
+
+        # Skills approach mastery, faster with the settlement's knowledge
+        learning = 0.0002 * (1.0 + knowledge * 0.1)
+        for skill in ('hunting', 'farming'):
+            values = self[skill]
+            values *= np.float32(1.0 - learning)
+            values += np.float32(learning)
+
+        # Old age, by thinning: draw candidates at the highest daily risk of
+        # anyone's age, then keep each with their own risk relative to it. The
+        # cost follows the deaths rather than the population.
+        last = len(self.daily_mortality) - 1
+        bound = self._mortality_bound[min(int(age.max()), last)]
+        candidates = self.rng.integers(0, self.size, self.rng.binomial(self.size, bound))
+        risk = self.daily_mortality[np.minimum(age[candidates], last)]
+        self.remove(candidates[self.rng.random(len(candidates)) * bound < risk])
+        return self.size
+
+    def summary(self):
+        """One line describing the population, for status reports"""
+        if not self.size:
+            return "Individuals: none"
+        years = self.years()
+        return (f"Individuals: {self.size} ({int(self['female'].sum())} women, "
+                f"{self.fertile_women()} of childbearing age), median age {int(np.median(years))} years, "
+                f"health {self['health'].mean():.2f}, hunting {self['hunting'].mean():.2f}, "
+                f"farming {self['farming'].mean():.2f}")
@@ -0,0 +1,221 @@
+"""Compact archive encoding of a History, for storing many runs.
+
+Most daily series are small integers that change slowly, so each field is cut
+into chunks of CHUNK records and stored as its first value and the deltas, in
+the narrowest signed integer width that holds them, deflated. Float fields are
+delta encoded the same way through their IEEE bit patterns, which is lossless
+and gives small deltas for slowly changing values. A chunk where a field never
+changes is stored as its header alone.
+
+The chunk directory follows the file header and gives each chunk's first value,
+minimum, maximum, encoding and size, so a reader can decode only the chunks a
+range touches and skip chunks whose range rules them out:
+
+    data = archive.dumps(ecosystem.history)
+    history = archive.loads(data)
+    reader = archive.ArchiveReader(data)
+    reader.read('humans', 100000, 101000)
+    [chunk for chunk in reader.chunks('humans') if chunk.min <= 5]
+"""
+import operator
+import struct
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+from itertools import accumulate
+
+from history import FIELDS, FIELD_NAMES, History, pack_columns
+
+MAGIC = b'HGAR'
+FORMAT_VERSION = 1
+
+# Records per chunk
+CHUNK = 4096
+
+# Magic, version, every, ring (0 for none), records written, records stored, chunk size
+_HEADER = struct.Struct('<4sHqqqqI')
+# Per chunk and field: first value, min, max, encoding, payload size
+_INT_ENTRY = struct.Struct('<qqqBI')
+_FLOAT_ENTRY = struct.Struct('<dddBI')
+
+# Encodings. _DELTA + i stores the deltas as an array of typecode _DELTA_CODES[i];
+# _RAW stores doubles whose bit patterns are too far apart for 64-bit deltas.
+_CONSTANT = 0
+_DELTA = 1
+_DELTA_CODES = 'bhiq'
+_RAW = _DELTA + len(_DELTA_CODES)
+
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+ChunkInfo = namedtuple('ChunkInfo', 'start stop first min max')
+
+
+class ArchiveError(ValueError):
+    """The data is not an archive this version can read"""
+
+
+def _encode_deltas(values, level):
+    """Encoding and payload of integers as deltas, or None if the deltas overflow 64 bits"""
+    deltas = list(map(operator.sub, values[1:], values[:-1]))
+    low, high = min(deltas), max(deltas)
+    for index, code in enumerate(_DELTA_CODES):
+        limit = 1 << (8 * array(code).itemsize - 1)
+        if -limit <= low and high < limit:
+            packed = array(code, deltas)
+            if _BIG_ENDIAN:
+                packed.byteswap()
+            return _DELTA + index, zlib.compress(packed.tobytes(), level)
+    return None
+
+
+def _float_bits(values):
+    # Nearby doubles have nearby bit patterns, so their deltas are small integers
+    bits = array('q')
+    bits.frombytes(array('d', values).tobytes())
+    return bits.tolist()
+
+
+def _encode(code, values, level):
+    if code == 'd':
+        values = _float_bits(values)
+    if values.count(values[0]) == len(values):
+        return _CONSTANT, b''
+    encoded = _encode_deltas(values, level)
+    if encoded is None:
+        raw = array('d')
+        raw.frombytes(array('q', values).tobytes())
+        if _BIG_ENDIAN:
+            raw.byteswap()
+        return _RAW, zlib.compress(raw.tobytes(), level)
+    return encoded
+
+
+def _decode(code, encoding, first, count, payload):
+    if encoding == _CONSTANT:
+        return array(code, [first]) * count
+    data = zlib.decompress(payload)
+    if encoding == _RAW:
+        values = array('d')
+        values.frombytes(data)
+        if _BIG_ENDIAN:
+            values.byteswap()
+        return values
+    deltas = array(_DELTA_CODES[encoding - _DELTA])
+    deltas.frombytes(data)
+    if _BIG_ENDIAN:
+        deltas.byteswap()
+    if code != 'd':
+        return array(code, accumulate(deltas, initial=first))
+    values = array('d')
+    values.frombytes(array('q', accumulate(deltas, initial=_float_bits([first])[0])).tobytes())
+    return values
+
+
+def dumps(history, level=6):
+    """Encode a History (or MappedHistory) as an archive"""
+    columns = [history.column(name) for name in FIELD_NAMES]
+    count = len(columns[0])
+    entries = []
+    payloads = []
+    for start in range(0, count, CHUNK):
+        for (_, code), column in zip(FIELDS, columns):
+            values = column[start:start + CHUNK].tolist()
+            encoding, payload = _encode(code, values, level)
+            entry = _FLOAT_ENTRY if code == 'd' else _INT_ENTRY
+            entries.append(entry.pack(values[0], min(values), max(values), encoding, len(payload)))
+            payloads.append(payload)
+    ring = getattr(history, 'ring', None) or 0
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, history.every, ring, history.recorded, count, CHUNK)
+    return b''.join([header] + entries + payloads)
+
+
+def loads(data, capacity=1024):
+    """Decode an archive into a History"""
+    return ArchiveReader(data).to_history(capacity)
+
+
+def save(history, path, level=6):
+    with open(path, 'wb') as f:
+        f.write(dumps(history, level))
+
+
+def load(path, capacity=1024):
+    with open(path, 'rb') as f:
+        return loads(f.read(), capacity)
+
+
+class ArchiveReader:
+    """Random access to an archive, decoding only the chunks that are read
+
+    data: the archive as bytes or any buffer, such as an mmap
+    """
+    def __init__(self, data):
+        data = memoryview(data)
+        if len(data) < _HEADER.size:
+            raise ArchiveError("data is too short to be an archive")
+        magic, version, self.every, ring, self.recorded, self.count, self.chunk = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ArchiveError("not a history archive")
+        if version != FORMAT_VERSION:
+            raise ArchiveError(f"unsupported archive format version {version}")
+        self.ring = ring or None
+        self._data = data
+
+        # Directory entries are chunk by chunk; payloads follow in the same order
+        self._chunks = {name: [] for name in FIELD_NAMES}
+        offset = _HEADER.size
+        payload_offset = offset + sum((_FLOAT_ENTRY if code == 'd' else _INT_ENTRY).size
+                                      for _, code in FIELDS) * -(-self.count // self.chunk)
+        for start in range(0, self.count, self.chunk):
+            stop = min(start + self.chunk, self.count)
+            for name, code in FIELDS:
+                entry = _FLOAT_ENTRY if code == 'd' else _INT_ENTRY
+                first, low, high, encoding, size = entry.unpack_from(data, offset)
+                offset += entry.size
+                self._chunks[name].append((ChunkInfo(start, stop, first, low, high), encoding,
+                                           payload_offset, size))
+                payload_offset += size
+        if payload_offset > len(data):
+            raise ArchiveError("archive is truncated")
+        self._codes = dict(FIELDS)
+
+    def __len__(self):
+        """Number of records stored"""
+        return self.count
+
+    def chunks(self, field):
+        """ChunkInfo (record range, first value, min, max) of each chunk of a field"""
+        return [info for info, _, _, _ in self._chunks[field]]
+
+    def read_chunk(self, field, index):
+        """The values of one chunk of a field"""
+        info, encoding, offset, size = self._chunks[field][index]
+        return _decode(self._codes[field], encoding, info.first, info.stop - info.start,
+                       self._data[offset:offset + size])
+
+    def read(self, field, start=0, stop=None):
+        """Values of records [start, stop) of a field, as an array"""
+        stop = self.count if stop is None else min(stop, self.count)
+        values = array(self._codes[field])
+        if start >= stop:
+            return values
+        first = start // self.chunk
+        last = (stop - 1) // self.chunk
+        for index in range(first, last + 1):
+            values.extend(self.read_chunk(field, index))
+        offset = first * self.chunk
+        return values[start - offset:stop - offset]
+
+    def to_history(self, capacity=1024):
+        """Decode everything into a History"""
+        columns = [self.read(name) for name, _ in FIELDS]
+        if self.ring:
+            # Lay the records out in ring slots, mirrored, as History keeps them
+            slots = []
+            for (_, code), column in zip(FIELDS, columns):
+                shift = self.ring - self.recorded % self.ring if len(column) == self.ring else 0
+                column = column[shift:] + column[:shift] + array(code, [0]) * (self.ring - len(column))
+                slots.append(column + column)
+            columns = slots
+        return History.from_bytes(pack_columns(self.every, self.ring, self.recorded, columns), capacity)
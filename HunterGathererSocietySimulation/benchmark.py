@@ -0,0 +1,175 @@
+"""Throughput benchmarks for SimpleEcosystem.update().
+
+Runs fixed-seed scenarios and reports ecosystem-days per second and per-day
+latency percentiles. Results can be saved as JSON and compared against an
+earlier run to catch regressions:
+
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from collections import namedtuple
+
+from events import NullSink
+from huntergathersim import SimpleEcosystem
+
+DAYS_PER_YEAR = 360
+
+# before_day(ecosystem) runs outside the timed section before every update
+Scenario = namedtuple('Scenario', 'name description days seed before_day')
+
+
+def _calm(ecosystem):
+    pass
+
+
+def _near_capacity(ecosystem):
+    # Keep the settlement crowded and fed so migration and sister settlement paths fire every day
+    ecosystem.humans = max(ecosystem.humans, 95)
+    ecosystem.plants = max(ecosystem.plants, 400)
+    ecosystem.animals = max(ecosystem.animals, 150)
+
+
+def _rolling_events(ecosystem):
+    # A new disaster every 20 days, cycling through the god mode events
+    day = ecosystem.days
+    if day % 20 == 0:
+        phase = (day // 20) % 4
+        if phase == 0:
+            ecosystem.trigger_plague(4)
+        elif phase == 1:
+            ecosystem.trigger_drought(10)
+        elif phase == 2:
+            ecosystem.trigger_plant_blight(6)
+        else:
+            ecosystem.trigger_animal_disease(5)
+
+
+SCENARIOS = (
+    Scenario('calm', "Undisturbed 10-year run", 10 * DAYS_PER_YEAR, 1, _calm),
+    Scenario('near_capacity', "Population held near capacity for 10 years", 10 * DAYS_PER_YEAR, 2, _near_capacity),
+    Scenario('rolling_events', "Plague/drought/blight/disease every 20 days for 10 years",
+             10 * DAYS_PER_YEAR, 3, _rolling_events),
+    Scenario('long_run', "Undisturbed 1000-year run", 1000 * DAYS_PER_YEAR, 4, _calm),
+)
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def run_scenario(scenario, scale=1.0):
+    """Run one scenario and return its timings"""
+    days = max(1, int(scenario.days * scale))
+    ecosystem = SimpleEcosystem(sink=NullSink(), seed=scenario.seed)
+    before_day = scenario.before_day
+    update = ecosystem.update
+    clock = time.perf_counter_ns
+    latencies = [0] * days
+    for day in range(days):
+        before_day(ecosystem)
+        start = clock()
+        update()
+        latencies[day] = clock() - start
+        if ecosystem.humans == 0:
+            ecosystem.humans = 10  # Restart after an extinction so every scenario times the same days
+    return days, latencies, ecosystem
+
+
+def benchmark(scenarios=SCENARIOS, scale=1.0, repeat=3):
+    """Run the scenarios and return the results as a JSON-ready dict"""
+    results = {}
+    for scenario in scenarios:
+        best = None
+        for _ in range(repeat):
+            days, latencies, ecosystem = run_scenario(scenario, scale)
+            total = sum(latencies)
+            if best is None or total < best[1]:
+                best = (latencies, total)
+        latencies, total = best
+        ordered = sorted(latencies)
+        results[scenario.name] = {
+            'description': scenario.description,
+            'days': days,
+            'seconds': total / 1e9,
+            'days_per_second': days / (total / 1e9),
+            'latency_ns': {
+                'mean': total / days,
+                'p50': _percentile(ordered, 50),
+                'p90': _percentile(ordered, 90),
+                'p99': _percentile(ordered, 99),
+                'max': ordered[-1],
+            },
+            'final_humans': ecosystem.humans,
+            'sister_settlements': ecosystem.sister_settlements,
+        }
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scale': scale,
+        'repeat': repeat,
+        'scenarios': results,
+    }
+
+
+def print_results(results):
+    print(f"{'Scenario':<16}{'Days':>9}{'Days/s':>11}{'p50 us':>9}{'p90 us':>9}{'p99 us':>9}{'max us':>9}")
+    for name, result in results['scenarios'].items():
+        latency = result['latency_ns']
+        print(f"{name:<16}{result['days']:>9}{result['days_per_second']:>11.0f}"
+              f"{latency['p50'] / 1000:>9.1f}{latency['p90'] / 1000:>9.1f}"
+              f"{latency['p99'] / 1000:>9.1f}{latency['max'] / 1000:>9.1f}")
+
+
+def compare(results, baseline, threshold=0.1):
+    """Print throughput changes against a baseline; return the regressed scenarios"""
+    regressions = []
+    print(f"\n{'Scenario':<16}{'Before':>11}{'After':>11}{'Change':>9}")
+    for name, result in results['scenarios'].items():
+        if name not in baseline['scenarios']:
+            continue
+        before = baseline['scenarios'][name]['days_per_second']
+        after = result['days_per_second']
+        change = after / before - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<16}{before:>11.0f}{after:>11.0f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SimpleEcosystem.update() throughput")
+    parser.add_argument('--output', help="save results as JSON")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="slowdown fraction reported as a regression (default: 0.1)")
+    parser.add_argument('--scenario', action='append', choices=[s.name for s in SCENARIOS],
+                        help="run only this scenario (repeatable)")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply scenario lengths, e.g. 0.1 for a quick run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per scenario; the fastest is kept")
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    results = benchmark(scenarios, args.scale, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
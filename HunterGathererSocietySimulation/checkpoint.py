@@ -0,0 +1,222 @@
+"""Binary checkpoints of a SimpleEcosystem.
+
+A checkpoint holds everything needed to continue a run exactly where it
+stopped: the state scalars and rates, season modifier tables, active events,
+the random stream, the history and the running statistics. Restoring takes
+microseconds plus the time to copy the history, so a long burn-in can be
+simulated once and forked many times:
+
+    burn_in = checkpoint.dumps(ecosystem)
+    forks = [checkpoint.loads(burn_in) for _ in range(1000)]
+
+Layout (little-endian): magic and format version, then length-prefixed
+sections for the scalars, active events, random stream, history, season
+tables (from version 2), running statistics (from version 3), the event
+instances and scheduled starts (from version 4), the carrying capacity
+(from version 5) and the history's rollup index (from version 6: its season
+length, or 0 for none, as the index itself is rebuilt on loading). Individual
+agents (agents.py) are not included.
+"""
+import ast
+import struct
+
+from events import EVENT_TYPES, SEASON_NAMES
+from history import History
+from huntergathersim import SimpleEcosystem
+from rng import RandomStream
+from runningstats import RunningStats
+
+MAGIC = b'HGCK'
+FORMAT_VERSION = 6
+
+# Scalar state, in file order. Bump FORMAT_VERSION when this changes.
+SCALAR_FIELDS = (
+    'humans', 'plants', 'animals',
+    'plant_growth_rate', 'animal_reproduction_rate', 'human_reproduction_rate',
+    'human_plant_consumption', 'human_animal_consumption', 'animal_plant_consumption',
+    'food_storage', 'max_food_storage', 'farming_efficiency', 'farming_level', 'hunting_skill',
+    'animal_conservation_level', 'plant_conservation_level', 'conservation_active',
+    'current_season', 'days_in_season', 'current_day_in_season',
+    'rainfall', 'drought_threshold', 'flood_threshold', 'days',
+    'plant_reserves', 'animal_reserves',
+    'trading_available', 'trading_cooldown',
+    'survival_knowledge', 'tools_quality',
+    'total_migrations', 'sister_settlements',
+)
+
+# Scalars are stored as doubles with a type tag, since some of them (food
+# storage, knowledge) start as ints and become floats during a run
+_INT, _FLOAT, _BOOL = 0, 1, 2
+_TYPES = (int, float, bool)
+
+_PREFIX = struct.Struct('<4sH')
+_LENGTH = struct.Struct('<I')
+_SCALARS = struct.Struct(f'<{len(SCALAR_FIELDS)}B{len(SCALAR_FIELDS)}d')
+_EVENTS = struct.Struct(f'<{len(EVENT_TYPES)}i')
+_MT_STATE = struct.Struct('<I625I')  # Random state version, then the Mersenne Twister state
+_GAUSS = struct.Struct('<?d')
+_SCHEDULE_COUNTS = struct.Struct('<II')
+_INSTANCE = struct.Struct('<Bq')     # Event type index, end day
+_START = struct.Struct('<Bqqq')      # Event type index, start day, duration, every (0 for none)
+_CAPACITY = struct.Struct('<q')
+_ROLLUP = struct.Struct('<q')       # Season length of the history's rollup index, 0 for none
+
+SEASON_TABLES = ('season_plant_modifiers', 'season_animal_modifiers')
+_SEASON_TABLES = struct.Struct(f'<{len(SEASON_TABLES) * len(SEASON_NAMES)}d')
+
+
+class CheckpointError(ValueError):
+    """The data is not a checkpoint this version can read"""
+
+
+def _section(data):
+    return _LENGTH.pack(len(data)) + data
+
+
+def _type_tag(value):
+    if isinstance(value, bool):
+        return _BOOL
+    if isinstance(value, int):
+        return _INT
+    return _FLOAT
+
+
+def _pack_rng(rng):
+    (version, mt_state, gauss_next), entropy, spawn_key, spawned = rng.getstate()
+    seed = repr((entropy, spawn_key, spawned)).encode()
+    return b''.join((
+        _section(seed),
+        _MT_STATE.pack(version, *mt_state),
+        _GAUSS.pack(gauss_next is not None, gauss_next or 0.0),
+    ))
+
+
+def _unpack_rng(data):
+    (length,) = _LENGTH.unpack_from(data)
+    offset = _LENGTH.size
+    entropy, spawn_key, spawned = ast.literal_eval(bytes(data[offset:offset + length]).decode())
+    offset += length
+    version, *mt_state = _MT_STATE.unpack_from(data, offset)
+    has_gauss, gauss_next = _GAUSS.unpack_from(data, offset + _MT_STATE.size)
+
+    # Skip seeding: the state is overwritten straight away
+    rng = RandomStream.__new__(RandomStream)
+    rng.setstate(((version, tuple(mt_state), gauss_next if has_gauss else None),
+                  entropy, spawn_key, spawned))
+    return rng
+
+
+def _pack_schedule(scheduler):
+    instances = scheduler.instances()
+    scheduled = scheduler.scheduled()
+    parts = [_SCHEDULE_COUNTS.pack(len(instances), len(scheduled))]
+    parts.extend(_INSTANCE.pack(EVENT_TYPES.index(event), end) for event, end in instances)
+    parts.extend(_START.pack(EVENT_TYPES.index(event), day, duration, every or 0)
+                 for day, event, duration, every in scheduled)
+    return b''.join(parts)
+
+
+def _unpack_schedule(data, ecosystem):
+    instances, scheduled = _SCHEDULE_COUNTS.unpack_from(data)
+    offset = _SCHEDULE_COUNTS.size
+    for _ in range(instances):
+        event, end = _INSTANCE.unpack_from(data, offset)
+        ecosystem.events.start(EVENT_TYPES[event], end - ecosystem.days, ecosystem.days)
+        offset += _INSTANCE.size
+    for _ in range(scheduled):
+        event, day, duration, every = _START.unpack_from(data, offset)
+        ecosystem.events.schedule(EVENT_TYPES[event], day, duration, every or None)
+        offset += _START.size
+
+
+def dumps(ecosystem, history=True):
+    """Serialize an ecosystem's state to bytes
+
+    With history=False an empty history is stored instead, which keeps
+    checkpoints of long runs small when only the current state matters.
+    """
+    values = [getattr(ecosystem, name) for name in SCALAR_FIELDS]
+    scalars = _SCALARS.pack(*[_type_tag(value) for value in values], *values)
+    events = _EVENTS.pack(*[ecosystem.active_events[event] for event in EVENT_TYPES])
+    tables = _SEASON_TABLES.pack(*[getattr(ecosystem, table)[season]
+                                   for table in SEASON_TABLES for season in SEASON_NAMES])
+    rollup = ecosystem.history.rollup
+    return b''.join((
+        _PREFIX.pack(MAGIC, FORMAT_VERSION),
+        _section(scalars),
+        _section(events),
+        _section(_pack_rng(ecosystem.rng)),
+        _section((ecosystem.history if history else History()).to_bytes()),
+        _section(tables),
+        _section(ecosystem.stats.to_bytes()),
+        _section(_pack_schedule(ecosystem.events)),
+        _section(_CAPACITY.pack(ecosystem.carrying_capacity)),
+        _section(_ROLLUP.pack(0 if rollup is None else rollup.days_in_season)),
+    ))
+
+
+def loads(data, sink=None):
+    """Rebuild an ecosystem from dumps() output
+
+    The sink is not part of the checkpoint; pass the one the restored
+    ecosystem should emit to (the console by default).
+    """
+    data = memoryview(data)
+    try:
+        magic, version = _PREFIX.unpack_from(data)
+    except struct.error:
+        raise CheckpointError("data is too short to be a checkpoint") from None
+    if magic != MAGIC:
+        raise CheckpointError("not a hunter-gatherer simulation checkpoint")
+    if not 1 <= version <= FORMAT_VERSION:
+        raise CheckpointError(f"unsupported checkpoint version {version} (expected {FORMAT_VERSION})")
+
+    sections = []
+    offset = _PREFIX.size
+    while offset < len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        sections.append(data[offset:offset + length])
+        offset += length
+    # Version 1 checkpoints predate the season tables, which were always the
+    # defaults then, versions before 3 predate the running statistics and
+    # versions before 4 held one duration per event type; versions before 5
+    # predate the carrying capacity, which was always 100, and versions before
+    # 6 kept no rollup index
+    if len(sections) != version + 3:
+        raise CheckpointError("checkpoint is truncated or corrupt")
+    scalars, events, rng, history = sections[:4]
+    (days_in_season,) = _ROLLUP.unpack(sections[8]) if version > 5 else (0,)
+
+    history = History.from_bytes(history, rollup=days_in_season > 0, days_in_season=days_in_season or 30)
+    ecosystem = SimpleEcosystem(sink=sink, seed=_unpack_rng(rng), history=history)
+    unpacked = _SCALARS.unpack(scalars)
+    tags, values = unpacked[:len(SCALAR_FIELDS)], unpacked[len(SCALAR_FIELDS):]
+    for name, tag, value in zip(SCALAR_FIELDS, tags, values):
+        setattr(ecosystem, name, _TYPES[tag](value))
+    if version > 3:
+        _unpack_schedule(sections[6], ecosystem)
+    else:
+        for event, remaining in zip(EVENT_TYPES, _EVENTS.unpack(events)):
+            ecosystem.events.start(event, remaining, ecosystem.days)
+    if version > 1:
+        values = iter(_SEASON_TABLES.unpack(sections[4]))
+        for table in SEASON_TABLES:
+            setattr(ecosystem, table, {season: next(values) for season in SEASON_NAMES})
+    if version > 2:
+        ecosystem.stats = RunningStats.from_bytes(sections[5])
+    if version > 4:
+        (ecosystem.carrying_capacity,) = _CAPACITY.unpack(sections[7])
+    return ecosystem
+
+
+def save(ecosystem, path):
+    """Write a checkpoint file"""
+    with open(path, 'wb') as f:
+        f.write(dumps(ecosystem))
+
+
+def load(path, sink=None):
+    """Read a checkpoint file"""
+    with open(path, 'rb') as f:
+        return loads(f.read(), sink)
@@ -0,0 +1,662 @@
+"""Vectorized ensemble engine for SimpleEcosystem.
+
+Keeps the state of many independent ecosystems as NumPy arrays and advances
+all of them one day per step() call. Every rule from SimpleEcosystem.update()
+is applied with masks/np.where in the same order as the scalar engine, so the
+ensemble reproduces its outcome distributions (not its exact random draws).
+Messages are not produced; members whose humans have died out are frozen,
+just like the interactive loop stops when the population is extinct.
+
+God mode events stack as in the scalar engine: every instance started with
+trigger_event() keeps its own days remaining (one column per instance in
+event_instances), plague and animal disease strike once per instance, and
+active_events holds the days left of the longest instance.
+"""
+import numpy as np
+
+from events import EVENT_TYPES
+from huntergathersim import SEASON_RAINFALL_BASE, SimpleEcosystem
+from rng import RandomStream
+
+SPRING, SUMMER, FALL, WINTER = 0, 1, 2, 3
+
+# Cumulative weights of the sister settlement interaction types
+INTERACTION_WEIGHTS = np.cumsum([0.4, 0.3, 0.15, 0.1])
+
+# Integer state arrays (the rest are float64)
+INT_FIELDS = (
+    'humans', 'plants', 'animals', 'rainfall', 'max_food_storage', 'farming_level',
+    'animal_conservation_level', 'plant_conservation_level', 'current_season',
+    'current_day_in_season', 'plant_reserves', 'animal_reserves', 'trading_cooldown',
+    'days', 'total_migrations', 'sister_settlements'
+)
+FLOAT_FIELDS = ('food_storage', 'farming_efficiency', 'survival_knowledge', 'tools_quality')
+
+
+def _trunc(values):
+    # int() semantics: float -> int casts truncate toward zero
+    return np.asarray(values).astype(np.int64)
+
+
+def _remaining(ecosystem, event):
+    """Days remaining of each active instance of event in a SimpleEcosystem"""
+    return [end - ecosystem.days for kind, end in ecosystem.events.instances() if kind == event]
+
+
+def _instance_table(rows):
+    """Array of days remaining with one row per list of them, padded with idle (zero) slots"""
+    table = np.zeros((len(rows), max(map(len, rows), default=0)), dtype=np.int64)
+    for values, row in zip(table, rows):
+        values[:len(row)] = row
+    return table
+
+
+def _widen(table, width):
+    """table with idle slots added to make it width columns"""
+    return np.pad(table, ((0, 0), (0, width - table.shape[1])))
+
+
+def rainfall_modifier(rainfall, drought_threshold=30, flood_threshold=80):
+    """Array version of the rainfall part of get_plant_growth_modifier()"""
+    rainfall = np.asarray(rainfall, dtype=np.float64)
+    drought_mod = 0.3 + (rainfall / drought_threshold * 0.5)
+    flood_mod = 1.3 - ((rainfall - flood_threshold) / (100 - flood_threshold) * 0.8)
+    ideal_mod = 1.2 - (np.abs(rainfall - 60) / 30 * 0.5)
+    return np.where(rainfall < drought_threshold, drought_mod,
+                    np.where(rainfall > flood_threshold, flood_mod, ideal_mod))
+
+
+class EcosystemEnsemble:
+    def __init__(self, size, seed=None, template=None):
+        """Create `size` copies of `template` (a fresh SimpleEcosystem by default)
+
+        `seed` is anything np.random.default_rng accepts, or a RandomStream
+        (e.g. one of several spawned for independent ensembles).
+        """
+        if template is None:
+            template = SimpleEcosystem()
+        self.size = size
+        if isinstance(seed, RandomStream):
+            seed = seed.getrandbits(128)
+        self.rng = np.random.default_rng(seed)
+
+        # Constants are shared by all members
+        self.plant_growth_rate = template.plant_growth_rate
+        self.animal_reproduction_rate = template.animal_reproduction_rate
+        self.human_reproduction_rate = template.human_reproduction_rate
+        self.human_plant_consumption = template.human_plant_consumption
+        self.human_animal_consumption = template.human_animal_consumption
+        self.animal_plant_consumption = template.animal_plant_consumption
+        self.days_in_season = template.days_in_season
+        self.drought_threshold = template.drought_threshold
+        self.flood_threshold = template.flood_threshold
+        self.trading_available = template.trading_available
+        self.carrying_capacity = template.carrying_capacity
+        self.crowded = template.carrying_capacity * 85 // 100  # Where migration begins, as in trigger_migration
+        self.season_plant_modifiers = np.array(
+            [template.season_plant_modifiers[name] for name in template.seasons])
+        self.season_animal_modifiers = np.array(
+            [template.season_animal_modifiers[name] for name in template.seasons])
+        self.season_rainfall_base = np.array([SEASON_RAINFALL_BASE[name] for name in template.seasons])
+        self.season_farming_modifiers = np.array([1.2, 1.2, 1.0, 1.0])
+        self.season_hunt_modifiers = np.array([1.0, 1.0, 1.3, 0.6])
+        self.season_storage_need = np.array([0.3, 0.3, 0.3, 0.7])
+        self.season_stores_food = np.array([False, True, True, False])
+        self.season_is_winter = np.array([False, False, False, True])
+        self.season_contact_modifiers = np.array([1.5, 1.5, 1.0, 0.3])
+        self.rainfall_modifiers = rainfall_modifier(np.arange(101), self.drought_threshold,
+                                                    self.flood_threshold)
+
+        # Per-member state
+        for field in INT_FIELDS:
+            setattr(self, field, np.full(size, getattr(template, field), dtype=np.int64))
+        for field in FLOAT_FIELDS:
+            setattr(self, field, np.full(size, getattr(template, field), dtype=np.float64))
+        self.conservation_active = np.full(size, template.conservation_active, dtype=bool)
+        self.active_events = {
+            event: np.full(size, template.active_events[event], dtype=np.int64)
+            for event in EVENT_TYPES
+        }
+        self.event_instances = {
+            event: np.tile(np.array(_remaining(template, event), dtype=np.int64), (size, 1))
+            for event in EVENT_TYPES
+        }
+
+    @classmethod
+    def from_ecosystems(cls, ecosystems, seed=None):
+        """Build an ensemble whose members start from existing SimpleEcosystem states"""
+        ensemble = cls(len(ecosystems), seed=seed, template=ecosystems[0])
+        for field in INT_FIELDS + FLOAT_FIELDS:
+            getattr(ensemble, field)[:] = [getattr(eco, field) for eco in ecosystems]
+        ensemble.conservation_active[:] = [eco.conservation_active for eco in ecosystems]
+        for event in EVENT_TYPES:
+            ensemble.active_events[event][:] = [eco.active_events[event] for eco in ecosystems]
+            ensemble.event_instances[event] = _instance_table([_remaining(eco, event) for eco in ecosystems])
+        return ensemble
+
+    def extend(self, other, members=None):
+        """Append the members of another ensemble (or those at the given indices) to this one"""
+        select = slice(None) if members is None else members
+        for field in INT_FIELDS + FLOAT_FIELDS + ('conservation_active',):
+            setattr(self, field, np.concatenate([getattr(self, field), getattr(other, field)[select]]))
+        for event in EVENT_TYPES:
+            self.active_events[event] = np.concatenate([self.active_events[event],
+                                                        other.active_events[event][select]])
+            ours, theirs = self.event_instances[event], other.event_instances[event][select]
+            width = max(ours.shape[1], theirs.shape[1])
+            self.event_instances[event] = np.concatenate([_widen(ours, width), _widen(theirs, width)])
+        self.size = len(self.humans)
+
+    @property
+    def alive(self):
+        return self.humans > 0
+
+    def _uniform(self, low=0.0, high=1.0, size=None):
+        return self.rng.uniform(low, high, self.size if size is None else size)
+
+    def _randint(self, low, high, size=None):
+        # Inclusive bounds like random.randint(); `high` may be an array
+        draws = self.rng.random(self.size if size is None else size)
+        return low + _trunc(draws * (np.asarray(high) - low + 1))
+
+    def _stack_depth(self, event):
+        # Active instances of event per member
+        return np.count_nonzero(self.event_instances[event] > 0, axis=1)
+
+    def process_active_events(self):
+        # Once per stacked instance
+        plague = self._stack_depth('plague')
+        for depth in range(plague.max(initial=0)):
+            idx = np.flatnonzero(plague > depth)
+            deaths = np.maximum(1, _trunc(self.humans[idx] * self._uniform(0.02, 0.08, idx.size)))
+            self.humans[idx] = np.maximum(0, self.humans[idx] - deaths)
+
+        disease = self._stack_depth('animal_disease')
+        for depth in range(disease.max(initial=0)):
+            idx = np.flatnonzero(disease > depth)
+            lost_animals = np.maximum(1, _trunc(self.animals[idx] * self._uniform(0.05, 0.12, idx.size)))
+            self.animals[idx] = np.maximum(0, self.animals[idx] - lost_animals)
+
+        for event, instances in self.event_instances.items():
+            if instances.any():
+                instances -= instances > 0
+                np.max(instances, axis=1, out=self.active_events[event])
+
+    def update_season(self):
+        self.current_day_in_season += 1
+        changed = self.current_day_in_season >= self.days_in_season
+        if not changed.any():
+            return
+        idx = np.flatnonzero(changed)
+        n = idx.size
+        self.current_season[idx] = (self.current_season[idx] + 1) % 4
+        self.current_day_in_season[idx] = 0
+        days = self.days[idx]
+
+        # Seed dispersal during season change
+        plants = self.plants[idx]
+        self.plants[idx] = np.where(plants < 30, plants + self._randint(5, 15, n), plants)
+
+        # Major migration at season changes
+        animals = self.animals[idx]
+        migrated = np.clip(animals + self._randint(-10, 20, n), 10, 200)
+        self.animals[idx] = np.where(self._uniform(size=n) < 0.3, migrated, animals)
+
+        # Winter preparation
+        food = self.food_storage[idx]
+        prepared = np.minimum(food + self._randint(5, 10, n), self.max_food_storage[idx])
+        mask = (self.current_season[idx] == FALL) & (self.humans[idx] >= 5) & (self._uniform(size=n) < 0.8)
+        self.food_storage[idx] = np.where(mask, prepared, food)
+
+        # Farming knowledge
+        mask = (days > 60) & (self._uniform(size=n) < 0.2)
+        level = self.farming_level[idx] + mask
+        self.farming_level[idx] = level
+        self.farming_efficiency[idx] = np.where(mask, 1.0 + (level * 0.15), self.farming_efficiency[idx])
+
+        # Tool improvement
+        mask = (days > 30) & (self._uniform(size=n) < 0.15)
+        self.tools_quality[idx] += np.where(mask, 0.1, 0.0)
+
+        self.survival_knowledge[idx] += 0.05
+
+        # Conservation knowledge
+        mask = (days > 45) & (self._uniform(size=n) < 0.25)
+        animal_side = self._uniform(size=n) < 0.5
+        self.animal_conservation_level[idx] += mask & animal_side
+        self.plant_conservation_level[idx] += mask & ~animal_side
+
+        # Storage capacity
+        mask = (days > 120) & (self._uniform(size=n) < 0.3)
+        self.max_food_storage[idx] += np.where(mask, self._randint(5, 10, n), 0)
+
+    def _season_key(self):
+        # Members normally share the calendar, so season tables collapse to scalars
+        season = self.current_season
+        first = season[0]
+        return season if (season != first).any() else first
+
+    def update_rainfall(self, key):
+        drought = self.active_events['drought'] > 0
+        rainfall = self.rainfall
+
+        # One draw covers randint(0, 15) and randint(-25, 25): 16 * 51 equally likely pairs
+        pair = _trunc(self.rng.random(self.size) * 816)
+        step = pair % 16
+        moved = np.where(rainfall < self.season_rainfall_base[key], rainfall + step, rainfall - step)
+        moved = np.clip(moved + (pair // 16 - 25), 0, 100)
+        if drought.any():
+            # Divine drought overrides natural weather
+            dried = np.maximum(0, rainfall - self._randint(3, 8))
+            moved = np.where(drought, dried, moved)
+
+        # Extreme events - only if no god-triggered events are active
+        draw = self.rng.random(self.size)
+        calm = draw < 0.08
+        for event in EVENT_TYPES:
+            durations = self.active_events[event]
+            if durations.any():
+                calm &= durations == 0
+        idx = np.flatnonzero(calm)
+        if idx.size:
+            # The same draw, rescaled, picks drought/flood/ideal uniformly
+            kind = _trunc(draw[idx] / 0.08 * 3)
+            rain = moved[idx]
+            moved[idx] = np.where(kind == 0, np.maximum(0, rain - 40),
+                                  np.where(kind == 1, np.minimum(100, rain + 40), 60))
+        self.rainfall = moved
+
+    def get_plant_growth_modifier(self, key=None):
+        if key is None:
+            key = self._season_key()
+        # Rainfall is an integer 0-100, so its modifier is a table lookup
+        modifier = self.season_plant_modifiers[key] * self.rainfall_modifiers[self.rainfall]
+        blessed = self.active_events['blessing'] > 0
+        blighted = self.active_events['plant_blight'] > 0
+        if blessed.any() or blighted.any():
+            modifier = np.where(blessed, modifier * 1.5, np.where(blighted, modifier * 0.4, modifier))
+        return modifier
+
+    def conserve(self):
+        conservation_active = np.zeros(self.size, dtype=bool)
+
+        # Animal conservation
+        idx = np.flatnonzero((self.animals < 20) & (self.humans >= 3))
+        if idx.size:
+            humans = self.humans[idx]
+            level = self.animal_conservation_level[idx]
+            season = self.current_season[idx]
+            power = 1.0 + (level * 0.2) + ((self.tools_quality[idx] - 1.0) * 0.3)
+            power = np.where((season == SPRING) | (season == SUMMER), power * 1.3, power)
+            committed = np.minimum(_trunc(humans * 0.3), np.maximum(2, humans // 5))
+            success = self._uniform(size=idx.size) < 0.3 + (level * 0.1)
+            idx = idx[success]
+            self.animals[idx] += np.maximum(1, _trunc(committed * power)[success])
+            self.animal_reserves[idx] = np.minimum(
+                15, np.maximum(self.animal_reserves[idx], _trunc(3 + level[success])))
+            conservation_active[idx] = True
+
+        # Plant conservation
+        idx = np.flatnonzero((self.plants < 40) & (self.humans >= 2))
+        if idx.size:
+            humans = self.humans[idx]
+            level = self.plant_conservation_level[idx]
+            season = self.current_season[idx]
+            power = (1.0 + (level * 0.25) + (self.farming_level[idx] * 0.15)
+                     + ((self.tools_quality[idx] - 1.0) * 0.2))
+            power = np.where((season == SPRING) | (season == FALL), power * 1.4, power)
+            committed = np.minimum(_trunc(humans * 0.25), np.maximum(1, humans // 6))
+            success = self._uniform(size=idx.size) < 0.4 + (level * 0.1)
+            idx = idx[success]
+            self.plants[idx] += np.maximum(3, _trunc(committed * power * 2)[success])
+            self.plant_reserves[idx] = np.maximum(self.plant_reserves[idx],
+                                                  _trunc(20 + level[success] * 2))
+            conservation_active[idx] = True
+
+        self.conservation_active = conservation_active
+        return conservation_active
+
+    def attempt_trading(self, wants_trade):
+        traded_food = np.zeros(self.size)
+        idx = np.flatnonzero(wants_trade)
+        if not idx.size:
+            return traded_food
+
+        # Same cooldown semantics as the scalar engine: it only ticks on days trading is attempted
+        cooldown = self.trading_cooldown[idx]
+        cooling = cooldown > 0
+        self.trading_cooldown[idx] = cooldown - cooling
+        if not self.trading_available:
+            return traded_food
+
+        knowledge = self.survival_knowledge[idx]
+        chance = 0.4 + (knowledge * 0.1)
+        chance = np.where(self.current_season[idx] == WINTER, chance * 0.7, chance)
+        trades = ~cooling & (self.humans[idx] >= 3) & (self._uniform(size=idx.size) < chance)
+        idx = idx[trades]
+        received = self._randint(5, 10 + _trunc(knowledge[trades] * 5), idx.size)
+        self.food_storage[idx] = np.minimum(self.food_storage[idx] + received, self.max_food_storage[idx])
+        self.trading_cooldown[idx] = self._randint(5, 15, idx.size)
+        traded_food[idx] = received
+        return traded_food
+
+    def trigger_migration(self):
+        migrants = np.zeros(self.size, dtype=np.int64)
+        crowded = self.crowded
+        idx = np.flatnonzero(self.humans > crowded)
+        if not idx.size:
+            return migrants
+
+        humans = self.humans[idx]
+        migration_chance = 0.5 + ((humans - crowded) / (self.carrying_capacity - crowded) * 0.5)
+        migrating = self._uniform(size=idx.size) < migration_chance
+        idx = idx[migrating]
+        humans = humans[migrating]
+        leaving = np.maximum(1, _trunc(humans * 0.03) + _trunc((humans - crowded) * 0.15))
+        leaving = np.minimum(leaving, humans - crowded)
+        self.humans[idx] = humans - leaving
+        self.total_migrations[idx] += leaving
+        self.sister_settlements[idx] += leaving >= 5
+        migrants[idx] = leaving
+
+        # Chance for knowledge sharing between settlements
+        exchange = (self._uniform(size=idx.size) < 0.3) & (self.days[idx] > 60)
+        idx = idx[exchange]
+        self.survival_knowledge[idx] += self._uniform(0.05, 0.2, idx.size)
+        return migrants
+
+    def sister_settlement_interaction(self, key):
+        settlements = self.sister_settlements
+        idx = np.flatnonzero(settlements > 0)
+        if not idx.size:
+            return
+        modifiers = self.season_contact_modifiers[key]
+        if np.ndim(modifiers):
+            modifiers = modifiers[idx]
+        chance = np.minimum(0.15, 0.02 * settlements[idx]) * modifiers
+        idx = idx[self._uniform(size=idx.size) < chance]
+        if not idx.size:
+            return
+        # trade, knowledge, population_return, food_gift, hunting_party
+        kind = np.searchsorted(INTERACTION_WEIGHTS, self._uniform(size=idx.size), side='right')
+
+        # Trade
+        members = idx[kind == 0]
+        self.food_storage[members] = np.minimum(
+            self.max_food_storage[members], self.food_storage[members] + self._randint(2, 6, members.size))
+
+        # Knowledge exchange
+        members = idx[kind == 1]
+        self.survival_knowledge[members] += self._uniform(0.1, 0.3, members.size)
+        members = members[self._uniform(size=members.size) < 0.4]
+        farming = self._uniform(size=members.size) < 0.5
+        farmers = members[farming]
+        self.farming_level[farmers] += 1
+        self.farming_efficiency[farmers] = 1.0 + (self.farming_level[farmers] * 0.15)
+        self.tools_quality[members[~farming]] += 0.1
+
+        # Population return
+        members = idx[kind == 2]
+        returnees = np.minimum(self._randint(1, 3, members.size), self.carrying_capacity - self.humans[members])
+        self.humans[members] += np.maximum(0, returnees)
+
+        # Emergency food aid
+        members = idx[kind == 3]
+        members = members[(self.food_storage[members] < 10)
+                          & ((self.plants[members] < 50) | (self.animals[members] < 20))]
+        self.food_storage[members] = np.minimum(
+            self.max_food_storage[members], self.food_storage[members] + self._randint(5, 12, members.size))
+
+        # Joint hunting party
+        members = idx[kind == 4]
+        members = members[self.animals[members] > 30]
+        self.food_storage[members] = np.minimum(
+            self.max_food_storage[members], self.food_storage[members] + self._randint(2, 5, members.size))
+
+    def _state_arrays(self):
+        # The calendar keeps running for extinct members so seasons stay in lockstep
+        arrays = [getattr(self, field) for field in INT_FIELDS + FLOAT_FIELDS
+                  if field not in ('current_season', 'current_day_in_season')]
+        arrays.append(self.conservation_active)
+        arrays.extend(self.active_events.values())
+        arrays.extend(self.event_instances.values())
+        return arrays
+
+    def step(self):
+        """Advance every living member by one day"""
+        extinct = np.flatnonzero(self.humans <= 0)
+        if extinct.size == self.size:
+            return
+        # Rules run unmasked over the whole ensemble; extinct members are put back afterwards
+        frozen = [values[extinct] for values in self._state_arrays()] if extinct.size else None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._advance()
+        if frozen is not None:
+            for values, saved in zip(self._state_arrays(), frozen):
+                values[extinct] = saved
+
+    def _advance(self):
+        self.process_active_events()
+        self.update_season()
+        key = self._season_key()
+        self.update_rainfall(key)
+
+        winter = self.season_is_winter[key]
+        plant_growth_modifier = self.get_plant_growth_modifier(key)
+        animal_modifier = self.season_animal_modifiers[key]
+
+        conservation_active = self.conserve()
+
+        # Plants grow based on season and rainfall
+        effective_growth_rate = self.plant_growth_rate * plant_growth_modifier
+        available_plants = np.maximum(0, self.plants - self.plant_reserves)
+        new_plants = _trunc(self.plants * effective_growth_rate)
+
+        # Animals consume plants and reproduce
+        available_animals = np.maximum(0, self.animals - self.animal_reserves)
+        animal_need = self.animals * self.animal_plant_consumption
+        plants_consumed_by_animals = np.minimum(_trunc(animal_need), available_plants)
+        idx = np.flatnonzero(available_plants < animal_need)
+        if idx.size:
+            # Animals eat less when plants are scarce, and some migrate away
+            conservation_factor = available_plants[idx] / animal_need[idx]
+            consumed = _trunc(plants_consumed_by_animals[idx] * (0.7 + 0.3 * conservation_factor))
+            plants_consumed_by_animals[idx] = consumed
+            idx = idx[(consumed > 0) & (self.animals[idx] > 10)]
+            self.animals[idx] -= self._randint(1, np.maximum(1, _trunc(self.animals[idx] * 0.1)), idx.size)
+
+        self.plants = self.plants - plants_consumed_by_animals + new_plants
+
+        # Farming with tools and knowledge (only after the first 60 days)
+        farming_boost = (self.farming_efficiency * (1.0 + (self.survival_knowledge * 0.1))
+                         * self.tools_quality * self.season_farming_modifiers[key])
+        if np.any(winter):
+            farming_boost = np.where(winter & (self.farming_level >= 2),
+                                     np.maximum(0.5, farming_boost * 0.4), farming_boost)
+        early = self.days <= 60
+        if early.any():
+            farming_boost = np.where(early, 1.0, farming_boost)
+
+        # Humans adapt to scarcity
+        human_plant_consumption = np.where(available_plants < 30, self.human_plant_consumption * 0.7,
+                                           self.human_plant_consumption)
+
+        food_ratio_for_animals = np.minimum(
+            1.0, plants_consumed_by_animals
+            / np.maximum(1, _trunc(self.animals * self.animal_plant_consumption)))
+        effective_reproduction_rate = self.animal_reproduction_rate * animal_modifier
+        assisted = (self.animals < 30) & (self.animal_conservation_level > 0)
+        if assisted.any():
+            # Humans help feed breeding stock
+            effective_reproduction_rate = np.where(
+                assisted, effective_reproduction_rate * (1.0 + (self.animal_conservation_level * 0.15)),
+                effective_reproduction_rate)
+            food_ratio_for_animals = np.where(assisted, np.maximum(food_ratio_for_animals, 0.5),
+                                              food_ratio_for_animals)
+        disease = self.active_events['animal_disease']
+        if disease.any():
+            effective_reproduction_rate = np.where(disease > 0, effective_reproduction_rate * 0.3,
+                                                   effective_reproduction_rate)
+        new_animals = _trunc(self.animals * effective_reproduction_rate * food_ratio_for_animals)
+
+        # Humans hunt animals and gather plants
+        humans = self.humans
+        plant_need = humans * human_plant_consumption
+        plants_gathered = np.minimum(_trunc(plant_need * farming_boost), available_plants)
+        hunt_efficiency = (np.minimum(1.0, self.animals / 30.0) * self.tools_quality
+                           * (1.0 + (self.survival_knowledge * 0.1)) * self.season_hunt_modifiers[key])
+        limited = (self.animals < 25) & (self.animal_conservation_level > 0)
+        if limited.any():
+            hunt_efficiency = np.where(
+                limited, hunt_efficiency * np.maximum(0.1, 0.5 - (self.animal_conservation_level * 0.08)),
+                hunt_efficiency)
+        animals_hunted = np.minimum(_trunc(humans * self.human_animal_consumption * hunt_efficiency),
+                                    available_animals)
+
+        self.plants = self.plants - plants_gathered
+        self.animals = self.animals - animals_hunted + new_animals
+
+        # Reserves shrink with the population
+        shrink = (self.animals < self.animal_reserves) & (self.animal_reserves > 0)
+        if shrink.any():
+            self.animal_reserves = np.where(shrink, self.animals, self.animal_reserves)
+
+        # Dormant seeds and plant reserves
+        idx = np.flatnonzero(self.plants < 20)
+        if idx.size:
+            idx = idx[self._uniform(size=idx.size) < 0.3]
+            self.plants[idx] += self._randint(3, 10, idx.size)
+        self.plants = np.maximum(self.plants, self.plant_reserves)
+
+        # Food storage in seasons of plenty
+        stores = self.season_stores_food[key]
+        if np.any(stores):
+            storage_efficiency = 1.0 + (self.survival_knowledge * 0.2)
+            surplus = plants_gathered - plant_need * 0.6
+            storage_amount = _trunc(surplus * 0.6 * storage_efficiency)
+            stores = stores & (surplus > 0) & (storage_amount > 0)
+            self.food_storage = np.where(
+                stores, np.minimum(self.max_food_storage, self.food_storage + storage_amount),
+                self.food_storage)
+
+        self.survival_knowledge = self.survival_knowledge + 0.002
+
+        # Use stored food when needed, more in winter
+        needed_food = np.maximum(0, plant_need * self.season_storage_need[key] - plants_gathered)
+        food_from_storage = np.minimum(needed_food, self.food_storage)
+        self.food_storage = self.food_storage - food_from_storage
+
+        # Emergency trading when food is scarce
+        wants_trade = (plants_gathered + food_from_storage) < plant_need * 0.5
+        traded_food = self.attempt_trading(wants_trade)
+
+        # Human population changes based on available food
+        total_plant_food = plants_gathered + food_from_storage + traded_food
+        food_satisfaction = (total_plant_food / plant_need * 0.6
+                             + animals_hunted / np.maximum(1, humans * self.human_animal_consumption) * 0.4)
+        if conservation_active.any():
+            food_satisfaction = np.where(conservation_active, food_satisfaction * 0.95, food_satisfaction)
+
+        if np.any(winter):
+            # Knowledge and tools help with winter survival
+            winter_adaptation = 0.1 + (self.survival_knowledge * 0.05) + ((self.tools_quality - 1.0) * 0.1)
+            winter_penalty = np.minimum(0.9, 0.7 + winter_adaptation)
+            food_satisfaction = np.where(winter, food_satisfaction * winter_penalty, food_satisfaction)
+
+        idx = np.flatnonzero((food_satisfaction < 0.3) & (humans > 5))
+        if idx.size:
+            # Desperate measures - hunting or gathering surge
+            idx = idx[self._uniform(size=idx.size) < 0.4]
+            food_satisfaction[idx] += self._randint(1, 5, idx.size) / plant_need[idx] * 0.2
+
+        plague = self.active_events['plague'] > 0
+        if plague.any():
+            food_satisfaction = np.where(plague, food_satisfaction * 0.7, food_satisfaction)
+        blessing = self.active_events['blessing'] > 0
+        if blessing.any():
+            food_satisfaction = np.where(blessing, food_satisfaction * 1.3, food_satisfaction)
+
+        # Growth, with newborns leaving once the settlement is full
+        grows = (food_satisfaction >= 0.65) & ~plague
+        growth = np.maximum(1, _trunc(humans * self.human_reproduction_rate * 1.5))
+        remaining_capacity = self.carrying_capacity - humans
+        overflow = grows & (remaining_capacity < growth) & (remaining_capacity > 0)
+        leaving = np.where(overflow, growth - remaining_capacity, 0)
+        self.humans = humans + np.where(grows, growth - leaving, 0)
+        self.total_migrations += leaving
+        self.sister_settlements += leaving >= 5
+
+        # Decline when hungry, softened by knowledge
+        declines = ~grows & (food_satisfaction < 0.25)
+        idx = np.flatnonzero(declines)
+        if idx.size:
+            decline = np.maximum(1, _trunc(humans[idx] * 0.08))
+            decline = np.maximum(1, _trunc(decline * (1.0 - self.survival_knowledge[idx] * 0.2)))
+            self.humans[idx] = np.maximum(0, self.humans[idx] - decline)
+
+        self.trigger_migration()
+        self.sister_settlement_interaction(key)
+
+        # Natural constraints - carrying capacity
+        self.plants = np.minimum(500, np.maximum(self.plant_reserves, self.plants))
+        self.animals = np.clip(self.animals, 0, 200)
+        self.humans = np.clip(self.humans, 0, self.carrying_capacity)
+
+        self.days += 1
+
+    def run(self, days, record=('humans',)):
+        """Step `days` times; returns {field: (days, size) array} for the recorded fields"""
+        history = {field: np.empty((days, self.size), dtype=getattr(self, field).dtype)
+                   for field in record}
+        for day in range(days):
+            self.step()
+            for field in record:
+                history[field][day] = getattr(self, field)
+        return history
+
+    # GOD MODE METHODS (members=None applies to the whole ensemble)
+
+    def _members(self, members):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[slice(None) if members is None else members] = True
+        return mask
+
+    def trigger_event(self, event, duration, members=None):
+        """Start a divine event with the same immediate effects as the scalar god-mode methods
+
+        The new instance stacks on any running ones; a duration below 1 has
+        only the immediate effects, as in the scalar engine.
+        """
+        mask = self._members(members)
+        if duration > 0:
+            instances = self.event_instances[event]
+            free = instances <= 0
+            if (mask & ~free.any(axis=1)).any():
+                # Every slot of some member is taken: add one
+                instances = _widen(instances, instances.shape[1] + 1)
+                self.event_instances[event] = instances
+                free = instances <= 0
+            rows = np.flatnonzero(mask)
+            instances[rows, np.argmax(free[rows], axis=1)] = duration
+            np.max(instances, axis=1, out=self.active_events[event])
+
+        if event == 'drought':
+            reduced = np.maximum(5, self.rainfall - self._randint(20, 40))
+            self.rainfall = np.where(mask, reduced, self.rainfall)
+        elif event == 'blessing':
+            rain = np.minimum(70, self.rainfall + self._randint(10, 20))
+            self.rainfall = np.where(mask, rain, self.rainfall)
+            food = np.minimum(self.max_food_storage, self.food_storage + self._randint(5, 15))
+            self.food_storage = np.where(mask, food, self.food_storage)
+        elif event == 'plant_blight':
+            loss_percentage = self._uniform(0.3, 0.5)
+            plant_loss = np.minimum(_trunc(self.plants * loss_percentage),
+                                    self.plants - self.plant_reserves)
+            blighted = mask & (plant_loss > 0)
+            self.plants = np.where(blighted, self.plants - plant_loss, self.plants)
+            mutation = blighted & (self.farming_level > 0) & (self._uniform() < 0.7)
+            reduced = np.maximum(0.5, self.farming_efficiency * (1 - self._uniform(0.2, 0.4)))
+            self.farming_efficiency = np.where(mutation, reduced, self.farming_efficiency)
+            sickness = np.minimum(_trunc(self.animals * 0.15), self.animals - 10)
+            sick = mask & (self._uniform() < 0.4) & (self.animals > 20) & (sickness > 0)
+            self.animals = np.where(sick, self.animals - sickness, self.animals)
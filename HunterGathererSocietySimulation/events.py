@@ -0,0 +1,146 @@
+"""Structured events emitted by SimpleEcosystem.
+
+Instead of printing, the simulation emits (kind, day, payload) events where the
+payload is a tuple of numbers. A sink decides what happens to them:
+ConsoleSink renders the classic messages, NullSink drops them and CountingSink
+tallies them. Messages are only formatted when a sink actually renders one.
+"""
+from collections import Counter, namedtuple
+
+Event = namedtuple('Event', 'kind day payload')
+
+SEASON_NAMES = ("Spring", "Summer", "Fall", "Winter")
+EVENT_TYPES = ('plague', 'drought', 'blessing', 'animal_disease', 'plant_blight')
+EVENT_NAMES = ('plague', 'drought', 'divine blessing', 'animal disease', 'plant blight')
+
+
+def _migration_message(migrants):
+    # Different messages based on migration size
+    if migrants == 1:
+        return "MIGRATION: 1 human has left to establish a new settlement elsewhere."
+    if migrants <= 3:
+        return f"MIGRATION: A small family of {migrants} humans has departed to find new territory."
+    if migrants <= 8:
+        return f"MIGRATION: A group of {migrants} humans has migrated to establish a new settlement."
+    return f"MAJOR MIGRATION: A large band of {migrants} humans has departed to establish a new colony!"
+
+
+# Message templates by event kind: str.format() templates over the payload,
+# or callables for the few messages that need more than formatting
+MESSAGES = {
+    # Seasons and weather
+    'season_changed': lambda season: f"\n=== SEASON CHANGED TO {SEASON_NAMES[season].upper()} ===",
+    'seeds_sprouted': "NATURE EVENT: {0} new plants sprouted from dormant seeds!",
+    'animal_migration': "MIGRATION EVENT: Animal population changed from {0} to {1}",
+    'extreme_drought': "EXTREME EVENT: A severe drought has struck the region!",
+    'extreme_flood': "EXTREME EVENT: Heavy rains have flooded the region!",
+    'ideal_weather': "WEATHER EVENT: Perfect growing conditions have emerged!",
+
+    # Human advancement
+    'winter_preparation': "PREPARATION: Humans gathered an extra {0} food for winter storage!",
+    'farming_improved': "ADVANCEMENT: Humans improved their farming methods! (Level {0}, Efficiency {1:.1f}x)",
+    'tools_improved': "TECHNOLOGY: Humans improved their tools! (Quality: {0:.1f}x)",
+    'animal_conservation_improved': "CONSERVATION: Humans improved their animal husbandry skills! (Level {0})",
+    'plant_conservation_improved': "CONSERVATION: Humans improved their plant cultivation skills! (Level {0})",
+    'storage_expanded': "ADVANCEMENT: Humans increased food storage capacity from {0} to {1}!",
+
+    # Daily life
+    'trade': "TRADING: Humans traded with neighboring groups for {0} units of food!",
+    'animals_conserved': "CONSERVATION: Humans successfully protected and raised {0} animals!",
+    'plants_conserved': "CONSERVATION: Humans successfully planted and protected {0} plants!",
+    'animals_left': "ADAPTATION: {0} animals migrated away due to food scarcity",
+    'plant_rationing': "ADAPTATION: Humans are conserving plant resources",
+    'breeding_assisted': "CONSERVATION: Humans are assisting animal breeding (Boost: {0:.1f}x)",
+    'hunting_limited': "CONSERVATION: Humans are limiting hunting to protect endangered animals",
+    'reserves_reduced': "CONSERVATION: Animal reserves reduced to {0} due to population decline",
+    'seeds_emerged': "RESILIENCE: {0} new plants emerged from dormant seeds!",
+    'plant_reserves_used': "RESILIENCE: Plant reserves are ensuring survival of the species",
+    'food_stored': "ADAPTATION: Humans stored {0} units of food! (Storage: {1}/{2})",
+    'stored_food_used': "ADAPTATION: Humans used {0} units of stored food! (Remaining: {1})",
+    'winter_survival': "ADAPTATION: Winter survival efficiency is {0:.2f} due to knowledge and tools",
+    'emergency_food': "EMERGENCY: Humans found {0} extra units of emergency food!",
+    'human_growth': "HUMAN GROWTH: {0} new humans born due to abundant food!",
+    'newborns_migrated': "IMMEDIATE MIGRATION: {0} young adults left to establish new settlements elsewhere.",
+    'human_decline': "HUMAN DECLINE: {0} humans died due to food shortage!",
+
+    # Divine events in progress
+    'plague_deaths': "DIVINE PLAGUE: {0} humans died from the plague!",
+    'animal_disease_losses': "DIVINE ANIMAL DISEASE: {0} animals perished!",
+    'event_ended': lambda event: f"DIVINE EVENT ENDED: The {EVENT_NAMES[event]} has subsided.",
+
+    # Migration and sister settlements
+    'migration': _migration_message,
+    'cultural_exchange': "CULTURAL EXCHANGE: The new settlement maintains contact, increasing knowledge by {0:.2f}!",
+    'crowding': "CROWDING: The settlement is reaching its sustainable capacity - migration may occur soon.",
+    'settlement_trade': "SETTLEMENT NETWORK: A trading party from a sister settlement brought {0} units of food!",
+    'shared_farming': "CULTURAL EXCHANGE: Visitors from sister settlement shared advanced farming techniques! (Level {0})",
+    'shared_tools': "CULTURAL EXCHANGE: Visitors from sister settlement shared improved tool-making methods! (Quality: {0:.1f}x)",
+    'settlement_knowledge': "CULTURAL EXCHANGE: Contact with sister settlements increased knowledge by {0:.2f}!",
+    'population_return': "POPULATION FLOW: {0} humans have returned from sister settlements!",
+    'food_aid': "COMMUNITY SUPPORT: Sister settlements sent {0} units of emergency food aid!",
+    'hunting_party': "JOINT VENTURE: A combined hunting party with sister settlement hunters brought in {0} extra food!",
+
+    # God mode
+    'plague_triggered': "DIVINE INTERVENTION: You have triggered a plague for {0} days!",
+    'drought_triggered': "DIVINE INTERVENTION: You have triggered a severe drought for {0} days!",
+    'animal_disease_triggered': "DIVINE INTERVENTION: You have triggered an animal disease for {0} days!",
+    'blight_triggered': "DIVINE INTERVENTION: You have triggered a plant blight for {0} days!",
+    'catastrophic_blight': (
+        "CATASTROPHIC BLIGHT: A devastating fungal disease has swept through the region!\n"
+        "DIVINE WRATH: {0} plants withered and blackened before your eyes!\n"
+        "The few remaining plants show signs of infection, and the disease will continue for {1} days."),
+    'blight': (
+        "DIVINE INTERVENTION: A virulent plant blight has struck the ecosystem!\n"
+        "DESTRUCTION: {0} plants have been destroyed, their leaves curling and falling away!\n"
+        "The blight will continue to spread for {1} more days."),
+    'blight_mutation': (
+        "MUTATION: The blight has damaged farming knowledge! Efficiency temporarily reduced from {0:.1f}x to {1:.1f}x\n"
+        "Farming efficiency will recover when the blight ends."),
+    'blight_sickness': "ECOSYSTEM IMPACT: {0} animals sickened after consuming blighted plants!",
+    'blessing_granted': "DIVINE INTERVENTION: You have granted a blessing for {0} days! Rainfall improved and {1} units of food appeared.",
+    'humans_set': "DIVINE INTERVENTION: Human population changed from {0} to {1}",
+    'animals_set': "DIVINE INTERVENTION: Animal population changed from {0} to {1}",
+    'plants_set': "DIVINE INTERVENTION: Plant population changed from {0} to {1}",
+    'rainfall_set': "DIVINE INTERVENTION: Rainfall changed from {0} to {1}",
+    'knowledge_boosted': "DIVINE INTERVENTION: Human knowledge increased from {0:.2f} to {1:.2f}",
+    'farming_boosted': "DIVINE INTERVENTION: Farming level increased from {0} to {1} (Efficiency: {2:.1f}x)",
+    'flood_triggered': "DIVINE INTERVENTION: You have triggered a flood! Rainfall spiked from {0} to {1}.",
+    'food_added': "DIVINE INTERVENTION: {0} units of food added to storage (Total: {1}/{2})",
+    'events_canceled': "DIVINE INTERVENTION: All {0} active events have been canceled.",
+    'no_events_to_cancel': "No active events to cancel.",
+    'event_scheduled': lambda event, day, duration, every: (
+        f"DIVINE INTERVENTION: A {EVENT_NAMES[event]} will begin on day {day} for {duration} days"
+        + (f", returning every {every} days." if every else "!")),
+}
+
+
+def render(kind, payload):
+    """Format the message for one event"""
+    message = MESSAGES[kind]
+    if callable(message):
+        return message(*payload)
+    return message.format(*payload)
+
+
+class NullSink:
+    """Drops every event"""
+    def emit(self, kind, day, payload):
+        pass
+
+
+class ConsoleSink:
+    """Prints events as the classic simulation messages"""
+    def emit(self, kind, day, payload):
+        print(render(kind, payload))
+
+
+class CountingSink:
+    """Counts events by kind without formatting them"""
+    def __init__(self):
+        self.counts = Counter()
+
+    def emit(self, kind, day, payload):
+        self.counts[kind] += 1
+
+    def reset(self):
+        self.counts.clear()
@@ -0,0 +1,196 @@
+"""Columnar history of a SimpleEcosystem run.
+
+Each field is stored in a typed array.array buffer instead of a list of Python
+objects, so a day costs 46 bytes no matter how long the run gets. Buffers are
+preallocated and doubled when full. The history can record every day, every
+k-th day, or only the last N records in a ring buffer.
+
+Columns are returned as memoryviews over the buffers, so reading them never
+copies; np.asarray(history['humans']) gives a NumPy array over the same memory.
+A growing history can also keep a rollup index (see rollup.py) for range
+queries that do not scan the columns.
+"""
+import struct
+import sys
+from array import array
+
+from events import EVENT_TYPES
+from rollup import RollupIndex
+
+# Recorded fields and their array typecodes
+FIELDS = (
+    ('day', 'q'),                 # Day index of the update that produced the record
+    ('humans', 'i'),
+    ('animals', 'i'),
+    ('plants', 'i'),
+    ('rainfall', 'i'),
+    ('food_storage', 'd'),
+    ('survival_knowledge', 'd'),
+    ('farming_level', 'i'),
+    ('active_events', 'B'),       # Bit i is set while EVENT_TYPES[i] is active
+    ('season', 'B'),
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+
+# Serialized header: every, ring (0 for none), records written, slots stored
+_HEADER = struct.Struct('<qqqq')
+
+
+def event_mask(active_events):
+    """Pack the active god mode events into a bitmask"""
+    mask = 0
+    for bit, event in enumerate(EVENT_TYPES):
+        if active_events[event] > 0:
+            mask |= 1 << bit
+    return mask
+
+
+def pack_columns(every, ring, recorded, columns):
+    """Serialize history columns (arrays in FIELDS order) for History.from_bytes()"""
+    parts = [_HEADER.pack(every, ring or 0, recorded, len(columns[0]))]
+    for column in columns:
+        if sys.byteorder == 'big':
+            column = array(column.typecode, column)
+            column.byteswap()
+        parts.append(column.tobytes())
+    return b''.join(parts)
+
+
+class History:
+    """Typed, preallocated history buffers
+
+    every: record one day in every `every` (1 records every day)
+    ring: keep only the last `ring` records instead of growing without bound
+    capacity: initial number of records to allocate for a growing history
+    rollup: keep a RollupIndex of the records in self.rollup
+    """
+    def __init__(self, every=1, ring=None, capacity=1024, rollup=False):
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        if ring is not None and ring < 1:
+            raise ValueError("ring must be at least 1")
+        self.every = every
+        self.ring = ring
+        self.recorded = 0  # Records written since the start, including ones a ring has dropped
+
+        # A ring writes every record twice, N slots apart, so the last N
+        # records are always one contiguous slice of a 2N buffer
+        size = 2 * ring if ring else max(1, capacity)
+        self._columns = [array(code, [0]) * size for _, code in FIELDS]
+        self._index = dict(zip(FIELD_NAMES, range(len(FIELDS))))
+        self.rollup = RollupIndex(self) if rollup else None
+
+    def record(self, ecosystem):
+        """Append the ecosystem's current state, if this day is recorded"""
+        day = ecosystem.days
+        if day % self.every:
+            return
+        values = (day, ecosystem.humans, ecosystem.animals, ecosystem.plants, ecosystem.rainfall,
+                  ecosystem.food_storage, ecosystem.survival_knowledge, ecosystem.farming_level,
+                  event_mask(ecosystem.active_events), ecosystem.current_season)
+        if self.ring:
+            position = self.recorded % self.ring
+            mirror = position + self.ring
+            for column, value in zip(self._columns, values):
+                column[position] = value
+                column[mirror] = value
+        else:
+            position = self.recorded
+            if position == len(self._columns[0]):
+                self._grow()
+            for column, value in zip(self._columns, values):
+                column[position] = value
+        self.recorded += 1
+        if self.rollup is not None:
+            self.rollup.append(position, day)
+
+    def truncate(self, recorded):
+        """Forget every record after the first `recorded`, e.g. to rewind a run
+
+        A growing history only ever appends, so the records kept are exactly
+        as they were. A ring that has wrapped has overwritten some of them.
+        """
+        if not 0 <= recorded <= self.recorded:
+            raise ValueError(f"cannot truncate {self.recorded} records to {recorded}")
+        if self.ring and self.ring < self.recorded != recorded:
+            raise ValueError("a ring history that has wrapped cannot be truncated")
+        self.recorded = recorded
+        if self.rollup is not None:
+            self.rollup = RollupIndex(self, self.rollup.days_in_season)
+            self.rollup.rebuild()
+
+    def _grow(self):
+        # New buffers rather than resizing in place, so views handed out
+        # earlier stay valid (they keep the old buffers alive)
+        self._columns = [column + array(column.typecode, [0]) * len(column)
+                         for column in self._columns]
+
+    def _window(self):
+        if self.ring and self.recorded > self.ring:
+            start = self.recorded % self.ring
+            return start, start + self.ring
+        return 0, self.recorded
+
+    def __len__(self):
+        """Number of records currently held"""
+        start, stop = self._window()
+        return stop - start
+
+    def __getitem__(self, field):
+        return self.column(field)
+
+    def __contains__(self, field):
+        return field in self._index
+
+    def column(self, field):
+        """Read-only view of one field, oldest record first"""
+        start, stop = self._window()
+        return memoryview(self._columns[self._index[field]])[start:stop].toreadonly()
+
+    def columns(self):
+        """Views of all fields, by name"""
+        return {name: self.column(name) for name in FIELD_NAMES}
+
+    def latest(self, field):
+        """Most recent recorded value of a field"""
+        start, stop = self._window()
+        if stop == start:
+            raise IndexError("history is empty")
+        return self._columns[self._index[field]][stop - 1]
+
+    @property
+    def nbytes(self):
+        """Memory held by the buffers"""
+        return sum(column.itemsize * len(column) for column in self._columns)
+
+    def to_bytes(self):
+        """Serialize the recorded data (little-endian, only the slots in use)"""
+        slots = 2 * self.ring if self.ring else self.recorded
+        return pack_columns(self.every, self.ring, self.recorded, [column[:slots] for column in self._columns])
+
+    @classmethod
+    def from_bytes(cls, data, capacity=1024, rollup=False, days_in_season=30):
+        """Rebuild a history serialized by to_bytes(), with a rebuilt rollup index if asked
+
+        days_in_season: season length for the rollup index
+        """
+        every, ring, recorded, slots = _HEADER.unpack_from(data)
+        history = cls(every=every, ring=ring or None, capacity=1)
+        history.recorded = recorded
+        offset = _HEADER.size
+        columns = []
+        for _, code in FIELDS:
+            column = array(code)
+            size = slots * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            if not ring and slots < capacity:
+                column.extend(array(code, [0]) * (capacity - slots))
+            columns.append(column)
+            offset += size
+        history._columns = columns
+        if rollup:
+            history.rollup = RollupIndex(history, days_in_season)
+            history.rollup.rebuild()
+        return history
@@ -0,0 +1,181 @@
+"""Memory-mapped on-disk history for very long runs.
+
+MappedHistory is a drop-in replacement for History that writes each record
+straight into memory-mapped files, one raw column file per field plus a small
+header, so resident memory stays flat however long the run gets:
+
+    ecosystem = SimpleEcosystem(history=MappedHistory('run1'))
+
+The header holds the record count and is updated after each record, so
+HistoryFile('run1') can open and slice the columns while the simulation is
+still writing. Columns are memoryviews over the mapped files (np.asarray()
+wraps them without copying). Column files use the machine's byte order,
+which is recorded in the header.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from history import FIELDS, FIELD_NAMES, event_mask, pack_columns
+
+MAGIC = b'HGHF'
+FORMAT_VERSION = 1
+HEADER_NAME = 'header.bin'
+
+# magic, format version, little-endian flag, every, records written
+_HEADER = struct.Struct('<4sH?xqq')
+_COUNT = struct.Struct('<q')
+_COUNT_OFFSET = _HEADER.size - _COUNT.size
+
+
+def _column_path(path, field):
+    return os.path.join(path, field + '.bin')
+
+
+class HistoryFileError(ValueError):
+    """The directory does not hold a history this version can read"""
+
+
+class _MappedColumns:
+    """Column access shared by the writer and readers"""
+    def __len__(self):
+        return self._count()
+
+    def __getitem__(self, field):
+        return self.column(field)
+
+    def __contains__(self, field):
+        return field in self._index
+
+    def column(self, field):
+        """Read-only view of one field, oldest record first"""
+        count = self._count()
+        self._ensure_mapped(count)
+        return self._views[self._index[field]][:count].toreadonly()
+
+    def columns(self):
+        """Views of all fields, by name"""
+        return {name: self.column(name) for name in FIELD_NAMES}
+
+    def latest(self, field):
+        """Most recent recorded value of a field"""
+        count = self._count()
+        if count == 0:
+            raise IndexError("history is empty")
+        self._ensure_mapped(count)
+        return self._views[self._index[field]][count - 1]
+
+    def _map_columns(self, access):
+        # Old maps are not closed: views handed out earlier keep them alive
+        maps = []
+        for field, code in FIELDS:
+            with open(_column_path(self.path, field), 'r+b' if access == mmap.ACCESS_WRITE else 'rb') as f:
+                maps.append(mmap.mmap(f.fileno(), 0, access=access))
+        self._views = [memoryview(mapped).cast(code) for mapped, (_, code) in zip(maps, FIELDS)]
+        self.capacity = len(self._views[0])
+
+
+class MappedHistory(_MappedColumns):
+    """History that streams records into memory-mapped column files
+
+    path: directory for the files (created if needed, existing files replaced)
+    every: record one day in every `every`
+    capacity: initial number of records to allocate; files double when full
+    """
+    rollup = None  # No rollup index (see rollup.py) over mapped columns
+
+    def __init__(self, path, every=1, capacity=65536):
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.path = path
+        self.every = every
+        self.recorded = 0
+        self._index = dict(zip(FIELD_NAMES, range(len(FIELDS))))
+
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, HEADER_NAME), 'w+b') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == 'little', every, 0))
+            f.flush()
+            self._header = mmap.mmap(f.fileno(), 0)
+        self._resize(max(1, capacity))
+
+    def _resize(self, capacity):
+        for field, code in FIELDS:
+            with open(_column_path(self.path, field), 'a+b') as f:
+                f.truncate(capacity * array(code).itemsize)
+        self._map_columns(mmap.ACCESS_WRITE)
+
+    def _count(self):
+        return self.recorded
+
+    def _ensure_mapped(self, count):
+        pass
+
+    def record(self, ecosystem):
+        """Write the ecosystem's current state, if this day is recorded"""
+        day = ecosystem.days
+        if day % self.every:
+            return
+        position = self.recorded
+        if position == self.capacity:
+            self._resize(2 * self.capacity)
+        values = (day, ecosystem.humans, ecosystem.animals, ecosystem.plants, ecosystem.rainfall,
+                  ecosystem.food_storage, ecosystem.survival_knowledge, ecosystem.farming_level,
+                  event_mask(ecosystem.active_events), ecosystem.current_season)
+        for column, value in zip(self._views, values):
+            column[position] = value
+        self.recorded += 1
+        # Publish the record only once it is complete
+        _COUNT.pack_into(self._header, _COUNT_OFFSET, self.recorded)
+
+    def truncate(self, recorded):
+        """Forget every record after the first `recorded`, e.g. to rewind a run"""
+        if not 0 <= recorded <= self.recorded:
+            raise ValueError(f"cannot truncate {self.recorded} records to {recorded}")
+        self.recorded = recorded
+        _COUNT.pack_into(self._header, _COUNT_OFFSET, self.recorded)
+
+    def flush(self):
+        """Write dirty pages to disk"""
+        for view in self._views:
+            view.obj.flush()
+        self._header.flush()
+
+    def to_bytes(self):
+        """Serialize the recorded data in History.to_bytes() format, for checkpoints"""
+        columns = []
+        for view, (_, code) in zip(self._views, FIELDS):
+            column = array(code)
+            column.frombytes(view[:self.recorded].cast('B'))
+            columns.append(column)
+        return pack_columns(self.every, None, self.recorded, columns)
+
+
+class HistoryFile(_MappedColumns):
+    """Read-only view of a MappedHistory directory, live while it is being written"""
+    def __init__(self, path):
+        self.path = path
+        self._index = dict(zip(FIELD_NAMES, range(len(FIELDS))))
+        with open(os.path.join(path, HEADER_NAME), 'rb') as f:
+            self._header = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, little_endian, self.every, _ = _HEADER.unpack_from(self._header)
+        except struct.error:
+            raise HistoryFileError("history header is truncated") from None
+        if magic != MAGIC:
+            raise HistoryFileError("not a hunter-gatherer simulation history")
+        if version != FORMAT_VERSION:
+            raise HistoryFileError(f"unsupported history version {version} (expected {FORMAT_VERSION})")
+        if little_endian != (sys.byteorder == 'little'):
+            raise HistoryFileError("history was written on a machine with a different byte order")
+        self._map_columns(mmap.ACCESS_READ)
+
+    def _count(self):
+        return _COUNT.unpack_from(self._header, _COUNT_OFFSET)[0]
+
+    def _ensure_mapped(self, count):
+        # The writer has grown the files since we mapped them
+        if count > self.capacity:
+            self._map_columns(mmap.ACCESS_READ)
@@ -1,9 +1,66 @@
-import random
+import time
+from collections import namedtuple
+
+from events import ConsoleSink, EVENT_TYPES, NullSink
+from history import FIELD_NAMES, History, event_mask
+from profiling import PhaseProfiler
+from rng import RandomStream
+from runningstats import RunningStats
+from scheduler import EventScheduler
+from snapshots import SnapshotRing
+
+# Bump whenever a change alters simulation results; cached runs are keyed on it
+MODEL_VERSION = 2
+
+# Method that starts each event type, for events scheduled to start later
+EVENT_TRIGGERS = {
+    'plague': 'trigger_plague',
+    'drought': 'trigger_drought',
+    'blessing': 'grant_blessing',
+    'animal_disease': 'trigger_animal_disease',
+    'plant_blight': 'trigger_plant_blight',
+}
+
+# State after one simulated day, as yielded by SimpleEcosystem.iter_days().
+# The fields match the history's, plus whether the season changed that day.
+DayRecord = namedtuple('DayRecord', FIELD_NAMES + ('season_changed',))
+
+# Constructor constants that SimpleEcosystem(params=...) can override. Season
+# tables can be replaced whole or one season at a time ('season_plant_modifiers.Winter').
+PARAMETER_NAMES = (
+    'plant_growth_rate',
+    'animal_reproduction_rate',
+    'human_reproduction_rate',
+    'human_plant_consumption',
+    'human_animal_consumption',
+    'animal_plant_consumption',
+    'max_food_storage',
+    'carrying_capacity',
+    'season_plant_modifiers',
+    'season_animal_modifiers',
+    'drought_threshold',
+    'flood_threshold',
+)
+
+# Dynamic rainfall model: seasonal targets that rainfall drifts toward
+SEASON_RAINFALL_BASE = {
+    "Spring": 65,  # Wetter
+    "Summer": 40,  # Dry
+    "Fall": 60,    # Wet
+    "Winter": 30   # Drier
+}
 
 class SimpleEcosystem:
-    def __init__(self):
+    def __init__(self, sink=None, seed=None, history=None, params=None):
+        # Where simulation events go (printed like the classic messages by default)
+        self.sink = ConsoleSink() if sink is None else sink
+        
+        # Own random stream: an int seed, a RandomStream (e.g. spawned for an ensemble) or None for a fresh one
+        self.rng = seed if isinstance(seed, RandomStream) else RandomStream(seed)
+        
         # Initial population counts
         self.humans = 10
+        self.carrying_capacity = 100  # Most humans one settlement holds
         self.plants = 100
         self.animals = 50
         
@@ -59,14 +116,11 @@ class SimpleEcosystem:
         # Days passed
         self.days = 0
         
-        # Track history for reporting
-        self.history = {
-            'humans': [],
-            'animals': [],
-            'plants': [],
-            'rainfall': [],
-            'food_storage': []
-        }
+        # Track history for reporting (every day by default; pass a History for every-k or ring recording)
+        self.history = History() if history is None else history
+        
+        # Running aggregates over every simulated day, for O(1) reports
+        self.stats = RunningStats()
         
         # Plant reserves - plants that are always protected
         self.plant_reserves = 20  # Minimum number of plants that will always survive
@@ -84,18 +138,67 @@ class SimpleEcosystem:
         # Tool development
         self.tools_quality = 1.0
         
-        # God Mode - active events
-        self.active_events = {
-            'plague': 0,            # Duration of active plague (days)
-            'drought': 0,           # Duration of active drought (days)
-            'blessing': 0,          # Duration of divine blessing (days)
-            'animal_disease': 0,    # Duration of animal disease (days)
-            'plant_blight': 0       # Duration of plant disease (days)
-        }
+        # God Mode - active and scheduled events. active_events maps each
+        # event type to its days remaining and is kept up to date by the scheduler.
+        self.events = EventScheduler()
+        self.active_events = self.events.remaining
         
         # Migration tracking
         self.total_migrations = 0
         self.sister_settlements = 0
+        
+        # Optional PhaseProfiler timing each phase of update()
+        self.profiler = None
+        
+        # Optional ReplayLog told about god mode commands and finished days
+        self.replay = None
+        
+        # Optional individual humans kept in step with the count (see agents.py)
+        self.population = None
+        
+        # Optional gridded plants and animals behind the counts (see landscape.py)
+        self.landscape = None
+        
+        # Optional StatePublisher streaming finished days to subscribers (see streaming.py)
+        self.publisher = None
+        
+        # Overrides of the constants above
+        if params:
+            self.apply_parameters(params)
+    
+    def apply_parameters(self, params):
+        """Override constructor constants, e.g. {'plant_growth_rate': 0.25, 'season_plant_modifiers.Winter': 0.3}"""
+        for name, value in params.items():
+            table, _, season = name.partition('.')
+            if table not in PARAMETER_NAMES:
+                raise ValueError(f"Unknown parameter: {name}")
+            current = getattr(self, table)
+            if isinstance(current, dict):
+                updates = {season: value} if season else value
+                unknown = set(updates) - set(current)
+                if unknown:
+                    raise ValueError(f"Unknown season(s) for {table}: {', '.join(sorted(unknown))}")
+                setattr(self, table, {**current, **updates})
+            elif season:
+                raise ValueError(f"{table} is not a season table")
+            else:
+                setattr(self, table, value)
+    
+    def parameters(self):
+        """Current values of the overridable constants, with season tables flattened to 'table.Season' keys"""
+        params = {}
+        for name in PARAMETER_NAMES:
+            value = getattr(self, name)
+            if isinstance(value, dict):
+                for season in self.seasons:
+                    params[f'{name}.{season}'] = value[season]
+            else:
+                params[name] = value
+        return params
+    
+    def emit(self, kind, *payload):
+        """Send an event to the sink; the payload is only formatted if the sink renders it"""
+        self.sink.emit(kind, self.days, payload)
     
     def update_season(self):
         self.current_day_in_season += 1
@@ -103,121 +206,115 @@ class SimpleEcosystem:
         if self.current_day_in_season >= self.days_in_season:
             self.current_season = (self.current_season + 1) % 4
             self.current_day_in_season = 0
-            print(f"\n=== SEASON CHANGED TO {self.seasons[self.current_season].upper()} ===")
+            self.emit('season_changed', self.current_season)
             
             # Seed dispersal during season change
             if self.plants < 30:
-                new_seeds = random.randint(5, 15)
+                new_seeds = self.rng.randint(5, 15)
                 self.plants += new_seeds
-                print(f"NATURE EVENT: {new_seeds} new plants sprouted from dormant seeds!")
+                self.emit('seeds_sprouted', new_seeds)
             
             # Major migration at season changes
-            if random.random() < 0.3:
-                change = random.randint(-10, 20)
+            if self.rng.random() < 0.3:
+                change = self.rng.randint(-10, 20)
                 old_animals = self.animals
                 self.animals = max(10, min(200, self.animals + change))
-                print(f"MIGRATION EVENT: Animal population changed from {old_animals} to {self.animals}")
+                self.emit('animal_migration', old_animals, self.animals)
             
             # Winter preparation
             if self.seasons[self.current_season] == "Fall" and self.humans >= 5:
                 # Humans prepare for winter during fall
-                if random.random() < 0.8:  # 80% chance
-                    extra_storage = random.randint(5, 10)
+                if self.rng.random() < 0.8:  # 80% chance
+                    extra_storage = self.rng.randint(5, 10)
                     self.food_storage += extra_storage
                     self.food_storage = min(self.food_storage, self.max_food_storage)
-                    print(f"PREPARATION: Humans gathered an extra {extra_storage} food for winter storage!")
+                    self.emit('winter_preparation', extra_storage)
             
             # Human farming knowledge increases
-            if self.days > 60 and random.random() < 0.2:
+            if self.days > 60 and self.rng.random() < 0.2:
                 self.farming_level += 1
                 self.farming_efficiency = 1.0 + (self.farming_level * 0.15)
-                print(f"ADVANCEMENT: Humans improved their farming methods! (Level {self.farming_level}, Efficiency {self.farming_efficiency:.1f}x)")
+                self.emit('farming_improved', self.farming_level, self.farming_efficiency)
             
             # Tool improvement
-            if self.days > 30 and random.random() < 0.15:
+            if self.days > 30 and self.rng.random() < 0.15:
                 self.tools_quality += 0.1
-                print(f"TECHNOLOGY: Humans improved their tools! (Quality: {self.tools_quality:.1f}x)")
+                self.emit('tools_improved', self.tools_quality)
             
             # Knowledge accumulation is more significant at season changes
             self.survival_knowledge += 0.05
             
             # Conservation knowledge increases
-            if self.days > 45 and random.random() < 0.25:
-                if random.random() < 0.5:
+            if self.days > 45 and self.rng.random() < 0.25:
+                if self.rng.random() < 0.5:
                     self.animal_conservation_level += 1
-                    print(f"CONSERVATION: Humans improved their animal husbandry skills! (Level {self.animal_conservation_level})")
+                    self.emit('animal_conservation_improved', self.animal_conservation_level)
                 else:
                     self.plant_conservation_level += 1
-                    print(f"CONSERVATION: Humans improved their plant cultivation skills! (Level {self.plant_conservation_level})")
+                    self.emit('plant_conservation_improved', self.plant_conservation_level)
             
             # Expand storage capacity with knowledge
-            if self.days > 120 and random.random() < 0.3:
-                storage_increase = random.randint(5, 10)
+            if self.days > 120 and self.rng.random() < 0.3:
+                storage_increase = self.rng.randint(5, 10)
                 old_capacity = self.max_food_storage
                 self.max_food_storage += storage_increase
-                print(f"ADVANCEMENT: Humans increased food storage capacity from {old_capacity} to {self.max_food_storage}!")
+                self.emit('storage_expanded', old_capacity, self.max_food_storage)
     
     def update_rainfall(self):
         # Skip natural rainfall update if there's a divine drought active
         if self.active_events['drought'] > 0:
             # Divine drought overrides natural weather
             old_rainfall = self.rainfall
-            self.rainfall = max(0, self.rainfall - random.randint(3, 8))
+            self.rainfall = max(0, self.rainfall - self.rng.randint(3, 8))
             return
             
-        # Dynamic rainfall model
-        season_rainfall_base = {
-            "Spring": 65,  # Wetter
-            "Summer": 40,  # Dry
-            "Fall": 60,    # Wet
-            "Winter": 30   # Drier
-        }
-        
         # Target rainfall based on season with high variability
-        target = season_rainfall_base[self.seasons[self.current_season]]
+        target = SEASON_RAINFALL_BASE[self.seasons[self.current_season]]
         variance = 25
         
         # Move toward seasonal target with randomness
         if self.rainfall < target:
-            self.rainfall += random.randint(0, 15)
+            self.rainfall += self.rng.randint(0, 15)
         else:
-            self.rainfall -= random.randint(0, 15)
+            self.rainfall -= self.rng.randint(0, 15)
             
         # Add random fluctuation
-        self.rainfall += random.randint(-variance, variance)
+        self.rainfall += self.rng.randint(-variance, variance)
         self.rainfall = max(0, min(100, self.rainfall))
         
         # Extreme events - only if no god-triggered events are active
-        if not any(duration > 0 for event, duration in self.active_events.items()):
-            if random.random() < 0.08:
-                event_type = random.choice(["drought", "flood", "ideal"])
+        if not self.events.active:
+            if self.rng.random() < 0.08:
+                event_type = self.rng.choice(["drought", "flood", "ideal"])
                 
                 if event_type == "drought":
                     self.rainfall = max(0, self.rainfall - 40)
-                    print("EXTREME EVENT: A severe drought has struck the region!")
+                    self.emit('extreme_drought')
                 elif event_type == "flood":
                     self.rainfall = min(100, self.rainfall + 40)
-                    print("EXTREME EVENT: Heavy rains have flooded the region!")
+                    self.emit('extreme_flood')
                 else:
                     self.rainfall = 60  # Perfect conditions
-                    print("WEATHER EVENT: Perfect growing conditions have emerged!")
+                    self.emit('ideal_weather')
     
-    def get_plant_growth_modifier(self):
-        # Combine season and rainfall effects
+    def get_plant_growth_modifier(self, rainfall=None):
+        # Combine season and rainfall effects (today's rainfall unless another is given)
+        if rainfall is None:
+            rainfall = self.rainfall
         season_mod = self.season_plant_modifiers[self.seasons[self.current_season]]
         
         # Rainfall effect
-        if self.rainfall < self.drought_threshold:
+        if rainfall < self.drought_threshold:
             # Drought conditions - severe impact
-            rainfall_mod = 0.3 + (self.rainfall / self.drought_threshold * 0.5)
-        elif self.rainfall > self.flood_threshold:
+            rainfall_mod = 0.3 + (rainfall / self.drought_threshold * 0.5)
+        elif rainfall > self.flood_threshold:
             # Flood conditions
-            flood_severity = (self.rainfall - self.flood_threshold) / (100 - self.flood_threshold)
+            flood_severity = (rainfall - self.flood_threshold) / (100 - self.flood_threshold)
             rainfall_mod = 1.3 - (flood_severity * 0.8)
         else:
             # Ideal conditions
             optimal = 60  # Best rainfall amount
-            deviation = abs(self.rainfall - optimal) / 30  # How far from optimal
+            deviation = abs(rainfall - optimal) / 30  # How far from optimal
             rainfall_mod = 1.2 - (deviation * 0.5)
             
         # Apply divine blessing if active
@@ -247,14 +344,14 @@ class SimpleEcosystem:
             if self.seasons[self.current_season] == "Winter":
                 trade_chance = base_trade_chance * 0.7  # Harder in winter but still possible
             
-            if random.random() < trade_chance:
+            if self.rng.random() < trade_chance:
                 # More food from trading as humans gain knowledge
-                food_received = random.randint(5, 10 + int(self.survival_knowledge * 5))
+                food_received = self.rng.randint(5, 10 + int(self.survival_knowledge * 5))
                 self.food_storage += food_received
                 # Don't exceed max storage
                 self.food_storage = min(self.food_storage, self.max_food_storage)
-                self.trading_cooldown = random.randint(5, 15)  # Reduced cooldown
-                print(f"TRADING: Humans traded with neighboring groups for {food_received} units of food!")
+                self.trading_cooldown = self.rng.randint(5, 15)  # Reduced cooldown
+                self.emit('trade', food_received)
                 return food_received
         
         return 0
@@ -276,7 +373,7 @@ class SimpleEcosystem:
             # More effective with higher knowledge
             success_chance = 0.3 + (self.animal_conservation_level * 0.1)
             
-            if random.random() < success_chance:
+            if self.rng.random() < success_chance:
                 # Animal population boost from conservation efforts
                 new_animals = max(1, conservation_boost)
                 self.animals += new_animals
@@ -284,7 +381,7 @@ class SimpleEcosystem:
                 # Updates reserves based on conservation level
                 self.animal_reserves = min(15, max(self.animal_reserves, int(3 + self.animal_conservation_level)))
                 
-                print(f"CONSERVATION: Humans successfully protected and raised {new_animals} animals!")
+                self.emit('animals_conserved', new_animals)
                 return True
         
         return False
@@ -306,7 +403,7 @@ class SimpleEcosystem:
             # More effective with higher knowledge
             success_chance = 0.4 + (self.plant_conservation_level * 0.1)
             
-            if random.random() < success_chance:
+            if self.rng.random() < success_chance:
                 # Plant population boost from conservation efforts
                 new_plants = max(3, conservation_boost)
                 self.plants += new_plants
@@ -314,178 +411,73 @@ class SimpleEcosystem:
                 # Updates reserves based on conservation level
                 self.plant_reserves = max(self.plant_reserves, int(20 + self.plant_conservation_level * 2))
                 
-                print(f"CONSERVATION: Humans successfully planted and protected {new_plants} plants!")
+                self.emit('plants_conserved', new_plants)
                 return True
         
         return False
     
     # Process active god mode events
     def process_active_events(self):
-        # Process and reduce duration of all active events
-        for event_type, duration in list(self.active_events.items()):
-            if duration > 0:
-                # Event is active, apply its effects
+        events = self.events
+        # Start scheduled events that are due today
+        next_start = events.next_start()
+        if next_start is not None and next_start <= self.days:
+            for event_type, duration in events.due(self.days):
+                getattr(self, EVENT_TRIGGERS[event_type])(duration)
+        if not events.active:
+            return
+        
+        # Apply the effects of each active event, once per stacked instance
+        stacks = events.stacks()
+        ended = events.advance(self.days + 1)
+        for event_type, stack in stacks:
+            for _ in range(stack):
                 if event_type == 'plague':
                     # Human plague reduces population
-                    deaths = max(1, int(self.humans * random.uniform(0.02, 0.08)))
+                    deaths = max(1, int(self.humans * self.rng.uniform(0.02, 0.08)))
                     self.humans = max(0, self.humans - deaths)
                     if deaths > 0:
-                        print(f"DIVINE PLAGUE: {deaths} humans died from the plague!")
+                        self.emit('plague_deaths', deaths)
                 
                 elif event_type == 'animal_disease':
                     # Animal disease reduces population
-                    lost_animals = max(1, int(self.animals * random.uniform(0.05, 0.12)))
+                    lost_animals = max(1, int(self.animals * self.rng.uniform(0.05, 0.12)))
                     self.animals = max(0, self.animals - lost_animals)
                     if lost_animals > 0:
-                        print(f"DIVINE ANIMAL DISEASE: {lost_animals} animals perished!")
-                
-                # Reduce the event's remaining duration
-                self.active_events[event_type] -= 1
-                
-                # Announce when an event ends
-                if self.active_events[event_type] == 0:
-                    event_names = {
-                        'plague': 'plague',
-                        'drought': 'drought',
-                        'blessing': 'divine blessing',
-                        'animal_disease': 'animal disease',
-                        'plant_blight': 'plant blight'
-                    }
-                    print(f"DIVINE EVENT ENDED: The {event_names[event_type]} has subsided.")
-    
-    # Handle migration when human population approaches capacity
-    def trigger_migration(self):
-        # Only trigger migration if we're near capacity
-        if self.humans > 85:  # Approaching the cap of 100
-            # Calculate how many will migrate
-            migration_percentage = (self.humans - 85) / 15  # Scales from 0 to 1 as population rises from 85 to 100
-            migration_chance = 0.5 + (migration_percentage * 0.5)  # Chance increases as population grows
+                        self.emit('animal_disease_losses', lost_animals)
             
-            if random.random() < migration_chance:
-                # Determine migration size - larger migrations as population approaches cap
-                base_migrants = int(self.humans * 0.03)  # Base rate of 3%
-                extra_migrants = int((self.humans - 85) * 0.15)  # Additional 15% of population over threshold
-                migrants = max(1, base_migrants + extra_migrants)
-                
-                # Cap to keep a minimum of 85 humans in the tribe
-                migrants = min(migrants, self.humans - 85)
-                
-                if migrants > 0:
-                    self.humans -= migrants
-                    self.total_migrations += migrants
-                    
-                    # Update count of sister settlements when a significant group leaves
-                    if migrants >= 5:
-                        self.sister_settlements += 1
-                    
-                    # Different messages based on migration size
-                    if migrants == 1:
-                        print(f"MIGRATION: 1 human has left to establish a new settlement elsewhere.")
-                    elif migrants <= 3:
-                        print(f"MIGRATION: A small family of {migrants} humans has departed to find new territory.")
-                    elif migrants <= 8:
-                        print(f"MIGRATION: A group of {migrants} humans has migrated to establish a new settlement.")
-                    else:
-                        print(f"MAJOR MIGRATION: A large band of {migrants} humans has departed to establish a new colony!")
-                        
-                    # Chance for knowledge sharing between settlements
-                    if random.random() < 0.3 and self.days > 60:
-                        knowledge_gain = random.uniform(0.05, 0.2)
-                        self.survival_knowledge += knowledge_gain
-                        print(f"CULTURAL EXCHANGE: The new settlement maintains contact, increasing knowledge by {knowledge_gain:.2f}!")
-                    
-                    return migrants
-            
-            # If no migration happened but we're at capacity, show crowding message
-            elif self.humans >= 95:
-                print("CROWDING: The settlement is reaching its sustainable capacity - migration may occur soon.")
-        
-        return 0
-    
-    # Simulate interactions with sister settlements
-    def sister_settlement_interaction(self):
-        # Only happens if we have sister settlements
-        if self.sister_settlements == 0:
-            return
-        
-        # Interaction chance based on number of sister settlements
-        interaction_chance = min(0.15, 0.02 * self.sister_settlements)
-        
-        # More likely during good weather seasons
-        if self.seasons[self.current_season] in ["Spring", "Summer"]:
-            interaction_chance *= 1.5
-        
-        # Less likely during winter
-        if self.seasons[self.current_season] == "Winter":
-            interaction_chance *= 0.3
-        
-        if random.random() < interaction_chance:
-            interaction_type = random.choices(
-                ["trade", "knowledge", "population_return", "food_gift", "hunting_party"],
-                weights=[0.4, 0.3, 0.15, 0.1, 0.05],
-                k=1
-            )[0]
-            
-            if interaction_type == "trade":
-                # Trading goods with sister settlements
-                trade_amount = random.randint(2, 6)
-                self.food_storage = min(self.max_food_storage, self.food_storage + trade_amount)
-                print(f"SETTLEMENT NETWORK: A trading party from a sister settlement brought {trade_amount} units of food!")
-                
-            elif interaction_type == "knowledge":
-                # Knowledge exchange
-                knowledge_gain = random.uniform(0.1, 0.3)
-                self.survival_knowledge += knowledge_gain
-                
-                # Chance to gain specialized knowledge
-                if random.random() < 0.4:
-                    if random.random() < 0.5:
-                        self.farming_level += 1
-                        self.farming_efficiency = 1.0 + (self.farming_level * 0.15)
-                        print(f"CULTURAL EXCHANGE: Visitors from sister settlement shared advanced farming techniques! (Level {self.farming_level})")
-                    else:
-                        self.tools_quality += 0.1
-                        print(f"CULTURAL EXCHANGE: Visitors from sister settlement shared improved tool-making methods! (Quality: {self.tools_quality:.1f}x)")
-                else:
-                    print(f"CULTURAL EXCHANGE: Contact with sister settlements increased knowledge by {knowledge_gain:.2f}!")
-                    
-            elif interaction_type == "population_return":
-                # Some people return from sister settlements
-                returnees = random.randint(1, 3)
-                free_capacity = 100 - self.humans
-                actual_returnees = min(returnees, free_capacity)
-                
-                if actual_returnees > 0:
-                    self.humans += actual_returnees
-                    print(f"POPULATION FLOW: {actual_returnees} humans have returned from sister settlements!")
-                    
-            elif interaction_type == "food_gift":
-                # Emergency food aid during hard times
-                if self.food_storage < 10 and (self.plants < 50 or self.animals < 20):
-                    aid_amount = random.randint(5, 12)
-                    self.food_storage += aid_amount
-                    self.food_storage = min(self.max_food_storage, self.food_storage)
-                    print(f"COMMUNITY SUPPORT: Sister settlements sent {aid_amount} units of emergency food aid!")
-                    
-            elif interaction_type == "hunting_party":
-                # Joint hunting party increases animal catch
-                if self.animals > 30:  # Only if enough animals
-                    hunting_bonus = random.randint(2, 5)
-                    self.food_storage += hunting_bonus
-                    self.food_storage = min(self.max_food_storage, self.food_storage)
-                    print(f"JOINT VENTURE: A combined hunting party with sister settlement hunters brought in {hunting_bonus} extra food!")
+            # Announce when the last instance of an event ends
+            if event_type in ended:
+                self.emit('event_ended', EVENT_TYPES.index(event_type))
     
     def update(self):
+        # Optional per-phase timing (see profiling.py)
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
+        
         # First, process any active god mode events
         self.process_active_events()
+        population = self.population
+        if population is not None:
+            population.sync(self.humans, removed='frail')
+        if profiler is not None:
+            profiler.lap('process_active_events')
         
         # Update season and weather
         self.update_season()
+        if profiler is not None:
+            profiler.lap('update_season')
         self.update_rainfall()
+        if profiler is not None:
+            profiler.lap('update_rainfall')
         
-        # Get environmental modifiers
+        # Get environmental modifiers (the season is fixed for the rest of the day)
+        season = self.seasons[self.current_season]
         plant_growth_modifier = self.get_plant_growth_modifier()
-        animal_modifier = self.season_animal_modifiers[self.seasons[self.current_season]]
+        animal_modifier = self.season_animal_modifiers[season]
+        if profiler is not None:
+            profiler.lap('growth_modifiers')
         
         # Check if conservation is needed
         conservation_active = False
@@ -502,6 +494,13 @@ class SimpleEcosystem:
         
         self.conservation_active = conservation_active
         
+        # Spread today's changes to plants and animals so far over the landscape
+        landscape = self.landscape
+        if landscape is not None:
+            landscape.sync(self)
+        if profiler is not None:
+            profiler.lap('conservation')
+        
         # Plants grow based on season and rainfall
         effective_growth_rate = self.plant_growth_rate * plant_growth_modifier
         
@@ -523,9 +522,9 @@ class SimpleEcosystem:
             
             if plants_consumed_by_animals > 0 and self.animals > 10:
                 # Some animals migrate away when food is scarce
-                migration_loss = random.randint(1, max(1, int(self.animals * 0.1)))
+                migration_loss = self.rng.randint(1, max(1, int(self.animals * 0.1)))
                 self.animals -= migration_loss
-                print(f"ADAPTATION: {migration_loss} animals migrated away due to food scarcity")
+                self.emit('animals_left', migration_loss)
         
         self.plants = self.plants - plants_consumed_by_animals + new_plants
         
@@ -537,17 +536,17 @@ class SimpleEcosystem:
             # Tools help with farming
             farming_boost *= self.tools_quality
             
-            if self.seasons[self.current_season] == "Spring" or self.seasons[self.current_season] == "Summer":
+            if season == "Spring" or season == "Summer":
                 farming_boost *= 1.2  # Better farming in growing season
             
             # Even in winter, some minimal farming/gathering is possible
-            if self.seasons[self.current_season] == "Winter" and self.farming_level >= 2:
+            if season == "Winter" and self.farming_level >= 2:
                 farming_boost = max(0.5, farming_boost * 0.4)  # Preserve some farming ability
         
         # Humans adapt to scarcity
         if available_plants < 30:
             human_plant_consumption_adjusted = self.human_plant_consumption * 0.7
-            print("ADAPTATION: Humans are conserving plant resources")
+            self.emit('plant_rationing')
         else:
             human_plant_consumption_adjusted = self.human_plant_consumption
             
@@ -560,7 +559,7 @@ class SimpleEcosystem:
             conservation_breeding_boost = 1.0 + (self.animal_conservation_level * 0.15)
             effective_reproduction_rate *= conservation_breeding_boost
             food_ratio_for_animals = max(food_ratio_for_animals, 0.5)  # Humans help feed breeding stock
-            print(f"CONSERVATION: Humans are assisting animal breeding (Boost: {conservation_breeding_boost:.1f}x)")
+            self.emit('breeding_assisted', conservation_breeding_boost)
         
         # Animal disease reduces reproduction
         if self.active_events['animal_disease'] > 0:
@@ -578,12 +577,12 @@ class SimpleEcosystem:
         if self.animals < 25 and self.animal_conservation_level > 0:
             hunt_reduction = 0.5 - (self.animal_conservation_level * 0.08)  # More reduction with higher conservation knowledge
             hunt_efficiency *= max(0.1, hunt_reduction)
-            print(f"CONSERVATION: Humans are limiting hunting to protect endangered animals")
+            self.emit('hunting_limited')
         
         # Hunting varies by season but improved with tools and knowledge
-        if self.seasons[self.current_season] == "Winter":
+        if season == "Winter":
             hunt_efficiency *= 0.6  # Improved from 0.5
-        elif self.seasons[self.current_season] == "Fall":
+        elif season == "Fall":
             hunt_efficiency *= 1.3  # Fall is hunting season
         
         animals_hunted = min(int(self.humans * self.human_animal_consumption * hunt_efficiency), available_animals)
@@ -595,29 +594,31 @@ class SimpleEcosystem:
         if self.animals < self.animal_reserves and self.animal_reserves > 0:
             # Can't maintain full reserves, but save what we can
             self.animal_reserves = self.animals
-            print(f"CONSERVATION: Animal reserves reduced to {self.animal_reserves} due to population decline")
+            self.emit('reserves_reduced', self.animal_reserves)
         
         # Dormant seeds - if plants get too low, some emergency growth happens
-        if self.plants < 20 and random.random() < 0.3:
-            emergency_growth = random.randint(3, 10)
+        if self.plants < 20 and self.rng.random() < 0.3:
+            emergency_growth = self.rng.randint(3, 10)
             self.plants += emergency_growth
-            print(f"RESILIENCE: {emergency_growth} new plants emerged from dormant seeds!")
+            self.emit('seeds_emerged', emergency_growth)
         
         # Ensure plants never go completely extinct
         if self.plants < self.plant_reserves:
             self.plants = self.plant_reserves
-            print("RESILIENCE: Plant reserves are ensuring survival of the species")
+            self.emit('plant_reserves_used')
+        if profiler is not None:
+            profiler.lap('consumption_hunting')
         
         # IMPROVED FOOD STORAGE SYSTEM
         # In seasons of plenty, store extra food with improved efficiency
         storage_efficiency = 1.0 + (self.survival_knowledge * 0.2)
         
-        if self.seasons[self.current_season] in ["Summer", "Fall"]:
+        if season in ["Summer", "Fall"]:
             if plants_gathered > self.humans * human_plant_consumption_adjusted * 0.6:  # Easier threshold
                 storage_amount = int((plants_gathered - self.humans * human_plant_consumption_adjusted * 0.6) * 0.6 * storage_efficiency)
                 if storage_amount > 0:
                     self.food_storage = min(self.max_food_storage, self.food_storage + storage_amount)
-                    print(f"ADAPTATION: Humans stored {storage_amount} units of food! (Storage: {self.food_storage}/{self.max_food_storage})")
+                    self.emit('food_stored', storage_amount, self.food_storage, self.max_food_storage)
         
         # Knowledge accumulation - humans learn survival skills over time
         self.survival_knowledge += 0.002  # Small daily increase
@@ -627,25 +628,32 @@ class SimpleEcosystem:
         if self.food_storage > 0:
             # Use stored food when needed, more in winter
             storage_need_factor = 0.3  # Base factor
-            if self.seasons[self.current_season] == "Winter":
+            if season == "Winter":
                 storage_need_factor = 0.7  # Higher in winter
             
             needed_food = max(0, self.humans * human_plant_consumption_adjusted * storage_need_factor - plants_gathered)
             food_from_storage = min(needed_food, self.food_storage)
             self.food_storage -= food_from_storage
             if food_from_storage > 0:
-                print(f"ADAPTATION: Humans used {food_from_storage} units of stored food! (Remaining: {self.food_storage})")
+                self.emit('stored_food_used', food_from_storage, self.food_storage)
+        if profiler is not None:
+            profiler.lap('storage')
         
         # Trading system for emergency food - more aggressive trading
         traded_food = 0
         if (plants_gathered + food_from_storage) < (self.humans * human_plant_consumption_adjusted * 0.5):
             # Emergency trading when food is scarce
             traded_food = self.attempt_trading()
+        if profiler is not None:
+            profiler.lap('trading')
         
         # Human population changes based on available food
         total_plant_food = plants_gathered + food_from_storage + traded_food
-        food_satisfaction = (total_plant_food / (self.humans * human_plant_consumption_adjusted) * 0.6 + 
-                           animals_hunted / max(1, self.humans * self.human_animal_consumption) * 0.4)
+        if self.humans > 0:
+            food_satisfaction = (total_plant_food / (self.humans * human_plant_consumption_adjusted) * 0.6 + 
+                               animals_hunted / max(1, self.humans * self.human_animal_consumption) * 0.4)
+        else:
+            food_satisfaction = 0  # Nobody is left to feed (e.g. the plague took the last humans today)
         
         # Conservation efforts require human energy
         if conservation_active and self.conservation_active:
@@ -653,20 +661,20 @@ class SimpleEcosystem:
         
         # Winter is less harsh with knowledge and tools
         winter_penalty = 0.7  # Base penalty
-        if self.seasons[self.current_season] == "Winter":
+        if season == "Winter":
             # Knowledge and tools help with winter survival
             winter_adaptation = 0.1 + (self.survival_knowledge * 0.05) + ((self.tools_quality - 1.0) * 0.1)
             winter_penalty = min(0.9, 0.7 + winter_adaptation)  # Can improve up to 0.9
             food_satisfaction *= winter_penalty
-            print(f"ADAPTATION: Winter survival efficiency is {winter_penalty:.2f} due to knowledge and tools")
+            self.emit('winter_survival', winter_penalty)
         
         # Emergency measures when food is critically scarce
         if food_satisfaction < 0.3 and self.humans > 5:
             # Desperate measures - hunting or gathering surge
-            if random.random() < 0.4:
-                emergency_food = random.randint(1, 5)
+            if self.rng.random() < 0.4:
+                emergency_food = self.rng.randint(1, 5)
                 food_satisfaction += emergency_food / (self.humans * human_plant_consumption_adjusted) * 0.2
-                print(f"EMERGENCY: Humans found {emergency_food} extra units of emergency food!")
+                self.emit('emergency_food', emergency_food)
         
         # Apply plague effects to food satisfaction if active
         if self.active_events['plague'] > 0:
@@ -682,7 +690,7 @@ class SimpleEcosystem:
             growth = max(1, int(self.humans * self.human_reproduction_rate * 1.5))
             
             # Calculate available capacity
-            remaining_capacity = 100 - self.humans
+            remaining_capacity = self.carrying_capacity - self.humans
             
             # If we're approaching capacity, some newborns might leave immediately
             if remaining_capacity < growth and remaining_capacity > 0:
@@ -698,13 +706,13 @@ class SimpleEcosystem:
                     self.sister_settlements += 1
                 
                 if leaving > 0:
-                    print(f"HUMAN GROWTH: {growth} new humans born due to abundant food!")
-                    print(f"IMMEDIATE MIGRATION: {leaving} young adults left to establish new settlements elsewhere.")
+                    self.emit('human_growth', growth)
+                    self.emit('newborns_migrated', leaving)
             else:
                 # Normal growth, all new humans stay
                 self.humans += growth
                 if growth > 1:
-                    print(f"HUMAN GROWTH: {growth} new humans born due to abundant food!")
+                    self.emit('human_growth', growth)
         elif food_satisfaction < 0.25:  # More forgiving floor
             # Population decreases if hungry - less severe
             decline = max(1, int(self.humans * 0.08))  # Further reduced from 0.1
@@ -712,47 +720,121 @@ class SimpleEcosystem:
             decline = max(1, int(decline * (1.0 - self.survival_knowledge * 0.2)))
             self.humans = max(0, self.humans - decline)
             if decline > 1:
-                print(f"HUMAN DECLINE: {decline} humans died due to food shortage!")
+                self.emit('human_decline', decline)
+        if population is not None:
+            population.sync(self.humans, removed='frail', added='births')
+            self.humans = population.day(food_satisfaction, self.survival_knowledge,
+                                         self.active_events['plague'] > 0)
+        if profiler is not None:
+            profiler.lap('population_change')
         
         # Migration of excess humans to form new settlements
         self.trigger_migration()
+        if population is not None:
+            population.sync(self.humans, removed='migrants')
+        if profiler is not None:
+            profiler.lap('trigger_migration')
         
         # Chance for interaction with sister settlements
         self.sister_settlement_interaction()
+        if profiler is not None:
+            profiler.lap('sister_settlement_interaction')
         
-        # Natural constraints - carrying capacity
-        self.plants = min(500, max(self.plant_reserves, self.plants))
-        self.animals = min(200, max(0, self.animals))
-        self.humans = min(100, max(0, self.humans))  # This line remains, but the migration logic will usually keep it below 100
-        
-        # Record history
-        self.history['humans'].append(self.humans)
-        self.history['animals'].append(self.animals)
-        self.history['plants'].append(self.plants)
-        self.history['rainfall'].append(self.rainfall)
-        self.history['food_storage'].append(self.food_storage)
+        # Natural constraints - carrying capacity (cell by cell on a landscape, which
+        # takes the day's gathering and hunting from the cells around the settlement)
+        if landscape is not None:
+            self.plants, self.animals = landscape.day(self, plants_gathered, animals_hunted)
+        else:
+            self.plants = min(500, max(self.plant_reserves, self.plants))
+            self.animals = min(200, max(0, self.animals))
+        self.humans = min(self.carrying_capacity, max(0, self.humans))  # This line remains, but the migration logic will usually keep it below capacity
+        if population is not None:
+            population.sync(self.humans)
+        if profiler is not None:
+            profiler.lap('carrying_capacity')
+        
+        # Record history and running statistics
+        self.history.record(self)
+        self.stats.record(self)
+        if profiler is not None:
+            profiler.lap('history')
         
         self.days += 1
+        if self.replay is not None:
+            self.replay.day_finished(self)
+        if self.publisher is not None:
+            self.publisher.day_finished(self)
         
         # Return whether a season changed this update
         return self.current_day_in_season == 0
     
+    def iter_days(self, days=None, seasons=None, stop=None):
+        """Simulate day by day, yielding a DayRecord after each update
+        
+        Runs for `days` days or `seasons` season changes, whichever comes first
+        (without limit if neither is given). Stops early when humans die out or
+        when stop(record) returns True; the record that ended the run is still yielded.
+        """
+        days_simulated = 0
+        seasons_completed = 0
+        while ((days is None or days_simulated < days) and
+               (seasons is None or seasons_completed < seasons) and self.humans > 0):
+            season_changed = self.update()
+            record = DayRecord(self.days - 1, self.humans, self.animals, self.plants, self.rainfall,
+                               self.food_storage, self.survival_knowledge, self.farming_level,
+                               event_mask(self.active_events), self.current_season, season_changed)
+            yield record
+            days_simulated += 1
+            seasons_completed += season_changed
+            if stop is not None and stop(record):
+                return
+    
+    def fast_forward(self, days=None, seasons=None, sample_every=30, progress=None, progress_every=3600):
+        """Advance in bulk, ending in the same state as the equivalent iter_days() run
+        
+        Event messages and profiling are switched off, and history is only recorded
+        every `sample_every` days while fast-forwarding. Stops like iter_days();
+        progress(self) is called every `progress_every` days. Returns the days simulated.
+        """
+        sink, profiler, every = self.sink, self.profiler, self.history.every
+        self.sink = NullSink()
+        self.profiler = None
+        self.history.every = max(every, sample_every)
+        update = self.update
+        days_simulated = 0
+        seasons_completed = 0
+        next_progress = progress_every
+        try:
+            while ((days is None or days_simulated < days) and
+                   (seasons is None or seasons_completed < seasons) and self.humans > 0):
+                seasons_completed += update()
+                days_simulated += 1
+                if progress is not None and days_simulated == next_progress:
+                    progress(self)
+                    next_progress += progress_every
+        finally:
+            self.sink = sink
+            self.profiler = profiler
+            self.history.every = every
+        return days_simulated
+    
     # Handle migration when human population approaches capacity
     def trigger_migration(self):
         # Only trigger migration if we're near capacity
-        if self.humans > 85:  # Approaching the cap of 100
+        crowded = self.carrying_capacity * 85 // 100
+        if self.humans > crowded:  # Approaching the cap (85 of 100 by default)
             # Calculate how many will migrate
-            migration_percentage = (self.humans - 85) / 15  # Scales from 0 to 1 as population rises from 85 to 100
+            migration_percentage = (self.humans - crowded) / (self.carrying_capacity - crowded)  # Scales from 0 to 1 as population rises to the cap
             migration_chance = 0.5 + (migration_percentage * 0.5)  # Chance increases as population grows
             
-            if random.random() < migration_chance:
+            if self.rng.random() < migration_chance:
                 # Determine migration size - larger migrations as population approaches cap
                 base_migrants = int(self.humans * 0.03)  # Base rate of 3%
-                extra_migrants = int((self.humans - 85) * 0.15)  # Additional 15% of population over threshold
+                extra_migrants = int((self.humans - crowded) * 0.15)  # Additional 15% of population over threshold
                 migrants = max(1, base_migrants + extra_migrants)
                 
-                # Cap to keep a minimum of 85 humans in the tribe
-                migrants = min(migrants, self.humans - 85)
+                # Cap to keep the threshold population in the tribe
+                migrants = min(migrants, self.humans - crowded)
                 
                 if migrants > 0:
                     self.humans -= migrants
@@ -762,27 +844,19 @@ class SimpleEcosystem:
                     if migrants >= 5:
                         self.sister_settlements += 1
                     
-                    # Different messages based on migration size
-                    if migrants == 1:
-                        print(f"MIGRATION: 1 human has left to establish a new settlement elsewhere.")
-                    elif migrants <= 3:
-                        print(f"MIGRATION: A small family of {migrants} humans has departed to find new territory.")
-                    elif migrants <= 8:
-                        print(f"MIGRATION: A group of {migrants} humans has migrated to establish a new settlement.")
-                    else:
-                        print(f"MAJOR MIGRATION: A large band of {migrants} humans has departed to establish a new colony!")
+                    self.emit('migration', migrants)
                         
                     # Chance for knowledge sharing between settlements
-                    if random.random() < 0.3 and self.days > 60:
-                        knowledge_gain = random.uniform(0.05, 0.2)
+                    if self.rng.random() < 0.3 and self.days > 60:
+                        knowledge_gain = self.rng.uniform(0.05, 0.2)
                         self.survival_knowledge += knowledge_gain
-                        print(f"CULTURAL EXCHANGE: The new settlement maintains contact, increasing knowledge by {knowledge_gain:.2f}!")
+                        self.emit('cultural_exchange', knowledge_gain)
                     
                     return migrants
             
             # If no migration happened but we're at capacity, show crowding message
-            elif self.humans >= 95:
-                print("CROWDING: The settlement is reaching its sustainable capacity - migration may occur soon.")
+            elif self.humans >= self.carrying_capacity * 95 // 100:
+                self.emit('crowding')
         
         return 0
     
@@ -803,8 +877,8 @@ class SimpleEcosystem:
         if self.seasons[self.current_season] == "Winter":
             interaction_chance *= 0.3
         
-        if random.random() < interaction_chance:
-            interaction_type = random.choices(
+        if self.rng.random() < interaction_chance:
+            interaction_type = self.rng.choices(
                 ["trade", "knowledge", "population_return", "food_gift", "hunting_party"],
                 weights=[0.4, 0.3, 0.15, 0.1, 0.05],
                 k=1
@@ -812,66 +886,80 @@ class SimpleEcosystem:
             
             if interaction_type == "trade":
                 # Trading goods with sister settlements
-                trade_amount = random.randint(2, 6)
+                trade_amount = self.rng.randint(2, 6)
                 self.food_storage = min(self.max_food_storage, self.food_storage + trade_amount)
-                print(f"SETTLEMENT NETWORK: A trading party from a sister settlement brought {trade_amount} units of food!")
+                self.emit('settlement_trade', trade_amount)
                 
             elif interaction_type == "knowledge":
                 # Knowledge exchange
-                knowledge_gain = random.uniform(0.1, 0.3)
+                knowledge_gain = self.rng.uniform(0.1, 0.3)
                 self.survival_knowledge += knowledge_gain
                 
                 # Chance to gain specialized knowledge
-                if random.random() < 0.4:
-                    if random.random() < 0.5:
+                if self.rng.random() < 0.4:
+                    if self.rng.random() < 0.5:
                         self.farming_level += 1
                         self.farming_efficiency = 1.0 + (self.farming_level * 0.15)
-                        print(f"CULTURAL EXCHANGE: Visitors from sister settlement shared advanced farming techniques! (Level {self.farming_level})")
+                        self.emit('shared_farming', self.farming_level)
                     else:
                         self.tools_quality += 0.1
-                        print(f"CULTURAL EXCHANGE: Visitors from sister settlement shared improved tool-making methods! (Quality: {self.tools_quality:.1f}x)")
+                        self.emit('shared_tools', self.tools_quality)
                 else:
-                    print(f"CULTURAL EXCHANGE: Contact with sister settlements increased knowledge by {knowledge_gain:.2f}!")
+                    self.emit('settlement_knowledge', knowledge_gain)
                     
             elif interaction_type == "population_return":
                 # Some people return from sister settlements
-                returnees = random.randint(1, 3)
-                free_capacity = 100 - self.humans
+                returnees = self.rng.randint(1, 3)
+                free_capacity = self.carrying_capacity - self.humans
                 actual_returnees = min(returnees, free_capacity)
                 
                 if actual_returnees > 0:
                     self.humans += actual_returnees
-                    print(f"POPULATION FLOW: {actual_returnees} humans have returned from sister settlements!")
+                    self.emit('population_return', actual_returnees)
                     
             elif interaction_type == "food_gift":
                 # Emergency food aid during hard times
                 if self.food_storage < 10 and (self.plants < 50 or self.animals < 20):
-                    aid_amount = random.randint(5, 12)
+                    aid_amount = self.rng.randint(5, 12)
                     self.food_storage += aid_amount
                     self.food_storage = min(self.max_food_storage, self.food_storage)
-                    print(f"COMMUNITY SUPPORT: Sister settlements sent {aid_amount} units of emergency food aid!")
+                    self.emit('food_aid', aid_amount)
                     
             elif interaction_type == "hunting_party":
                 # Joint hunting party increases animal catch
                 if self.animals > 30:  # Only if enough animals
-                    hunting_bonus = random.randint(2, 5)
+                    hunting_bonus = self.rng.randint(2, 5)
                     self.food_storage += hunting_bonus
                     self.food_storage = min(self.max_food_storage, self.food_storage)
-                    print(f"JOINT VENTURE: A combined hunting party with sister settlement hunters brought in {hunting_bonus} extra food!")
+                    self.emit('hunting_party', hunting_bonus)
     
     def status_report(self):
         print(f"\n===== DAY {self.days} | {self.seasons[self.current_season]} (Day {self.current_day_in_season+1}) =====")
         print(f"Rainfall: {self.rainfall}/100 {'(SEVERE DROUGHT)' if self.rainfall < self.drought_threshold else '(FLOODING)' if self.rainfall > self.flood_threshold else '(Normal)'}")
         print(f"Humans: {self.humans}")
+        if self.population is not None:
+            print(self.population.summary())
         print(f"Animals: {self.animals}")
         print(f"Plants: {self.plants} (includes {self.plant_reserves} protected plants)")
+        if self.landscape is not None:
+            print(self.landscape.summary())
         
         # Show active divine events
         active_events = [event for event, duration in self.active_events.items() if duration > 0]
         if active_events:
             print("\nACTIVE DIVINE EVENTS:")
             for event in active_events:
-                print(f"  - {event.replace('_', ' ').title()}: {self.active_events[event]} days remaining")
+                stack = len(self.events.active[event])
+                stacked = f" ({stack} stacked)" if stack > 1 else ""
+                print(f"  - {event.replace('_', ' ').title()}: {self.active_events[event]} days remaining{stacked}")
+        
+        # Show events scheduled to start later
+        scheduled = self.events.scheduled()
+        if scheduled:
+            print("\nSCHEDULED EVENTS:")
+            for day, event, duration, every in scheduled:
+                repeat = f", every {every} days" if every is not None else ""
+                print(f"  - {event.replace('_', ' ').title()}: day {day} for {duration} days{repeat}")
         
         # Show conservation status if active
         if self.animal_conservation_level > 0:
@@ -937,11 +1025,16 @@ class SimpleEcosystem:
             if self.sister_settlements > 0:
                 print(f"Sister Settlements: {self.sister_settlements} new settlements established in the region")
         
-        if len(self.history['humans']) > 0:
+        stats = self.stats
+        if stats.days > 0:
             print("\nPOPULATION RANGES:")
-            print(f"Human population ranged from {min(self.history['humans'])} to {max(self.history['humans'])}")
-            print(f"Animal population ranged from {min(self.history['animals'])} to {max(self.history['animals'])}")
-            print(f"Plant population ranged from {min(self.history['plants'])} to {max(self.history['plants'])}")
+            print(f"Human population ranged from {stats.humans.min} to {stats.humans.max}")
+            print(f"Animal population ranged from {stats.animals.min} to {stats.animals.max}")
+            print(f"Plant population ranged from {stats.plants.min} to {stats.plants.max}")
+            print(f"Average population: {stats.humans.mean:.1f} humans (sd {stats.humans.std:.1f}), "
+                  f"{stats.animals.mean:.1f} animals, {stats.plants.mean:.1f} plants")
+            print(f"Days in drought: {stats.drought_days}, in flood: {stats.flood_days}, "
+                  f"at extinction risk: {stats.extinction_risk_days}")
             print(f"\nSimulation has run for {self.days} days ({self.days // 30} months, {(self.days // 30) // 12} years)")
             print(f"Survival Knowledge Level: {self.survival_knowledge:.2f}")
             print(f"Farming Level: {self.farming_level}")
@@ -958,28 +1051,28 @@ class SimpleEcosystem:
     
     def trigger_plague(self, duration=5):
         """Trigger a plague that reduces human population"""
-        self.active_events['plague'] = duration
-        print(f"DIVINE INTERVENTION: You have triggered a plague for {duration} days!")
+        self.events.start('plague', duration, self.days)
+        self.emit('plague_triggered', duration)
         
     def trigger_drought(self, duration=10):
         """Trigger a drought that severely reduces rainfall"""
-        self.active_events['drought'] = duration
+        self.events.start('drought', duration, self.days)
         # Immediately reduce rainfall
-        self.rainfall = max(5, self.rainfall - random.randint(20, 40))
-        print(f"DIVINE INTERVENTION: You have triggered a severe drought for {duration} days!")
+        self.rainfall = max(5, self.rainfall - self.rng.randint(20, 40))
+        self.emit('drought_triggered', duration)
         
     def trigger_animal_disease(self, duration=7):
         """Trigger a disease affecting animals"""
-        self.active_events['animal_disease'] = duration
-        print(f"DIVINE INTERVENTION: You have triggered an animal disease for {duration} days!")
+        self.events.start('animal_disease', duration, self.days)
+        self.emit('animal_disease_triggered', duration)
         
     def trigger_plant_blight(self, duration=8):
         """Trigger a severe disease affecting plants"""
-        self.active_events['plant_blight'] = duration
+        self.events.start('plant_blight', duration, self.days)
         
         # Make it more dramatic - immediately wipe out a significant portion of plants
         plant_reserves = self.plant_reserves  # Save the protected reserves
-        plant_loss_percentage = random.uniform(0.3, 0.5)  # 30-50% of plants affected
+        plant_loss_percentage = self.rng.uniform(0.3, 0.5)  # 30-50% of plants affected
         plant_loss = min(int(self.plants * plant_loss_percentage), self.plants - self.plant_reserves)
         
         if plant_loss > 0:
@@ -987,104 +1080,394 @@ class SimpleEcosystem:
             
             # Dramatic description based on severity
             if plant_loss_percentage > 0.4:
-                print(f"CATASTROPHIC BLIGHT: A devastating fungal disease has swept through the region!")
-                print(f"DIVINE WRATH: {plant_loss} plants withered and blackened before your eyes!")
-                print(f"The few remaining plants show signs of infection, and the disease will continue for {duration} days.")
+                self.emit('catastrophic_blight', plant_loss, duration)
             else:
-                print(f"DIVINE INTERVENTION: A virulent plant blight has struck the ecosystem!")
-                print(f"DESTRUCTION: {plant_loss} plants have been destroyed, their leaves curling and falling away!")
-                print(f"The blight will continue to spread for {duration} more days.")
+                self.emit('blight', plant_loss, duration)
             
             # Chance for mutation that affects farming efficiency temporarily
-            if self.farming_level > 0 and random.random() < 0.7:
+            if self.farming_level > 0 and self.rng.random() < 0.7:
                 old_efficiency = self.farming_efficiency
-                reduction = random.uniform(0.2, 0.4)
+                reduction = self.rng.uniform(0.2, 0.4)
                 self.farming_efficiency = max(0.5, self.farming_efficiency * (1 - reduction))
-                print(f"MUTATION: The blight has damaged farming knowledge! Efficiency temporarily reduced from {old_efficiency:.1f}x to {self.farming_efficiency:.1f}x")
-                print("Farming efficiency will recover when the blight ends.")
+                self.emit('blight_mutation', old_efficiency, self.farming_efficiency)
         else:
-            print(f"DIVINE INTERVENTION: You have triggered a plant blight for {duration} days!")
+            self.emit('blight_triggered', duration)
         
         # Chance to affect the animal population as well (through food chain)
-        if random.random() < 0.4 and self.animals > 20:
+        if self.rng.random() < 0.4 and self.animals > 20:
             animal_sickness = min(int(self.animals * 0.15), self.animals - 10)
             if animal_sickness > 0:
                 self.animals -= animal_sickness
-                print(f"ECOSYSTEM IMPACT: {animal_sickness} animals sickened after consuming blighted plants!")
+                self.emit('blight_sickness', animal_sickness)
 
             
     def grant_blessing(self, duration=7):
         """Grant a divine blessing that improves all conditions"""
-        self.active_events['blessing'] = duration
+        self.events.start('blessing', duration, self.days)
         # Immediate effects
-        self.rainfall = min(70, self.rainfall + random.randint(10, 20))  # Improve rainfall toward ideal
+        self.rainfall = min(70, self.rainfall + self.rng.randint(10, 20))  # Improve rainfall toward ideal
         # Give humans some food
-        blessing_food = random.randint(5, 15)
+        blessing_food = self.rng.randint(5, 15)
         self.food_storage = min(self.max_food_storage, self.food_storage + blessing_food)
-        print(f"DIVINE INTERVENTION: You have granted a blessing for {duration} days! Rainfall improved and {blessing_food} units of food appeared.")
+        self.emit('blessing_granted', duration, blessing_food)
     
     def set_human_population(self, new_population):
         """Directly set human population to a specific value"""
         old_pop = self.humans
-        self.humans = max(0, min(100, new_population))  # Constrain within limits
-        print(f"DIVINE INTERVENTION: Human population changed from {old_pop} to {self.humans}")
+        self.humans = max(0, min(self.carrying_capacity, new_population))  # Constrain within limits
+        if self.population is not None:
+            self.population.sync(self.humans)
+        self.emit('humans_set', old_pop, self.humans)
         
     def set_animal_population(self, new_population):
         """Directly set animal population to a specific value"""
         old_pop = self.animals
         self.animals = max(0, min(200, new_population))  # Constrain within limits
-        print(f"DIVINE INTERVENTION: Animal population changed from {old_pop} to {self.animals}")
+        self.emit('animals_set', old_pop, self.animals)
         
     def set_plant_population(self, new_population):
         """Directly set plant population to a specific value"""
         old_pop = self.plants
         self.plants = max(self.plant_reserves, min(500, new_population))  # Ensure plant reserves remain
-        print(f"DIVINE INTERVENTION: Plant population changed from {old_pop} to {self.plants}")
+        self.emit('plants_set', old_pop, self.plants)
         
     def set_rainfall(self, new_rainfall):
         """Directly set rainfall to a specific value"""
         old_rain = self.rainfall
         self.rainfall = max(0, min(100, new_rainfall))  # Constrain within limits
-        print(f"DIVINE INTERVENTION: Rainfall changed from {old_rain} to {self.rainfall}")
+        self.emit('rainfall_set', old_rain, self.rainfall)
         
     def boost_knowledge(self, amount=0.5):
         """Give humans a boost in knowledge"""
         old_knowledge = self.survival_knowledge
         self.survival_knowledge += amount
-        print(f"DIVINE INTERVENTION: Human knowledge increased from {old_knowledge:.2f} to {self.survival_knowledge:.2f}")
+        self.emit('knowledge_boosted', old_knowledge, self.survival_knowledge)
         
     def boost_farming(self, levels=1):
         """Boost human farming capability"""
         old_level = self.farming_level
         self.farming_level += levels
         self.farming_efficiency = 1.0 + (self.farming_level * 0.15)
-        print(f"DIVINE INTERVENTION: Farming level increased from {old_level} to {self.farming_level} (Efficiency: {self.farming_efficiency:.1f}x)")
+        self.emit('farming_boosted', old_level, self.farming_level, self.farming_efficiency)
         
     def trigger_flood(self):
         """Trigger an immediate flood"""
         old_rain = self.rainfall
-        self.rainfall = min(100, self.rainfall + random.randint(30, 50))
-        print(f"DIVINE INTERVENTION: You have triggered a flood! Rainfall spiked from {old_rain} to {self.rainfall}.")
+        self.rainfall = min(100, self.rainfall + self.rng.randint(30, 50))
+        self.emit('flood_triggered', old_rain, self.rainfall)
         
     def add_food(self, amount=10):
         """Add food to human storage"""
         self.food_storage = min(self.max_food_storage, self.food_storage + amount)
-        print(f"DIVINE INTERVENTION: {amount} units of food added to storage (Total: {self.food_storage}/{self.max_food_storage})")
+        self.emit('food_added', amount, self.food_storage, self.max_food_storage)
         
     def cancel_events(self):
         """Cancel all active divine events"""
-        active_count = sum(1 for duration in self.active_events.values() if duration > 0)
+        active_count = self.events.cancel()
         if active_count > 0:
-            for event in self.active_events:
-                self.active_events[event] = 0
-            print(f"DIVINE INTERVENTION: All {active_count} active events have been canceled.")
+            self.emit('events_canceled', active_count)
+        else:
+            self.emit('no_events_to_cancel')
+    
+    def schedule_event(self, event, day, duration, every=None):
+        """Schedule an event type to start on a later day, recurring every `every` days if given"""
+        self.events.schedule(event, day, duration, every)
+        self.emit('event_scheduled', EVENT_TYPES.index(event), day, duration, every or 0)
+
+
+# God mode commands: command -> (SimpleEcosystem method, default argument).
+# Commands with a None default take no argument unless listed in VALUE_REQUIRED.
+GOD_COMMANDS = {
+    'plague': ('trigger_plague', 5),
+    'drought': ('trigger_drought', 10),
+    'flood': ('trigger_flood', None),
+    'bless': ('grant_blessing', 7),
+    'animal_disease': ('trigger_animal_disease', 7),
+    'plant_blight': ('trigger_plant_blight', 8),
+    'humans': ('set_human_population', None),
+    'animals': ('set_animal_population', None),
+    'plants': ('set_plant_population', None),
+    'rain': ('set_rainfall', None),
+    'food': ('add_food', 10),
+    'knowledge': ('boost_knowledge', 0.5),
+    'farming': ('boost_farming', 1),
+    'cancel': ('cancel_events', None),
+    'schedule': ('schedule_event', None),
+}
+
+# Event type started by each god mode command the schedule command accepts
+SCHEDULE_COMMANDS = {
+    'plague': 'plague',
+    'drought': 'drought',
+    'bless': 'blessing',
+    'animal_disease': 'animal_disease',
+    'plant_blight': 'plant_blight',
+}
+
+# Commands that need a value, with the prompt shown when it is missing
+VALUE_REQUIRED = {
+    'humans': "Please specify a population value",
+    'animals': "Please specify a population value",
+    'plants': "Please specify a population value",
+    'rain': "Please specify a rainfall value (0-100)",
+    'schedule': "Usage: schedule plague|drought|bless|animal_disease|plant_blight <day> [n] [every]",
+}
+
+
+def apply_god_command(ecosystem, command, value=None):
+    """Apply a god mode command by name, using its default argument if value is None
+
+    The schedule command's value is the (event, day, duration, every) arguments of schedule_event.
+    """
+    method_name, default = GOD_COMMANDS[command]
+    method = getattr(ecosystem, method_name)
+    if default is None and command not in VALUE_REQUIRED:
+        value = None
+    else:
+        if value is None:
+            if command in VALUE_REQUIRED:
+                raise ValueError(VALUE_REQUIRED[command])
+            value = default
+        if isinstance(default, float):
+            value = float(value)
+    if ecosystem.replay is not None:
+        ecosystem.replay.record_command(ecosystem.days, command, value)
+    if isinstance(value, (tuple, list)):
+        return method(*value)
+    return method() if value is None else method(value)
+
+
+def simulate_days(ecosystem, days):
+    """Simulate a number of days for the day/week/month commands, then report"""
+    for _ in ecosystem.iter_days(days):
+        pass
+    if ecosystem.humans == 0:
+        print("\nSimulation ended: Human population extinct")
+    
+    # Only show status report at the end, not for each day
+    ecosystem.status_report()
+
+
+# Simulation commands the profile and turbo commands can run, as (days, seasons) per unit
+SIMULATION_UNITS = {
+    'day': (1, 0),
+    'week': (7, 0),
+    'month': (30, 0),
+    'season': (0, 1),
+    'year': (0, 4),
+}
+
+
+def profile_simulation(ecosystem, unit, count):
+    """Simulate count units with events muted and print where the time went"""
+    days, seasons = SIMULATION_UNITS[unit]
+    sink = ecosystem.sink
+    ecosystem.sink = NullSink()
+    ecosystem.profiler = PhaseProfiler()
+    try:
+        for _ in ecosystem.iter_days(days * count or None, seasons * count or None):
+            pass
+        ecosystem.profiler.report()
+    finally:
+        ecosystem.sink = sink
+        ecosystem.profiler = None
+
+
+def turbo_simulation(ecosystem, unit, count):
+    """Fast-forward count units, printing progress every 50 years"""
+    days, seasons = SIMULATION_UNITS[unit]
+    days_per_year = 4 * ecosystem.days_in_season  # A year is four seasons, as for the year command
+    
+    def progress(ecosystem):
+        print(f"  ...year {ecosystem.days // days_per_year}: {ecosystem.humans} humans, "
+              f"{ecosystem.animals} animals, {ecosystem.plants} plants")
+    
+    start = time.perf_counter()
+    simulated = ecosystem.fast_forward(days * count or None, seasons * count or None,
+                                       progress=progress, progress_every=50 * days_per_year)
+    print(f"Fast-forwarded {simulated} days in {time.perf_counter() - start:.2f} seconds")
+
+
+def execute_command(ecosystem, snapshots, command_input):
+    """Run one command line of the interactive simulation, printing its output
+    
+    Returns False once the simulation is over: the user quit or the humans died out.
+    """
+    try:
+        command_input = command_input.strip().lower()
+        
+        # Parse command and arguments
+        parts = command_input.split()
+        if not parts:
+            return True
+            
+        command = parts[0]
+        
+        # Get numeric argument if provided ("profile", "turbo" and "schedule" take a command first)
+        arguments = parts[2:] if command in ("profile", "turbo", "schedule") else parts[1:]
+        value = 1  # Default value if not specified
+        if arguments:
+            try:
+                value = int(arguments[0])
+                if value <= 0 and command not in ['humans', 'animals', 'plants', 'rain']:
+                    print("Please enter a positive number")
+                    return True
+            except ValueError:
+                print(f"Invalid number: {arguments[0]}")
+                return True
+        
+        # Process commands
+        if command == "quit" or command == "exit":
+            print("\nSimulation ended by user")
+            return False
+            
+        elif command == "help":
+            print("\nAVAILABLE COMMANDS:")
+            print("  SIMULATION COMMANDS:")
+            print("  day [n]      - Simulate n days (default: 1)")
+            print("  week [n]     - Simulate n weeks (default: 1)")
+            print("  month [n]    - Simulate n months (default: 1)")
+            print("  season [n]   - Simulate n seasons (default: 1)")
+            print("  year [n]     - Simulate n years (default: 1)")
+            print("  status       - Show current ecosystem status")
+            print("  summary      - Show simulation summary")
+            print("  turbo <cmd> [n]   - Fast-forward quietly, e.g. 'turbo year 500'")
+            print("  profile <cmd> [n] - Simulate quietly, then show time spent in each phase of a day")
+            print("  undo         - Undo the last command")
+            print("  rewind [n]   - Undo the last n commands (default: 1)")
+            print("  help         - Show available commands")
+            print("  quit         - Exit simulation")
+            print("\n  Type 'god_help' to see god mode commands")
+            
+        elif command == "god_help":
+            print("\n  GOD MODE COMMANDS:")
+            print("  plague [n]   - Trigger a plague for n days (default: 5)")
+            print("  drought [n]  - Trigger a drought for n days (default: 10)")
+            print("  flood        - Trigger an immediate flood")
+            print("  bless [n]    - Grant divine blessing for n days (default: 7)")
+            print("  animal_disease [n] - Trigger animal disease for n days (default: 7)")
+            print("  plant_blight [n]   - Trigger plant disease for n days (default: 8)")
+            print("  humans [n]   - Set human population to n")
+            print("  animals [n]  - Set animal population to n")
+            print("  plants [n]   - Set plant population to n")
+            print("  rain [n]     - Set rainfall to n (0-100)")
+            print("  food [n]     - Add n food to storage (default: 10)")
+            print("  knowledge [n]- Boost knowledge by n amount (default: 0.5)")
+            print("  farming [n]  - Boost farming by n levels (default: 1)")
+            print("  cancel       - Cancel all active divine events")
+            print("  schedule <cmd> <day> [n] [every] - Start an event on a later day, e.g. 'schedule drought 400 30'")
+            
+        elif command == "status":
+            ecosystem.status_report()
+            
+        elif command == "summary":
+            ecosystem.summary_report()
+            
+        # GOD MODE COMMANDS
+        elif command == "schedule":
+            event = SCHEDULE_COMMANDS.get(parts[1]) if len(parts) > 1 else None
+            if event is None or len(parts) < 3:
+                print(VALUE_REQUIRED[command])
+                return True
+            extra = [part for part in parts[3:5] if part.isdigit() and int(part) > 0]
+            if len(extra) < len(parts[3:5]):
+                print("Please enter a positive number")
+                return True
+            extra = [int(part) for part in extra]
+            duration = extra[0] if extra else GOD_COMMANDS[parts[1]][1]
+            every = extra[1] if len(extra) > 1 else None
+            snapshots.take(ecosystem, command_input)
+            apply_god_command(ecosystem, command, (event, value, duration, every))
+            
+        elif command in GOD_COMMANDS:
+            if len(parts) > 1:
+                snapshots.take(ecosystem, command_input)
+                apply_god_command(ecosystem, command, value)
+            elif command in VALUE_REQUIRED:
+                print(VALUE_REQUIRED[command])
+            else:
+                snapshots.take(ecosystem, command_input)
+                apply_god_command(ecosystem, command)
+            
+        elif command == "undo" or command == "rewind":
+            steps = value if command == "rewind" else 1
+            if not snapshots:
+                print("Nothing to undo")
+                return True
+            if steps > len(snapshots):
+                print(f"Only {len(snapshots)} command(s) can be undone")
+                return True
+            snapshot = snapshots.rewind(ecosystem, steps)
+            print(f"Rewound to before '{snapshot.label}' (day {snapshot.days})")
+            ecosystem.status_report()
+            
+        elif command == "day":
+            snapshots.take(ecosystem, command_input)
+            print(f"Simulating {value} day(s)...")
+            simulate_days(ecosystem, value)
+            
+        elif command == "week":
+            snapshots.take(ecosystem, command_input)
+            print(f"Simulating {value} week(s) ({value * 7} days)...")
+            simulate_days(ecosystem, value * 7)
+            
+        elif command == "month":
+            snapshots.take(ecosystem, command_input)
+            print(f"Simulating {value} month(s) ({value * 30} days)...")
+            simulate_days(ecosystem, value * 30)
+            
+        elif command == "season":
+            snapshots.take(ecosystem, command_input)
+            print(f"Simulating {value} season(s)...")
+            for _ in ecosystem.iter_days(seasons=value):
+                pass
+            ecosystem.status_report()
+            
+        elif command == "year":
+            snapshots.take(ecosystem, command_input)
+            print(f"Simulating {value} year(s)...")
+            for _ in ecosystem.iter_days(seasons=value * 4):
+                pass
+            ecosystem.status_report()
+            
+        elif command == "turbo":
+            unit = parts[1] if len(parts) > 1 else "year"
+            if unit not in SIMULATION_UNITS:
+                print("Usage: turbo day|week|month|season|year [n]")
+                return True
+            snapshots.take(ecosystem, command_input)
+            print(f"Fast-forwarding {value} {unit}(s) with event messages muted...")
+            turbo_simulation(ecosystem, unit, value)
+            ecosystem.status_report()
+            
+        elif command == "profile":
+            unit = parts[1] if len(parts) > 1 else "day"
+            if unit not in SIMULATION_UNITS:
+                print("Usage: profile day|week|month|season|year [n]")
+                return True
+            snapshots.take(ecosystem, command_input)
+            print(f"Profiling {value} {unit}(s) with event messages muted...")
+            profile_simulation(ecosystem, unit, value)
+            ecosystem.status_report()
+            
         else:
-            print("No active events to cancel.")
+            print(f"Unknown command: {command}. Type 'help' for available commands or 'god_help' for god mode commands.")
+            
+    except Exception as e:
+        print(f"Error: {e}")
+    
+    # Check if humans died out during simulation
+    if ecosystem.humans == 0:
+        print("\nSimulation ended: Human population extinct")
+        return False
+    return True
 
 
-def run_command_based_simulation():
+def run_command_based_simulation(ecosystem=None):
     """Run the ecosystem simulation with flexible command-based control"""
-    ecosystem = SimpleEcosystem()
+    if ecosystem is None:
+        ecosystem = SimpleEcosystem()
+    snapshots = SnapshotRing()  # State before each command, for undo and rewind
     
     print("Starting Command-Based Hunter-Gatherer Ecosystem Simulation with GOD MODE")
     print("\nAVAILABLE COMMANDS:")
@@ -1096,6 +1479,10 @@ def run_command_based_simulation():
     print("  year [n]     - Simulate n years (default: 1)")
     print("  status       - Show current ecosystem status")
     print("  summary      - Show simulation summary")
+    print("  turbo <cmd> [n]   - Fast-forward quietly, e.g. 'turbo year 500'")
+    print("  profile <cmd> [n] - Simulate quietly, then show time spent in each phase of a day")
+    print("  undo         - Undo the last command")
+    print("  rewind [n]   - Undo the last n commands (default: 1)")
     print("  help         - Show available commands")
     print("  quit         - Exit simulation")
     print("\n  GOD MODE COMMANDS:")
@@ -1113,232 +1500,16 @@ def run_command_based_simulation():
     print("  knowledge [n]- Boost knowledge by n amount (default: 0.5)")
     print("  farming [n]  - Boost farming by n levels (default: 1)")
     print("  cancel       - Cancel all active divine events")
+    print("  schedule <cmd> <day> [n] [every] - Start an event on a later day, e.g. 'schedule drought 400 30'")
     print("  god_help     - Show god mode commands")
     ecosystem.status_report()
     
     while True:
         try:
-            # Get user command
-            command_input = input("\nCommand: ").strip().lower()
-            
-            # Parse command and arguments
-            parts = command_input.split()
-            if not parts:
-                continue
-                
-            command = parts[0]
-            
-            # Get numeric argument if provided
-            value = 1  # Default value if not specified
-            if len(parts) > 1:
-                try:
-                    value = int(parts[1])
-                    if value <= 0 and command not in ['humans', 'animals', 'plants', 'rain']:
-                        print("Please enter a positive number")
-                        continue
-                except ValueError:
-                    print(f"Invalid number: {parts[1]}")
-                    continue
-            
-            # Process commands
-            if command == "quit" or command == "exit":
-                print("\nSimulation ended by user")
-                break
-                
-            elif command == "help":
-                print("\nAVAILABLE COMMANDS:")
-                print("  SIMULATION COMMANDS:")
-                print("  day [n]      - Simulate n days (default: 1)")
-                print("  week [n]     - Simulate n weeks (default: 1)")
-                print("  month [n]    - Simulate n months (default: 1)")
-                print("  season [n]   - Simulate n seasons (default: 1)")
-                print("  year [n]     - Simulate n years (default: 1)")
-                print("  status       - Show current ecosystem status")
-                print("  summary      - Show simulation summary")
-                print("  help         - Show available commands")
-                print("  quit         - Exit simulation")
-                print("\n  Type 'god_help' to see god mode commands")
-                
-            elif command == "god_help":
-                print("\n  GOD MODE COMMANDS:")
-                print("  plague [n]   - Trigger a plague for n days (default: 5)")
-                print("  drought [n]  - Trigger a drought for n days (default: 10)")
-                print("  flood        - Trigger an immediate flood")
-                print("  bless [n]    - Grant divine blessing for n days (default: 7)")
-                print("  animal_disease [n] - Trigger animal disease for n days (default: 7)")
-                print("  plant_blight [n]   - Trigger plant disease for n days (default: 8)")
-                print("  humans [n]   - Set human population to n")
-                print("  animals [n]  - Set animal population to n")
-                print("  plants [n]   - Set plant population to n")
-                print("  rain [n]     - Set rainfall to n (0-100)")
-                print("  food [n]     - Add n food to storage (default: 10)")
-                print("  knowledge [n]- Boost knowledge by n amount (default: 0.5)")
-                print("  farming [n]  - Boost farming by n levels (default: 1)")
-                print("  cancel       - Cancel all active divine events")
-                
-            elif command == "status":
-                ecosystem.status_report()
-                
-            elif command == "summary":
-                ecosystem.summary_report()
-                
-            # GOD MODE COMMANDS
-            elif command == "plague":
-                duration = value if len(parts) > 1 else 5  # Default 5 days
-                ecosystem.trigger_plague(duration)
-                
-            elif command == "drought":
-                duration = value if len(parts) > 1 else 10  # Default 10 days
-                ecosystem.trigger_drought(duration)
-                
-            elif command == "flood":
-                ecosystem.trigger_flood()
-                
-            elif command == "bless":
-                duration = value if len(parts) > 1 else 7  # Default 7 days
-                ecosystem.grant_blessing(duration)
-                
-            elif command == "animal_disease":
-                duration = value if len(parts) > 1 else 7  # Default 7 days
-                ecosystem.trigger_animal_disease(duration)
-                
-            elif command == "plant_blight":
-                duration = value if len(parts) > 1 else 8  # Default 8 days
-                ecosystem.trigger_plant_blight(duration)
-                
-            elif command == "humans":
-                if len(parts) > 1:
-                    ecosystem.set_human_population(value)
-                else:
-                    print("Please specify a population value")
-                    
-            elif command == "animals":
-                if len(parts) > 1:
-                    ecosystem.set_animal_population(value)
-                else:
-                    print("Please specify a population value")
-                    
-            elif command == "plants":
-                if len(parts) > 1:
-                    ecosystem.set_plant_population(value)
-                else:
-                    print("Please specify a population value")
-                    
-            elif command == "rain":
-                if len(parts) > 1:
-                    ecosystem.set_rainfall(value)
-                else:
-                    print("Please specify a rainfall value (0-100)")
-                    
-            elif command == "food":
-                amount = value if len(parts) > 1 else 10  # Default 10 units
-                ecosystem.add_food(amount)
-                
-            elif command == "knowledge":
-                amount = float(value) if len(parts) > 1 else 0.5  # Default 0.5
-                ecosystem.boost_knowledge(amount)
-                
-            elif command == "farming":
-                levels = value if len(parts) > 1 else 1  # Default 1 level
-                ecosystem.boost_farming(levels)
-                
-            elif command == "cancel":
-                ecosystem.cancel_events()
-                
-            elif command == "day":
-                days_to_simulate = value
-                print(f"Simulating {days_to_simulate} day(s)...")
-                
-                season_changed = False
-                for _ in range(days_to_simulate):
-                    season_changed_this_update = ecosystem.update()
-                    season_changed = season_changed or season_changed_this_update
-                    
-                    # End simulation if humans die out
-                    if ecosystem.humans == 0:
-                        print("\nSimulation ended: Human population extinct")
-                        break
-                
-                # Only show status report at the end, not for each day
-                ecosystem.status_report()
-                
-            elif command == "week":
-                days_to_simulate = value * 7
-                print(f"Simulating {value} week(s) ({days_to_simulate} days)...")
-                
-                season_changes = 0
-                for _ in range(days_to_simulate):
-                    season_changed = ecosystem.update()
-                    if season_changed:
-                        season_changes += 1
-                        # Don't print status here, as update() already announces season change
-                    
-                    # End simulation if humans die out
-                    if ecosystem.humans == 0:
-                        print("\nSimulation ended: Human population extinct")
-                        break
-                
-                # Only show final status
-                ecosystem.status_report()
-                
-            elif command == "month":
-                days_to_simulate = value * 30
-                print(f"Simulating {value} month(s) ({days_to_simulate} days)...")
-                
-                for _ in range(days_to_simulate):
-                    season_changed = ecosystem.update()
-                    # End simulation if humans die out
-                    if ecosystem.humans == 0:
-                        print("\nSimulation ended: Human population extinct")
-                        break
-                
-                # Only report at the end
-                ecosystem.status_report()
-                
-            elif command == "season":
-                print(f"Simulating {value} season(s)...")
-                
-                seasons_completed = 0
-                current_season = ecosystem.current_season
-                
-                # Continue until we've completed the requested number of seasons
-                while seasons_completed < value and ecosystem.humans > 0:
-                    season_changed = ecosystem.update()
-                    
-                    # Check if season changed
-                    if season_changed:
-                        seasons_completed += 1
-                        # Don't print status here as update() already announces season changes
-                
-                # Final status report after all seasons are done
-                ecosystem.status_report()
-                
-            elif command == "year":
-                print(f"Simulating {value} year(s)...")
-                seasons_per_year = 4
-                seasons_to_simulate = value * seasons_per_year
-                
-                seasons_completed = 0
-                while seasons_completed < seasons_to_simulate and ecosystem.humans > 0:
-                    season_changed = ecosystem.update()
-                    
-                    # Check if season changed
-                    if season_changed:
-                        seasons_completed += 1
-                        # Season change is announced by update()
-                
-                # Final status after completion
-                ecosystem.status_report()
-                
-            else:
-                print(f"Unknown command: {command}. Type 'help' for available commands or 'god_help' for god mode commands.")
-                
-        except Exception as e:
-            print(f"Error: {e}")
-        
-        # Check if humans died out during simulation
-        if ecosystem.humans == 0:
-            print("\nSimulation ended: Human population extinct")
+            command_input = input("\nCommand: ")
+        except EOFError:
+            command_input = "quit"
+        if not execute_command(ecosystem, snapshots, command_input):
             break
     
     # Final summary at the end
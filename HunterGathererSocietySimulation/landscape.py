@@ -0,0 +1,301 @@
+"""A gridded landscape of plant biomass and animal density around a settlement.
+
+    landscape = Landscape.attach(ecosystem, 1000, 1000)
+
+Without a landscape, plants and animals are two counts capped at 500 and 200.
+An attached Landscape gives every cell of a width x height raster its own
+plant biomass and animal density, and a day is a fixed number of whole-array
+operations however large the grid:
+
+- Rainfall is a field: the ecosystem's rainfall plus a smooth regional
+  anomaly that drifts with the wind. Plant growth in each cell uses
+  get_plant_growth_modifier() at that cell's rainfall, so the season,
+  rainfall, blessing and blight modifiers are the ecosystem's own (looked up
+  from a table of the 101 possible rainfalls).
+- Plants grow up to a per-cell capacity, and animals graze the plants of
+  their own cell and breed with the season's animal modifier, up to theirs.
+- Animals move by diffusion and by advection up the plant gradient, a
+  five-point stencil applied as fluxes between neighboring cells, so they
+  are conserved.
+- The settlement's gathering and hunting come out of the cells within
+  `radius` of it, in proportion to what each holds.
+
+The ecosystem's plants and animals counts become the totals within the
+settlement's reach, so the rest of the model sees its local land. Changes to
+the counts from outside the landscape (god commands, events, conservation)
+are spread over the same cells before the day's gathering and hunting. Checkpoints and replay
+logs keep the counts but not the landscape; undo snapshots keep its grids.
+
+From the command line, to time a day:
+
+    python landscape.py --size 1000 --days 120
+"""
+import argparse
+import time
+
+import numpy as np
+
+from events import NullSink
+from huntergathersim import SimpleEcosystem
+
+# With the default radius of 8 cells, a settlement's reach holds at most about
+# the 500 plants and 200 animals of the plain model
+PLANT_CAPACITY = 2.5    # Plants a cell supports
+ANIMAL_CAPACITY = 1.0   # Animals a cell supports
+SEED_BANK = 0.04        # Share of a cell's plant capacity that grazing and harvest never take
+DIFFUSION = 0.05        # Share of a cell's animals wandering to each neighbor per day
+ADVECTION = 0.1         # Largest share drawn to each neighbor by richer plants per day
+STARVATION = 0.05       # Share of hungry animals dying per day
+RAIN_VARIATION = 20     # Standard deviation of the regional rainfall anomaly
+RAIN_SCALE = 100        # Cells per feature of the rainfall anomaly
+WIND = 0.5              # Cells per day the rainfall anomaly drifts east
+
+
+def _smooth_field(rng, height, width, scale):
+    """Standard normal noise smoothed over about `scale` cells, periodic in x"""
+    rows = max(2, round(height / scale))
+    cols = max(2, round(width / scale))
+    coarse = rng.standard_normal((rows + 1, cols + 1))
+    coarse[:, -1] = coarse[:, 0]  # Wrap around east-west, as the field drifts
+    y = np.linspace(0, rows, height, endpoint=False)
+    x = np.linspace(0, cols, width, endpoint=False)
+    y0 = y.astype(np.int64)
+    x0 = x.astype(np.int64)
+    fy = (y - y0)[:, None]
+    fx = (x - x0)[None, :]
+    # Bilinear interpolation of the coarse grid
+    top = coarse[y0][:, x0] * (1 - fx) + coarse[y0][:, x0 + 1] * fx
+    bottom = coarse[y0 + 1][:, x0] * (1 - fx) + coarse[y0 + 1][:, x0 + 1] * fx
+    field = top * (1 - fy) + bottom * fy
+    # C order, as the landscape's grids are derived from it and flattened in place
+    return np.ascontiguousarray(field / field.std())
+
+
+class Landscape:
+    """Plant biomass and animal density per cell, with the settlement at (x, y)
+
+    radius: cells from the settlement its people gather and hunt in
+    """
+    def __init__(self, width=1000, height=1000, x=None, y=None, radius=8, seed=None):
+        rng = np.random.default_rng(seed)
+        self.width = width
+        self.height = height
+        self.x = width // 2 if x is None else x
+        self.y = height // 2 if y is None else y
+        self.radius = radius
+        self.rain_anomaly = (RAIN_VARIATION * _smooth_field(rng, height, width, RAIN_SCALE)).astype(np.float32)
+        self.wind_offset = 0.0
+        wetness = np.clip(0.5 + self.rain_anomaly / 100, 0.1, 1.0)
+        self.plants = (PLANT_CAPACITY * wetness).astype(np.float32)
+        self.animals = (ANIMAL_CAPACITY * wetness).astype(np.float32)
+        self.rainfall = None  # The ecosystem's rainfall of the last day stepped
+        self._allocate()
+
+        # The settlement's reach: a window of the grid and the disk inside it
+        top, bottom = max(0, self.y - radius), min(height, self.y + radius + 1)
+        left, right = max(0, self.x - radius), min(width, self.x + radius + 1)
+        self.reach = (slice(top, bottom), slice(left, right))
+        rows, cols = np.ogrid[top:bottom, left:right]
+        self.disk = (rows - self.y) ** 2 + (cols - self.x) ** 2 <= radius * radius
+        self.local = self.local_totals()  # The counts last given to the ecosystem
+
+    def _allocate(self):
+        height, width = self.height, self.width
+        self.rain = np.empty((height, width), dtype=np.float32)  # Today's rainfall field
+        # Buffers reused every day, so a day allocates no arrays
+        self._rain_index = np.empty((height, width), dtype=np.uint8)
+        self._cells = [np.empty((height, width), dtype=np.float32) for _ in range(3)]
+        self._faces = {offset: [np.empty(height * width - offset, dtype=np.float32) for _ in range(3)]
+                       for offset in (1, width)}
+
+    def __deepcopy__(self, memo):
+        """Copy the plants and animals only; the rainfall anomaly and reach never change and are shared
+
+        Undo snapshots the ecosystem before every command, so this keeps a
+        snapshot of a large landscape to its two grids: the copy allocates its
+        rainfall field and buffers when it is next used.
+        """
+        landscape = object.__new__(type(self))
+        memo[id(self)] = landscape
+        vars(landscape).update(vars(self))
+        landscape.plants = self.plants.copy()
+        landscape.animals = self.animals.copy()
+        landscape.rain = landscape._rain_index = landscape._cells = landscape._faces = None
+        return landscape
+
+    @classmethod
+    def attach(cls, ecosystem, width=1000, height=1000, radius=8, seed=None):
+        """Put the ecosystem on a new landscape, taking its plants and animals counts from it
+
+        seed defaults to one drawn from a stream spawned off the ecosystem's, so
+        seeded runs stay reproducible.
+        """
+        if seed is None:
+            seed = ecosystem.rng.spawn(1)[0].getrandbits(128)
+        landscape = cls(width, height, radius=radius, seed=seed)
+        ecosystem.landscape = landscape
+        ecosystem.plants, ecosystem.animals = landscape.local
+        return landscape
+
+    # The settlement's reach
+
+    def local_totals(self):
+        """Plants and animals within reach of the settlement, as whole counts"""
+        return (int(self.plants[self.reach].sum(where=self.disk)),
+                int(self.animals[self.reach].sum(where=self.disk)))
+
+    def _set_local(self, grid, total, floor=0.0):
+        """Scale the cells within reach so they hold total, keeping each at floor or above"""
+        cells = grid[self.reach]
+        spare = np.maximum(cells[self.disk] - floor, 0)
+        target = max(0.0, total - floor * len(spare))
+        current = float(spare.sum())
+        if current > 0:
+            spare *= target / current
+        else:
+            spare[:] = target / len(spare)
+        cells[self.disk] = spare + floor
+
+    def sync(self, ecosystem):
+        """Spread changes made to the ecosystem's counts since the last day over the cells within reach"""
+        plants, animals = self.local
+        if ecosystem.plants != plants:
+            self._set_local(self.plants, ecosystem.plants, SEED_BANK * PLANT_CAPACITY)
+        if ecosystem.animals != animals:
+            self._set_local(self.animals, ecosystem.animals)
+        self.local = (ecosystem.plants, ecosystem.animals)
+
+    # Daily life
+
+    def update_rain(self, rainfall):
+        """The rainfall field of a day: the ecosystem's rainfall plus the drifting regional anomaly"""
+        self.wind_offset = (self.wind_offset + WIND) % self.width
+        self.rainfall = rainfall
+        return self._fill_rain()
+
+    def _fill_rain(self):
+        shift = int(self.wind_offset)
+        anomaly, rain = self.rain_anomaly, self.rain
+        np.add(anomaly[:, :self.width - shift], self.rainfall, out=rain[:, shift:])
+        np.add(anomaly[:, self.width - shift:], self.rainfall, out=rain[:, :shift])
+        np.clip(rain, 0, 100, out=rain)
+        return rain
+
+    def _move_animals(self, offset):
+        """Exchange animals between neighbors `offset` cells apart in the flattened grid
+
+        An offset of 1 moves them east-west and one of width north-south; the
+        faces between the end of one row and the start of the next carry nothing.
+        """
+        animals, plants = self.animals.reshape(-1), self.plants.reshape(-1)
+        flux, low_weight, high_weight = self._faces[offset]
+        low, high = slice(None, -offset), slice(offset, None)
+        # Drift towards the side of each face with more plants, at most ADVECTION
+        drift = np.subtract(plants[high], plants[low], out=flux)
+        drift *= ADVECTION / PLANT_CAPACITY
+        np.clip(drift, -ADVECTION, ADVECTION, out=drift)
+        # Shares of the animals on either side crossing the face: diffusion both
+        # ways, and drift from the side the animals leave (upwind)
+        np.maximum(drift, 0, out=low_weight)
+        low_weight += DIFFUSION
+        np.minimum(drift, 0, out=high_weight)
+        high_weight -= DIFFUSION
+        # Net flux from the low to the high side
+        np.multiply(animals[low], low_weight, out=flux)
+        high_weight *= animals[high]
+        flux += high_weight
+        if offset == 1:
+            flux[self.width - 1::self.width] = 0
+        animals[low] -= flux
+        animals[high] += flux
+
+    def step(self, ecosystem):
+        """Grow plants, graze, breed and move animals for one day of the ecosystem"""
+        if self._cells is None:  # A copy not stepped since it was made
+            self._allocate()
+        plants, animals = self.plants, self.animals
+        growth, scratch, demand = self._cells
+        rain = self.update_rain(ecosystem.rainfall)
+
+        # Plant growth: the ecosystem's growth rate and modifier at each cell's
+        # rainfall, up to the cell's capacity
+        table = np.array([1 + ecosystem.plant_growth_rate * ecosystem.get_plant_growth_modifier(rainfall)
+                          for rainfall in range(101)], dtype=np.float32)
+        np.copyto(self._rain_index, rain, casting='unsafe')
+        plants *= table.take(self._rain_index, out=growth)
+        np.minimum(plants, PLANT_CAPACITY, out=plants)
+
+        # Grazing: animals eat the plants of their cell, above the seed bank
+        np.multiply(animals, ecosystem.animal_plant_consumption, out=demand)
+        np.subtract(plants, SEED_BANK * PLANT_CAPACITY, out=scratch)
+        np.maximum(scratch, 0, out=scratch)
+        eaten = np.minimum(demand, scratch, out=scratch)
+        plants -= eaten
+        demand += 1e-9
+        fed = np.divide(eaten, demand, out=demand)  # Share of their needs met
+
+        # Breeding, slowed by hunger and animal disease, up to the cell's
+        # capacity; starvation takes a share of the hungry
+        rate = ecosystem.animal_reproduction_rate * ecosystem.season_animal_modifiers[ecosystem.seasons[ecosystem.current_season]]
+        if ecosystem.active_events['animal_disease'] > 0:
+            rate *= 0.3
+        change = np.multiply(fed, rate + STARVATION, out=growth)
+        change += 1 - STARVATION
+        animals *= change
+        np.minimum(animals, ANIMAL_CAPACITY, out=animals)
+
+        # Movement
+        self._move_animals(1)
+        self._move_animals(self.width)
+
+    def day(self, ecosystem, plants_taken, animals_taken):
+        """Take the settlement's harvest from the cells within reach and step the landscape a day
+
+        Returns the plants and animals now within reach, for the ecosystem's counts.
+        """
+        plants, animals = self.local
+        if plants_taken:
+            self._set_local(self.plants, plants - plants_taken, SEED_BANK * PLANT_CAPACITY)
+        if animals_taken:
+            self._set_local(self.animals, animals - animals_taken)
+        self.step(ecosystem)
+        self.local = self.local_totals()
+        return self.local
+
+    def totals(self):
+        """Plants and animals over the whole landscape"""
+        return float(self.plants.sum(dtype=np.float64)), float(self.animals.sum(dtype=np.float64))
+
+    def summary(self):
+        """One line describing the landscape, for status reports"""
+        plants, animals = self.totals()
+        if self.rain is None:  # A copy not stepped since it was made
+            self._allocate()
+            if self.rainfall is not None:
+                self._fill_rain()
+        return (f"Landscape: {self.width}x{self.height} cells, {plants:,.0f} plants and {animals:,.0f} animals, "
+                f"rainfall {self.rain.min():.0f}-{self.rain.max():.0f} across the region")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a settlement on a gridded landscape")
+    parser.add_argument('--size', type=int, default=1000, help="cells along each side of the grid")
+    parser.add_argument('--days', type=int, default=120, help="days to simulate")
+    parser.add_argument('--radius', type=int, default=8, help="cells from the settlement its people reach")
+    parser.add_argument('--seed', type=int, help="seed for a reproducible run")
+    args = parser.parse_args()
+
+    ecosystem = SimpleEcosystem(sink=NullSink(), seed=args.seed)
+    landscape = Landscape.attach(ecosystem, args.size, args.size, args.radius)
+    began = time.perf_counter()
+    for _ in range(args.days):
+        ecosystem.update()
+    seconds = time.perf_counter() - began
+    print(f"{args.days} days of a {args.size}x{args.size} landscape in {seconds:.1f} seconds "
+          f"({1000 * seconds / args.days:.1f} ms per day)")
+    print(f"Humans: {ecosystem.humans}, plants within reach: {ecosystem.plants}, animals within reach: {ecosystem.animals}")
+    print(landscape.summary())
+
+
+if __name__ == "__main__":
+    main()
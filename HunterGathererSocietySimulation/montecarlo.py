@@ -0,0 +1,263 @@
+"""Monte Carlo runner for SimpleEcosystem.
+
+Runs many independent simulations across all cores with a process pool and
+aggregates the outcomes: extinction probability, human population quantiles by
+day, and the distributions of total_migrations and sister_settlements.
+
+An optional god mode script applies interventions on given days. Each line is
+"day command [value]" using the interactive god mode commands, or
+"day schedule event start [n] [every]" as in the interactive schedule
+command, for example:
+
+    # plague in the first winter, then a blessing, and a drought every year from day 400
+    90 plague 10
+    120 bless
+    120 schedule drought 400 30 360
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from events import NullSink
+from huntergathersim import GOD_COMMANDS, SCHEDULE_COMMANDS, VALUE_REQUIRED, SimpleEcosystem, apply_god_command
+from rng import RandomStream
+
+MAX_HUMANS = 100  # The default carrying_capacity, which the batches' ecosystems all use
+QUANTILES = (5, 25, 50, 75, 95)
+
+
+def _parse_value(text, command, number):
+    """A script value, a float for commands whose default is one (such as knowledge) and an int otherwise"""
+    kind = float if isinstance(GOD_COMMANDS[command][1], float) else int
+    try:
+        return kind(text)
+    except ValueError:
+        raise ValueError(f"Script line {number}: invalid value '{text}' for {command}") from None
+
+
+def _parse_schedule(arguments, number):
+    """The schedule_event arguments (event, start day, duration, every) of 'schedule event start [n] [every]'"""
+    event = SCHEDULE_COMMANDS.get(arguments[0].lower()) if arguments else None
+    if event is None or not 2 <= len(arguments) <= 4:
+        raise ValueError(f"Script line {number}: {VALUE_REQUIRED['schedule']}")
+    try:
+        numbers = [int(argument) for argument in arguments[1:]]
+    except ValueError:
+        raise ValueError(f"Script line {number}: {VALUE_REQUIRED['schedule']}") from None
+    if min(numbers) < 1:
+        raise ValueError(f"Script line {number}: schedule takes positive numbers")
+    duration = numbers[1] if len(numbers) > 1 else GOD_COMMANDS[arguments[0].lower()][1]
+    every = numbers[2] if len(numbers) > 2 else None
+    return event, numbers[0], duration, every
+
+
+def parse_script(lines):
+    """Parse god mode script lines into a sorted list of (day, command, value)
+
+    The value of a schedule line is the (event, start, duration, every) arguments of schedule_event.
+    """
+    script = []
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        if len(parts) > 1 and parts[1].lower() == 'schedule':
+            script.append((int(parts[0]), 'schedule', _parse_schedule(parts[2:], number)))
+            continue
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Script line {number}: expected 'day command [value]'")
+        day, command = int(parts[0]), parts[1].lower()
+        if command not in GOD_COMMANDS:
+            raise ValueError(f"Script line {number}: unknown command '{command}'")
+        value = _parse_value(parts[2], command, number) if len(parts) == 3 else None
+        if value is None and command in VALUE_REQUIRED:
+            raise ValueError(f"Script line {number}: {VALUE_REQUIRED[command]}")
+        script.append((day, command, value))
+    script.sort(key=lambda entry: entry[0])
+    return script
+
+
+def load_script(path):
+    """Read a god mode script file"""
+    with open(path) as f:
+        return parse_script(f)
+
+
+def run_once(days, script=(), seed=None, params=None):
+    """Run one simulation and return the ecosystem and its daily human counts"""
+    ecosystem = SimpleEcosystem(sink=NullSink(), seed=seed, params=params)
+    pending = list(script)
+    humans = []
+    for _ in range(days):
+        while pending and pending[0][0] <= ecosystem.days:
+            _, command, value = pending.pop(0)
+            apply_god_command(ecosystem, command, value)
+        ecosystem.update()
+        humans.append(ecosystem.humans)
+        if ecosystem.humans == 0:
+            break
+    return ecosystem, humans
+
+
+def _run_chunk(days, script, entropy, runs):
+    """Worker: run a chunk of simulations and return mergeable partial results
+
+    Run i uses the stream RandomStream(entropy).spawn() would give as child i,
+    rebuilt here so that only the master entropy crosses the process boundary.
+    """
+    histograms = [[0] * (MAX_HUMANS + 1) for _ in range(days)]
+    extinctions = 0
+    migrations = []
+    settlements = []
+    for run in runs:
+        ecosystem, humans = run_once(days, script, RandomStream(entropy, (run,)))
+        for day, count in enumerate(humans):
+            histograms[day][count] += 1
+        # An extinct population stays at zero for the rest of the run
+        for day in range(len(humans), days):
+            histograms[day][0] += 1
+        if ecosystem.humans == 0:
+            extinctions += 1
+        migrations.append(ecosystem.total_migrations)
+        settlements.append(ecosystem.sister_settlements)
+    return histograms, extinctions, migrations, settlements
+
+
+def _histogram_quantile(histogram, total, q):
+    """Value at percentile q of a population histogram"""
+    target = q / 100 * (total - 1)
+    seen = 0
+    for value, count in enumerate(histogram):
+        seen += count
+        if seen > target:
+            return value
+    return len(histogram) - 1
+
+
+def _describe(values):
+    """Mean, min, max and quantiles of a list of numbers"""
+    ordered = sorted(values)
+    n = len(ordered)
+    stats = {
+        'mean': sum(ordered) / n,
+        'min': ordered[0],
+        'max': ordered[-1],
+    }
+    for q in QUANTILES:
+        stats[f'p{q}'] = ordered[round(q / 100 * (n - 1))]
+    return stats
+
+
+class MonteCarloResult:
+    """Aggregated outcomes of a Monte Carlo batch"""
+    def __init__(self, runs, days, histograms, extinctions, migrations, settlements, seed=None):
+        self.runs = runs
+        self.seed = seed  # master seed, enough to reproduce the batch
+        self.days = days
+        self.histograms = histograms  # histograms[day][humans] = number of runs
+        self.extinctions = extinctions
+        self.migrations = migrations
+        self.settlements = settlements
+
+    @property
+    def extinction_probability(self):
+        return self.extinctions / self.runs
+
+    def population_quantiles(self, quantiles=QUANTILES):
+        """Human population quantiles by day, as {q: [value per day]}"""
+        return {q: [_histogram_quantile(histogram, self.runs, q) for histogram in self.histograms]
+                for q in quantiles}
+
+    def mean_population(self):
+        """Mean human population by day"""
+        return [sum(value * count for value, count in enumerate(histogram)) / self.runs
+                for histogram in self.histograms]
+
+    def migration_stats(self):
+        return _describe(self.migrations)
+
+    def settlement_stats(self):
+        return _describe(self.settlements)
+
+    def report(self, every=30):
+        """Print a summary of the batch"""
+        print(f"\n===== MONTE CARLO: {self.runs} runs of {self.days} days =====")
+        print(f"Seed: {self.seed}")
+        print(f"Extinction probability: {self.extinction_probability:.1%} ({self.extinctions}/{self.runs})")
+
+        print("\nHuman population quantiles by day:")
+        quantiles = self.population_quantiles()
+        print("  Day  " + "".join(f"{'p' + str(q):>6}" for q in QUANTILES))
+        days = list(range(every - 1, self.days, every))
+        if not days or days[-1] != self.days - 1:
+            days.append(self.days - 1)
+        for day in days:
+            print(f"{day + 1:>5}  " + "".join(f"{quantiles[q][day]:>6}" for q in QUANTILES))
+
+        for name, stats in (("Total migrations", self.migration_stats()),
+                            ("Sister settlements", self.settlement_stats())):
+            print(f"\n{name}: mean {stats['mean']:.1f}, min {stats['min']}, max {stats['max']}")
+            print("  " + ", ".join(f"p{q} {stats[f'p{q}']}" for q in QUANTILES))
+
+
+def run_monte_carlo(runs, days, script=(), seed=None, processes=None):
+    """Run independent simulations in parallel and aggregate their outcomes
+
+    Every run gets its own independent substream of a master RandomStream, so
+    a batch is reproducible for a given seed regardless of the number of
+    processes. Without a seed, fresh entropy is used and recorded on the result.
+    """
+    if runs < 1:
+        raise ValueError("runs must be at least 1")
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    if isinstance(script, str):
+        script = parse_script(script.splitlines())
+    entropy = RandomStream(seed).entropy
+
+    processes = processes or os.cpu_count() or 1
+    chunk_count = min(runs, processes * 4)
+    chunks = [range(i, runs, chunk_count) for i in range(chunk_count)]
+
+    if processes == 1:
+        partials = [_run_chunk(days, script, entropy, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            partials = list(pool.map(_run_chunk, [days] * len(chunks), [script] * len(chunks),
+                                     [entropy] * len(chunks), chunks))
+
+    histograms = [[0] * (MAX_HUMANS + 1) for _ in range(days)]
+    extinctions = 0
+    migrations = []
+    settlements = []
+    for chunk_histograms, chunk_extinctions, chunk_migrations, chunk_settlements in partials:
+        for total, partial in zip(histograms, chunk_histograms):
+            for value, count in enumerate(partial):
+                total[value] += count
+        extinctions += chunk_extinctions
+        migrations.extend(chunk_migrations)
+        settlements.extend(chunk_settlements)
+    return MonteCarloResult(runs, days, histograms, extinctions, migrations, settlements, entropy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many hunter-gatherer simulations in parallel")
+    parser.add_argument('--runs', type=int, default=1000, help="number of simulations")
+    parser.add_argument('--days', type=int, default=360, help="days per simulation")
+    parser.add_argument('--script', help="god mode script file with 'day command [value]' lines")
+    parser.add_argument('--seed', type=int, help="master seed for reproducible batches")
+    parser.add_argument('--processes', type=int, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+    if args.days < 1:
+        parser.error("--days must be at least 1")
+
+    script = load_script(args.script) if args.script else ()
+    result = run_monte_carlo(args.runs, args.days, script, args.seed, args.processes)
+    result.report()
+
+
+if __name__ == "__main__":
+    main()
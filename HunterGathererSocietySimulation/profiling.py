@@ -0,0 +1,70 @@
+"""Per-phase timing of SimpleEcosystem.update().
+
+Attach a PhaseProfiler to an ecosystem to time each phase of a day:
+
+    ecosystem.profiler = PhaseProfiler()
+    ...
+    ecosystem.profiler.report()
+
+update() only checks `self.profiler is not None` between phases, so leaving
+profiling off costs next to nothing.
+"""
+from time import perf_counter_ns
+
+# Phases of a day, in the order update() runs them
+PHASES = (
+    'process_active_events',
+    'update_season',
+    'update_rainfall',
+    'growth_modifiers',
+    'conservation',
+    'consumption_hunting',
+    'storage',
+    'trading',
+    'population_change',
+    'trigger_migration',
+    'sister_settlement_interaction',
+    'carrying_capacity',
+    'history',
+)
+
+
+class PhaseProfiler:
+    """Accumulates call counts and nanosecond totals per phase"""
+    def __init__(self):
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.totals_ns = dict.fromkeys(PHASES, 0)
+        self._last = 0
+
+    def start(self):
+        """Mark the start of a day"""
+        self._last = perf_counter_ns()
+
+    def lap(self, phase):
+        """Charge the time since the previous mark to a phase"""
+        now = perf_counter_ns()
+        self.counts[phase] += 1
+        self.totals_ns[phase] += now - self._last
+        self._last = now
+
+    def reset(self):
+        for phase in PHASES:
+            self.counts[phase] = 0
+            self.totals_ns[phase] = 0
+
+    @property
+    def total_ns(self):
+        return sum(self.totals_ns.values())
+
+    def report(self):
+        """Print the time spent in each phase"""
+        total = self.total_ns
+        days = self.counts[PHASES[0]]
+        print(f"\n===== PHASE PROFILE: {days} days, {total / 1e6:.1f} ms in update() =====")
+        print(f"{'Phase':<32}{'Calls':>8}{'Total ms':>11}{'ns/call':>10}{'Share':>8}")
+        for phase in PHASES:
+            count = self.counts[phase]
+            phase_total = self.totals_ns[phase]
+            per_call = phase_total / count if count else 0
+            share = phase_total / total if total else 0
+            print(f"{phase:<32}{count:>8}{phase_total / 1e6:>11.2f}{per_call:>10.0f}{share:>8.1%}")
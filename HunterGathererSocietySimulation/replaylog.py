@@ -0,0 +1,299 @@
+"""Deterministic replay logs for reproducing and bisecting runs.
+
+A ReplayLog attached to an ecosystem records every god mode command applied
+with apply_god_command, with its day, and a checkpoint every `every` days.
+All randomness comes from the ecosystem's random stream, which checkpoints
+capture, so that is enough to rebuild the state on any day: restore the
+nearest earlier checkpoint and simulate forward, reapplying the commands.
+
+    log = ReplayLog.attach(ecosystem, every=3600)
+    ...
+    log.save('run.replay')
+
+    log = ReplayLog.load('run.replay')
+    ecosystem = log.replay_to(123456)
+    first_divergence(log, ReplayLog.load('other.replay'))
+
+Checkpoints in the log leave out the history, so a replayed ecosystem's
+history starts at the checkpoint it was restored from. From the command line:
+
+    python replaylog.py record run.replay --seed 7
+    python replaylog.py replay run.replay 123456
+    python replaylog.py verify run.replay
+    python replaylog.py diff run.replay other.replay
+"""
+import argparse
+import json
+import struct
+import zlib
+from bisect import bisect_right
+
+import checkpoint
+from events import NullSink
+from huntergathersim import SimpleEcosystem, apply_god_command, run_command_based_simulation
+
+MAGIC = b'HGRP'
+FORMAT_VERSION = 1
+
+# Magic, version, checkpoint interval, last day, command count, checkpoint count
+_HEADER = struct.Struct('<4sHqqII')
+_LENGTH = struct.Struct('<I')
+_CHECKPOINT = struct.Struct('<qI')  # Day, compressed size
+
+
+class ReplayError(ValueError):
+    """The data is not a replay log this version can read"""
+
+
+class ReplayLog:
+    """God mode commands by day and periodic checkpoints of one run
+
+    every: days between checkpoints
+    level: zlib compression level of the checkpoints
+    """
+    def __init__(self, every=3600, level=6):
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.every = every
+        self.level = level
+        self.commands = []     # (day, command, value), in the order applied
+        self.checkpoints = {}  # Day -> compressed state at the start of that day, in day order
+        self.last_day = 0      # Days simulated when the log was last told about one
+
+    @classmethod
+    def attach(cls, ecosystem, every=3600, level=6):
+        """Start logging an ecosystem from its current state"""
+        log = cls(every, level)
+        log.take_checkpoint(ecosystem)
+        ecosystem.replay = log
+        return log
+
+    def take_checkpoint(self, ecosystem):
+        state = checkpoint.dumps(ecosystem, history=False)
+        self.checkpoints[ecosystem.days] = zlib.compress(state, self.level)
+        self.last_day = ecosystem.days
+
+    def record_command(self, day, command, value):
+        self.commands.append((day, command, value))
+
+    def day_finished(self, ecosystem):
+        self.last_day = ecosystem.days
+        if ecosystem.days % self.every == 0:
+            self.take_checkpoint(ecosystem)
+
+    def rewind(self, day, commands):
+        """Forget what was logged after a run was rewound to day, keeping the first `commands` commands"""
+        del self.commands[commands:]
+        for later in [checkpoint_day for checkpoint_day in self.checkpoints if checkpoint_day > day]:
+            del self.checkpoints[later]
+        self.last_day = day
+
+    # Replaying
+
+    def checkpoint_day(self, day):
+        """Day of the latest checkpoint at or before day"""
+        days = list(self.checkpoints)
+        index = bisect_right(days, day) - 1
+        if index < 0:
+            raise ValueError(f"the log starts after day {day}")
+        return days[index]
+
+    def restore(self, day, sink=None):
+        """The ecosystem saved in the checkpoint for day"""
+        return checkpoint.loads(zlib.decompress(self.checkpoints[day]), NullSink() if sink is None else sink)
+
+    def states(self, start, stop, sink=None):
+        """Yield one ecosystem at the start of each day from start to stop, before that day's commands
+
+        start must be a checkpoint day. The same ecosystem object is yielded
+        each time, advanced by a day.
+        """
+        ecosystem = self.restore(start, sink)
+        commands = [entry for entry in self.commands if start <= entry[0] < stop]
+        position = 0
+        while True:
+            yield ecosystem
+            if ecosystem.days >= stop:
+                return
+            while position < len(commands) and commands[position][0] <= ecosystem.days:
+                _, command, value = commands[position]
+                apply_god_command(ecosystem, command, value)
+                position += 1
+            ecosystem.update()
+
+    def verify(self):
+        """First checkpoint day that replaying from the previous checkpoint does not reproduce, or None"""
+        days = list(self.checkpoints)
+        for start, stop in zip(days, days[1:]):
+            for ecosystem in self.states(start, stop):
+                pass
+            if _state(ecosystem) != zlib.decompress(self.checkpoints[stop]):
+                return stop
+        return None
+
+    def replay_to(self, day, sink=None):
+        """Rebuild the ecosystem at the start of day, before that day's commands"""
+        if day > self.last_day:
+            raise ValueError(f"the log ends at day {self.last_day}")
+        for ecosystem in self.states(self.checkpoint_day(day), day, sink):
+            pass
+        return ecosystem
+
+    # Serialization
+
+    def dumps(self):
+        commands = json.dumps(self.commands).encode()
+        parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, self.every, self.last_day,
+                              len(self.commands), len(self.checkpoints)),
+                 _LENGTH.pack(len(commands)), commands]
+        for day, data in self.checkpoints.items():
+            parts.append(_CHECKPOINT.pack(day, len(data)))
+            parts.append(data)
+        return b''.join(parts)
+
+    @classmethod
+    def loads(cls, data):
+        if len(data) < _HEADER.size:
+            raise ReplayError("data is too short to be a replay log")
+        magic, version, every, last_day, _, checkpoints = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("not a replay log")
+        if version != FORMAT_VERSION:
+            raise ReplayError(f"unsupported replay log format version {version}")
+        log = cls(every)
+        log.last_day = last_day
+        offset = _HEADER.size
+        (size,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        log.commands = [tuple(entry) for entry in json.loads(bytes(data[offset:offset + size]))]
+        offset += size
+        for _ in range(checkpoints):
+            day, size = _CHECKPOINT.unpack_from(data, offset)
+            offset += _CHECKPOINT.size
+            log.checkpoints[day] = bytes(data[offset:offset + size])
+            offset += size
+        if offset > len(data):
+            raise ReplayError("replay log is truncated")
+        return log
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.loads(f.read())
+
+
+def _state(ecosystem):
+    # Everything that determines the future except the history
+    return checkpoint.dumps(ecosystem, history=False)
+
+
+def first_command_difference(first, second):
+    """Index of the first command the two logs disagree on, or None"""
+    for index, (a, b) in enumerate(zip(first.commands, second.commands)):
+        if a != b:
+            return index
+    if len(first.commands) != len(second.commands):
+        return min(len(first.commands), len(second.commands))
+    return None
+
+
+def first_divergence(first, second):
+    """First day whose starting state differs between two logged runs, or None if they agree
+
+    Days are compared up to the end of the shorter log. Checkpoints on days
+    both logs have are bisected first, assuming runs stay apart once they
+    diverge, then both runs are replayed a day at a time from the last
+    matching checkpoint. If the replays agree but the next logged checkpoints
+    do not, the runs differ in something the logs do not capture (the code,
+    or state changed without a god mode command), and the day of the first
+    differing checkpoint is returned.
+    """
+    end = min(first.last_day, second.last_day)
+    common = sorted(day for day in first.checkpoints if day in second.checkpoints and day <= end)
+    if not common:
+        raise ValueError("the logs have no checkpoint day in common")
+
+    def same(day):
+        return zlib.decompress(first.checkpoints[day]) == zlib.decompress(second.checkpoints[day])
+
+    if not same(common[0]):
+        return common[0]
+    # common[low] matches; common[high] differs, if high is in range
+    low, high = 0, len(common)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if same(common[middle]):
+            low = middle
+        else:
+            high = middle
+    start = common[low]
+    stop = common[high] if high < len(common) else end
+    for a, b in zip(first.states(start, stop), second.states(start, stop)):
+        if _state(a) != _state(b):
+            return a.days
+    return stop if high < len(common) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, replay and compare simulation runs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="run the interactive simulation and log it")
+    record.add_argument('path')
+    record.add_argument('--seed', type=int, help="random seed (default: fresh entropy)")
+    record.add_argument('--every', type=int, default=3600, help="days between checkpoints")
+    replay = commands.add_parser('replay', help="rebuild a logged run on a given day and show its status")
+    replay.add_argument('path')
+    replay.add_argument('day', type=int)
+    replay.add_argument('--summary', action='store_true', help="also show the summary report")
+    show = commands.add_parser('show', help="list the commands and checkpoints in a log")
+    show.add_argument('path')
+    verify = commands.add_parser('verify', help="check that a log replays to its own checkpoints")
+    verify.add_argument('path')
+    diff = commands.add_parser('diff', help="find the first day two logged runs diverge")
+    diff.add_argument('first')
+    diff.add_argument('second')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        ecosystem = SimpleEcosystem(seed=args.seed)
+        log = ReplayLog.attach(ecosystem, args.every)
+        try:
+            run_command_based_simulation(ecosystem)
+        finally:
+            log.save(args.path)
+            print(f"Replay log saved to {args.path} ({log.last_day} days, {len(log.commands)} commands)")
+    elif args.command == 'replay':
+        ecosystem = ReplayLog.load(args.path).replay_to(args.day)
+        ecosystem.status_report()
+        if args.summary:
+            ecosystem.summary_report()
+    elif args.command == 'show':
+        log = ReplayLog.load(args.path)
+        print(f"{log.last_day} days, checkpoints every {log.every} days on {len(log.checkpoints)} days")
+        for day, command, value in log.commands:
+            print(f"day {day}: {command}" + ("" if value is None else f" {value}"))
+    elif args.command == 'verify':
+        day = ReplayLog.load(args.path).verify()
+        if day is None:
+            print("The log replays exactly")
+        else:
+            print(f"Replaying does not reproduce the checkpoint on day {day}")
+    else:
+        first, second = ReplayLog.load(args.first), ReplayLog.load(args.second)
+        index = first_command_difference(first, second)
+        if index is not None:
+            entries = [log.commands[index] if index < len(log.commands) else None for log in (first, second)]
+            print(f"Commands differ from command {index + 1}: {entries[0]} vs {entries[1]}")
+        day = first_divergence(first, second)
+        if day is None:
+            print(f"The runs agree through day {min(first.last_day, second.last_day)}")
+        else:
+            print(f"The runs diverge at the start of day {day}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Range queries over a History without scanning it.
+
+A RollupIndex follows a growing History as records are appended. It keeps
+prefix sums and sparse tables of minima and maxima over fixed-size blocks of
+records, and the same for each season of the year across years, so
+
+    history = History(rollup=True)
+    ecosystem = SimpleEcosystem(history=history)
+    ...
+    history.rollup.days('animals', 100000, 200000).max
+    history.rollup.seasons('humans', 'Winter', 100, 200).mean
+
+cost a few table lookups plus a scan of at most two partial blocks, however
+long the run. Day and year ranges are half-open, like Python slices.
+"""
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from events import SEASON_NAMES
+from runningstats import STAT_FIELDS
+
+# Records per block; ranges scan at most two partial blocks
+BLOCK = 64
+
+
+class Aggregate(namedtuple('Aggregate', 'count total min max')):
+    """Count, sum and extremes of a field over a range (min and max are None when empty)"""
+    __slots__ = ()
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+def _combine(first, second):
+    if not first.count:
+        return second
+    if not second.count:
+        return first
+    return Aggregate(first.count + second.count, first.total + second.total,
+                     min(first.min, second.min), max(first.max, second.max))
+
+
+class _SparseTable:
+    """Range minimum or maximum of an append-only sequence
+
+    Appends cost O(log n) and queries O(1): level k holds the reduction of
+    each run of 2**k values, and any range is covered by two overlapping runs.
+    """
+    def __init__(self, reduce, typecode):
+        self.reduce = reduce
+        self.typecode = typecode
+        self.levels = [array(typecode)]
+
+    def append(self, value):
+        levels = self.levels
+        levels[0].append(value)
+        size = len(levels[0])
+        k = 1
+        while 1 << k <= size:
+            if k == len(levels):
+                levels.append(array(self.typecode))
+            below = levels[k - 1]
+            start = size - (1 << k)
+            levels[k].append(self.reduce(below[start], below[start + (1 << (k - 1))]))
+            k += 1
+
+    def query(self, start, stop):
+        """Reduction of values[start:stop], which must not be empty"""
+        k = (stop - start).bit_length() - 1
+        level = self.levels[k]
+        return self.reduce(level[start], level[stop - (1 << k)])
+
+
+class RollupIndex:
+    """Block and season rollups of a growing History
+
+    history: the History to index; its ring option must be off
+    days_in_season: season length of the ecosystem being recorded
+
+    History(rollup=True) creates one and feeds it every record.
+    """
+    def __init__(self, history, days_in_season=30):
+        if history.ring:
+            raise ValueError("a rollup index needs a growing history, not a ring buffer")
+        self.history = history
+        self.days_in_season = days_in_season
+        # Integer fields are summed exactly; season extremes are doubles so empty seasons can hold infinities
+        self._codes = {field: 'd' if history.column(field).format == 'd' else 'q' for field in STAT_FIELDS}
+
+        self._block_totals = {field: array(code, [0]) for field, code in self._codes.items()}
+        self._block_min = {field: _SparseTable(min, code) for field, code in self._codes.items()}
+        self._block_max = {field: _SparseTable(max, code) for field, code in self._codes.items()}
+
+        # Seasons are numbered from the start of the run (ordinal = 4 * year + season);
+        # per season of the year, prefix sums and extremes are indexed by year
+        self._ordinal = -1
+        self._season_starts = array('q')  # First record position of each season, by ordinal
+        self._season_counts = [array('q', [0]) for _ in SEASON_NAMES]
+        self._season_totals = {field: [array(code, [0]) for _ in SEASON_NAMES]
+                               for field, code in self._codes.items()}
+        self._season_min = {field: [_SparseTable(min, 'd') for _ in SEASON_NAMES] for field in STAT_FIELDS}
+        self._season_max = {field: [_SparseTable(max, 'd') for _ in SEASON_NAMES] for field in STAT_FIELDS}
+
+    def append(self, position, day):
+        """Index the record just written at position, for the given day"""
+        # The update that ends a season's last day records the new season
+        ordinal = (day + 1) // self.days_in_season
+        if ordinal != self._ordinal:
+            self._close_seasons(ordinal, position)
+        if (position + 1) % BLOCK == 0:
+            self._close_block(position + 1 - BLOCK, position + 1)
+
+    def rebuild(self):
+        """Index every record already in the history"""
+        for position, day in enumerate(self.history.column('day')):
+            self.append(position, day)
+
+    def _close_block(self, start, stop):
+        for field in STAT_FIELDS:
+            values = self.history.column(field)[start:stop]
+            totals = self._block_totals[field]
+            totals.append(totals[-1] + sum(values))
+            self._block_min[field].append(min(values))
+            self._block_max[field].append(max(values))
+
+    def _close_seasons(self, ordinal, position):
+        if self._ordinal >= 0:
+            self._close_season(self._ordinal, self._season_starts[-1], position)
+        # Seasons skipped by a sparse history stay empty
+        for skipped in range(self._ordinal + 1, ordinal):
+            self._season_starts.append(position)
+            self._close_season(skipped, position, position)
+        self._season_starts.append(position)
+        self._ordinal = ordinal
+
+    def _close_season(self, ordinal, start, stop):
+        season = ordinal % len(SEASON_NAMES)
+        counts = self._season_counts[season]
+        counts.append(counts[-1] + stop - start)
+        for field in STAT_FIELDS:
+            values = self.history.column(field)[start:stop]
+            totals = self._season_totals[field][season]
+            totals.append(totals[-1] + sum(values))
+            self._season_min[field][season].append(min(values) if values else float('inf'))
+            self._season_max[field][season].append(max(values) if values else float('-inf'))
+
+    def _positions(self, start, stop):
+        """Record positions of the days in [start, stop)"""
+        days = self.history.column('day')
+        low = 0 if start is None else bisect_left(days, start)
+        high = len(days) if stop is None else bisect_left(days, stop)
+        return low, max(low, high)
+
+    def _aggregate(self, field, start, stop):
+        """Aggregate over record positions [start, stop)"""
+        if stop <= start:
+            return Aggregate(0, 0, None, None)
+        values = self.history.column(field)
+        first = -(-start // BLOCK)
+        last = stop // BLOCK
+        if first >= last:
+            part = values[start:stop]
+            return Aggregate(stop - start, sum(part), min(part), max(part))
+        totals = self._block_totals[field]
+        total = totals[last] - totals[first]
+        low = self._block_min[field].query(first, last)
+        high = self._block_max[field].query(first, last)
+        for part in (values[start:first * BLOCK], values[last * BLOCK:stop]):
+            if part:
+                total += sum(part)
+                low = min(low, min(part))
+                high = max(high, max(part))
+        return Aggregate(stop - start, total, low, high)
+
+    def days(self, field, start=None, stop=None):
+        """Aggregate of a field over the recorded days in [start, stop)"""
+        return self._aggregate(field, *self._positions(start, stop))
+
+    def _season_position(self, ordinal):
+        if ordinal < len(self._season_starts):
+            return self._season_starts[ordinal]
+        return self.history.recorded
+
+    def seasons(self, field, season=None, start_year=0, stop_year=None):
+        """Aggregate of a field over one season (name or number) of the years in [start_year, stop_year)
+
+        With season None, whole years are aggregated.
+        """
+        seasons_per_year = len(SEASON_NAMES)
+        if season is None:
+            start = self._season_position(seasons_per_year * start_year)
+            stop = self.history.recorded if stop_year is None else self._season_position(seasons_per_year * stop_year)
+            return self._aggregate(field, start, stop)
+        if isinstance(season, str):
+            season = SEASON_NAMES.index(season)
+
+        # Closed seasons from the tables
+        closed = len(self._season_counts[season]) - 1
+        first = min(start_year, closed)
+        last = closed if stop_year is None else max(first, min(stop_year, closed))
+        result = Aggregate(0, 0, None, None)
+        counts = self._season_counts[season]
+        if counts[last] > counts[first]:
+            totals = self._season_totals[field][season]
+            low = self._season_min[field][season].query(first, last)
+            high = self._season_max[field][season].query(first, last)
+            if self._codes[field] == 'q':
+                low, high = int(low), int(high)
+            result = Aggregate(counts[last] - counts[first], totals[last] - totals[first], low, high)
+
+        # The season in progress, if it is in range
+        ordinal = self._ordinal
+        year = ordinal // seasons_per_year
+        if (ordinal >= 0 and ordinal % seasons_per_year == season and start_year <= year
+                and (stop_year is None or year < stop_year)):
+            result = _combine(result, self._aggregate(field, self._season_starts[ordinal], self.history.recorded))
+        return result
+
+    def year(self, field, year):
+        """Aggregate of a field over one year"""
+        return self.seasons(field, None, year, year + 1)
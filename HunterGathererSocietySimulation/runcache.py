@@ -0,0 +1,133 @@
+"""Content-addressed on-disk cache of finished runs.
+
+Runs are keyed by a hash of (model version, parameters, seed, days, god mode
+script) and stored as compressed checkpoints, so a hit gives back the final
+state and the full history without re-simulating:
+
+    cache = RunCache('run_cache', max_bytes=2 * 1024 ** 3)
+    ecosystem = cache.simulate(days=360000, seed=7, params={'plant_growth_rate': 0.25})
+
+The least recently used entries are evicted to keep the cache under its disk
+budget. Recency is the file modification time, which hits refresh, so several
+processes can share one cache directory.
+"""
+import hashlib
+import json
+import os
+import zlib
+
+import checkpoint
+from events import NullSink
+from huntergathersim import MODEL_VERSION
+from montecarlo import run_once
+
+SUFFIX = '.run'
+
+
+def run_key(params, seed, days, script=()):
+    """Content hash identifying one run"""
+    description = json.dumps({'model': MODEL_VERSION, 'params': params or {}, 'seed': seed,
+                              'days': days, 'script': [list(entry) for entry in script]},
+                             sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class RunCache:
+    """Size-bounded LRU cache of compressed run checkpoints
+
+    directory: where entries are stored (created if needed)
+    max_bytes: disk budget; least recently used entries are evicted beyond it
+    level: zlib compression level
+    """
+    def __init__(self, directory, max_bytes=1024 ** 3, level=6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _entries(self):
+        """(last used, path, size) for every entry"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Evicted by another process
+                    entries.append((stat.st_mtime_ns, entry.path, stat.st_size))
+        return entries
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, sink=None):
+        """The cached ecosystem for a key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return checkpoint.loads(zlib.decompress(data), NullSink() if sink is None else sink)
+
+    def put(self, key, ecosystem):
+        """Store a finished run, evicting old entries if over budget"""
+        data = zlib.compress(checkpoint.dumps(ecosystem), self.level)
+        path = self._path(key)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)  # Readers never see a half-written entry
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget"""
+        entries = sorted(self._entries())
+        self.size = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+    def clear(self):
+        for _, path, _ in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.size = 0
+
+    def simulate(self, days, script=(), seed=0, params=None, sink=None):
+        """Return the ecosystem after `days` days, from the cache or by simulating and storing it
+
+        script is a parsed god mode script (see montecarlo.parse_script). The
+        run stops early if humans die out, exactly like an uncached run.
+        """
+        key = run_key(params, seed, days, script)
+        ecosystem = self.get(key, sink)
+        if ecosystem is not None:
+            return ecosystem
+        ecosystem, _ = run_once(days, script, seed, params)
+        self.put(key, ecosystem)
+        if sink is not None:
+            ecosystem.sink = sink
+        return ecosystem
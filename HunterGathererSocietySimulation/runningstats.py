@@ -0,0 +1,124 @@
+"""Running statistics kept up to date as a SimpleEcosystem simulates.
+
+RunningStats is updated once per day with constant work, so reports read
+min/max/mean/variance and band counts without rescanning the history. It
+sees every day even when the history itself is sampled or bounded.
+"""
+import math
+import struct
+
+# Fields with running statistics
+STAT_FIELDS = ('humans', 'animals', 'plants', 'rainfall', 'food_storage')
+
+# Human population at or below which a day counts as extinction risk
+EXTINCTION_RISK_HUMANS = 5
+
+# Serialized layout: days and band counts, then per field
+# sum, sum of squares, min, max, day of min, day of max
+_COUNTS = struct.Struct('<qqqq')
+_FIELD = struct.Struct('<ddddqq')
+
+
+class FieldStats:
+    """Count, sum, sum of squares and extremes of one field"""
+    __slots__ = ('count', 'total', 'total_squares', 'min', 'max', 'min_day', 'max_day')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self.min = None
+        self.max = None
+        self.min_day = None
+        self.max_day = None
+
+    def add(self, value, day):
+        if self.count == 0:
+            self.min = self.max = value
+            self.min_day = self.max_day = day
+        elif value < self.min:
+            self.min = value
+            self.min_day = day
+        elif value > self.max:
+            self.max = value
+            self.max_day = day
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        """Population variance"""
+        if not self.count:
+            return 0.0
+        mean = self.total / self.count
+        return max(0.0, self.total_squares / self.count - mean * mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class RunningStats:
+    """Per-field statistics plus days spent in drought, flood and extinction-risk bands"""
+    def __init__(self):
+        self.days = 0
+        self.drought_days = 0
+        self.flood_days = 0
+        self.extinction_risk_days = 0
+        self.fields = {name: FieldStats() for name in STAT_FIELDS}
+        # Direct references for the daily update
+        self.humans, self.animals, self.plants, self.rainfall, self.food_storage = self.fields.values()
+
+    def record(self, ecosystem):
+        """Add the ecosystem's state at the end of a day"""
+        day = ecosystem.days
+        humans = ecosystem.humans
+        rainfall = ecosystem.rainfall
+        self.humans.add(humans, day)
+        self.animals.add(ecosystem.animals, day)
+        self.plants.add(ecosystem.plants, day)
+        self.rainfall.add(rainfall, day)
+        self.food_storage.add(ecosystem.food_storage, day)
+        self.days += 1
+        if rainfall < ecosystem.drought_threshold:
+            self.drought_days += 1
+        elif rainfall > ecosystem.flood_threshold:
+            self.flood_days += 1
+        if humans <= EXTINCTION_RISK_HUMANS:
+            self.extinction_risk_days += 1
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def to_bytes(self):
+        parts = [_COUNTS.pack(self.days, self.drought_days, self.flood_days, self.extinction_risk_days)]
+        for stats in self.fields.values():
+            if stats.count:
+                parts.append(_FIELD.pack(stats.total, stats.total_squares, stats.min, stats.max,
+                                         stats.min_day, stats.max_day))
+            else:
+                parts.append(_FIELD.pack(0, 0, 0, 0, -1, -1))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        stats = cls()
+        stats.days, stats.drought_days, stats.flood_days, stats.extinction_risk_days = _COUNTS.unpack_from(data)
+        offset = _COUNTS.size
+        for name, field in stats.fields.items():
+            total, total_squares, low, high, min_day, max_day = _FIELD.unpack_from(data, offset)
+            offset += _FIELD.size
+            if min_day < 0:
+                continue
+            # Integer fields come back as ints so reports print the same
+            convert = float if name == 'food_storage' else int
+            field.count = stats.days
+            field.total, field.total_squares = convert(total), convert(total_squares)
+            field.min, field.max = convert(low), convert(high)
+            field.min_day, field.max_day = min_day, max_day
+        return stats
@@ -0,0 +1,108 @@
+"""Active and scheduled divine and natural events.
+
+Each started event is an instance with an end day, and instances of the same
+type stack: a second plague started while one is running adds its own daily
+deaths instead of replacing the first. Two min-heaps hold the day each
+instance expires and the day each scheduled event starts, including recurring
+ones, so a day with nothing active or due costs a comparison, and otherwise
+the work grows with the events involved rather than with the event types.
+
+The scheduler keeps a dict of days remaining per event type up to date, which
+the ecosystem exposes as active_events for the code that only asks whether an
+event is on:
+
+    ecosystem.events.schedule('drought', 400, 30)             # Days 400-429
+    ecosystem.events.schedule('plant_blight', 90, 8, every=120)
+"""
+import heapq
+
+from events import EVENT_TYPES
+
+_ORDER = {event: index for index, event in enumerate(EVENT_TYPES)}
+
+
+class EventScheduler:
+    """Event instances of one ecosystem, by type, with their expiries and future starts"""
+    def __init__(self):
+        self.remaining = dict.fromkeys(EVENT_TYPES, 0)  # Days left of the longest instance of each type
+        self.active = {}      # Event type -> end days of its active instances
+        self._expiries = []   # (end day, sequence, event type)
+        self._starts = []     # (start day, sequence, event type, duration, every)
+        self._sequence = 0    # Keeps heap order stable for entries on the same day
+
+    def _push(self, heap, entry):
+        heapq.heappush(heap, (entry[0], self._sequence) + entry[1:])
+        self._sequence += 1
+
+    def start(self, event, duration, day):
+        """Start an instance of event on day, lasting duration days (none if duration < 1)"""
+        if duration <= 0:
+            return
+        end = day + duration
+        ends = self.active.setdefault(event, [])
+        ends.append(end)
+        self._push(self._expiries, (end, event))
+        self.remaining[event] = max(ends) - day
+
+    def schedule(self, event, day, duration, every=None):
+        """Start event on day for duration days, and again every `every` days after if given"""
+        if event not in _ORDER:
+            raise ValueError(f"unknown event type: {event}")
+        if duration < 1 or (every is not None and every < 1):
+            raise ValueError("duration and every must be at least 1")
+        self._push(self._starts, (day, event, duration, every))
+
+    def next_start(self):
+        """Day of the next scheduled start, or None"""
+        return self._starts[0][0] if self._starts else None
+
+    def due(self, day):
+        """Pop the scheduled starts due by day as (event, duration), queuing the next of recurring ones"""
+        starts = []
+        while self._starts and self._starts[0][0] <= day:
+            start, _, event, duration, every = heapq.heappop(self._starts)
+            starts.append((event, duration))
+            if every is not None:
+                self._push(self._starts, (start + every, event, duration, every))
+        return starts
+
+    def stacks(self):
+        """(event type, active instances) of each active type, in EVENT_TYPES order"""
+        return sorted(((event, len(ends)) for event, ends in self.active.items()),
+                      key=lambda item: _ORDER[item[0]])
+
+    def advance(self, day):
+        """Drop the instances that end by day and count days remaining from it
+
+        Returns the event types with no instance left.
+        """
+        ended = set()
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= day:
+            end, _, event = heapq.heappop(expiries)
+            ends = self.active.get(event)
+            if ends and end in ends:  # Otherwise canceled
+                ends.remove(end)
+                if not ends:
+                    del self.active[event]
+                    self.remaining[event] = 0
+                    ended.add(event)
+        for event, ends in self.active.items():
+            self.remaining[event] = max(ends) - day
+        return ended
+
+    def cancel(self):
+        """End every active instance; scheduled starts are kept. Returns the number of types that were active."""
+        count = len(self.active)
+        for event in self.active:
+            self.remaining[event] = 0
+        self.active.clear()
+        return count
+
+    def instances(self):
+        """(event type, end day) of every active instance"""
+        return [(event, end) for event, ends in self.active.items() for end in ends]
+
+    def scheduled(self):
+        """(start day, event type, duration, every) of every scheduled start, soonest first"""
+        return [(day, event, duration, every) for day, _, event, duration, every in sorted(self._starts)]
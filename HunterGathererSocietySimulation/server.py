@@ -0,0 +1,457 @@
+"""Many interactive simulations in one process, over HTTP and WebSocket.
+
+A SimulationServer hosts independent sessions, each an ecosystem with its own
+undo history, driven by the same command lines as run_command_based_simulation()
+(day 5, year 2, plague 7, rain 20, undo, ...). Commands run on the event loop,
+except simulation commands of at least `long_days` days, which go to a pool of
+worker processes so that one 'year 500' does not hold up every other session:
+the session travels to the worker as a checkpoint and comes back as one.
+Sessions idle for `idle_seconds` are evicted to compressed checkpoints and
+revived by their next command. An evicted session loses its undo history.
+
+    python server.py --port 8765
+
+HTTP API (JSON bodies and replies):
+
+    POST   /sessions                    {"seed": 1, "params": {...}}, both optional
+    GET    /sessions                    every session's status
+    GET    /sessions/<id>               one session's status
+    POST   /sessions/<id>/commands      {"command": "year 5"}, or the command as plain text
+    DELETE /sessions/<id>               end the session, replying with its final results
+
+A WebSocket at /sessions/<id>/ws takes one command per text message and replies
+to each with the same JSON as POST /sessions/<id>/commands.
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import secrets
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import checkpoint
+from events import ConsoleSink
+from huntergathersim import SIMULATION_UNITS, SimpleEcosystem, execute_command
+from snapshots import SnapshotRing
+
+LONG_COMMAND_DAYS = 360   # Simulation commands this long or longer run in a worker process
+IDLE_SECONDS = 300        # Sessions idle this long are evicted to checkpoints
+MAX_SESSIONS = 1000
+MAX_BODY = 1 << 16        # Longest request body or WebSocket message accepted
+
+_REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            409: 'Conflict', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+_WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+_TEXT, _BINARY, _CLOSE, _PING, _PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class RequestError(Exception):
+    """A request that cannot be served, with the HTTP status to reply with"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _capture(function, *args):
+    """Call function, returning what it printed and what it returned"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = function(*args)
+    return output.getvalue(), result
+
+
+def _final_results(ecosystem):
+    print("\nFinal Results:")
+    ecosystem.summary_report()
+
+
+def simulated_days(command_input, days_in_season=30):
+    """Days a simulation command line would simulate at most (0 for other commands)"""
+    parts = command_input.strip().lower().split()
+    if not parts:
+        return 0
+    command = parts[0]
+    if command in ("turbo", "profile"):
+        unit = parts[1] if len(parts) > 1 else ("year" if command == "turbo" else "day")
+        arguments = parts[2:]
+    else:
+        unit = command
+        arguments = parts[1:]
+    if unit not in SIMULATION_UNITS:
+        return 0
+    try:
+        count = int(arguments[0]) if arguments else 1
+    except ValueError:
+        return 0
+    days, seasons = SIMULATION_UNITS[unit]
+    return max(0, count) * (days + seasons * days_in_season)
+
+
+def _run_in_worker(state, command_input):
+    """Worker: restore a session from its checkpoint and run one command
+
+    Returns the command's output, the session's new checkpoint and whether it goes on.
+    """
+    ecosystem = checkpoint.loads(state, ConsoleSink())
+    output, going = _capture(execute_command, ecosystem, SnapshotRing(1), command_input)
+    if not going:
+        output += _capture(_final_results, ecosystem)[0]
+    return output, checkpoint.dumps(ecosystem), going
+
+
+class Session:
+    """One hosted simulation, live or evicted to a compressed checkpoint"""
+    def __init__(self, session_id, ecosystem):
+        self.id = session_id
+        self.ecosystem = ecosystem
+        self.snapshots = SnapshotRing()  # State before each command, for undo and rewind
+        self.state = None                # Compressed checkpoint while evicted
+        self.ended = False
+        self.lock = asyncio.Lock()       # One command at a time
+        self.last_used = time.monotonic()
+        self.status = {}
+        self.note_status()
+
+    @property
+    def evicted(self):
+        return self.ecosystem is None
+
+    def note_status(self):
+        """Remember the figures status requests show, so they need no revival"""
+        ecosystem = self.ecosystem
+        self.status = {
+            'session': self.id, 'day': ecosystem.days, 'season': ecosystem.seasons[ecosystem.current_season],
+            'humans': ecosystem.humans, 'animals': ecosystem.animals, 'plants': ecosystem.plants,
+            'rainfall': ecosystem.rainfall, 'food_storage': ecosystem.food_storage,
+        }
+
+    def info(self):
+        return dict(self.status, evicted=self.evicted, ended=self.ended)
+
+    def evict(self, level=6):
+        self.state = zlib.compress(checkpoint.dumps(self.ecosystem), level)
+        self.ecosystem = None
+        self.snapshots = None
+
+    def revive(self):
+        """The session's ecosystem, restoring it from its checkpoint if evicted"""
+        if self.ecosystem is None:
+            self.ecosystem = checkpoint.loads(zlib.decompress(self.state), ConsoleSink())
+            self.snapshots = SnapshotRing()
+            self.state = None
+        return self.ecosystem
+
+
+class SimulationServer:
+    """Sessions by id, a worker pool for long commands, and the HTTP and WebSocket front end
+
+    workers: worker processes for long commands (default: all cores; 0 runs every command on the event loop)
+    """
+    def __init__(self, workers=None, idle_seconds=IDLE_SECONDS, long_days=LONG_COMMAND_DAYS,
+                 max_sessions=MAX_SESSIONS):
+        self.sessions = {}
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.idle_seconds = idle_seconds
+        self.long_days = long_days
+        self.max_sessions = max_sessions
+        self.pool = None
+
+    # Sessions
+
+    def create_session(self, seed=None, params=None):
+        """Start a session; returns it and its opening status report"""
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError(503, f"already hosting {self.max_sessions} sessions")
+        if params is not None and not isinstance(params, dict):
+            raise RequestError(400, "params must be a JSON object")
+        try:
+            output, ecosystem = _capture(lambda: SimpleEcosystem(sink=ConsoleSink(), seed=seed, params=params))
+        except (TypeError, ValueError) as error:
+            raise RequestError(400, str(error))
+        session_id = secrets.token_hex(8)
+        session = Session(session_id, ecosystem)
+        self.sessions[session_id] = session
+        output += _capture(ecosystem.status_report)[0]
+        return session, output
+
+    def session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise RequestError(404, f"no session {session_id}")
+        return session
+
+    async def execute(self, session, command_input):
+        """Run one command line in a session; returns its output"""
+        async with session.lock:
+            if session.ended:
+                raise RequestError(409, "the session has ended")
+            ecosystem = session.revive()
+            if self.workers and simulated_days(command_input, ecosystem.days_in_season) >= self.long_days:
+                if self.pool is None:
+                    # Spawned, not forked: a forked worker would hold on to every socket open right now
+                    self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+                # The worker gets a copy, so the undo snapshot is taken here
+                session.snapshots.take(ecosystem, command_input.strip().lower())
+                output, state, going = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, _run_in_worker, checkpoint.dumps(ecosystem), command_input)
+                session.ecosystem = checkpoint.loads(state, ConsoleSink())
+            else:
+                output, going = _capture(execute_command, ecosystem, session.snapshots, command_input)
+                if not going:
+                    output += _capture(_final_results, ecosystem)[0]
+            session.ended = not going
+            session.note_status()
+            session.last_used = time.monotonic()
+            return output
+
+    async def end_session(self, session):
+        """Remove a session; returns its final results"""
+        async with session.lock:
+            if self.sessions.pop(session.id, None) is None:
+                raise RequestError(404, f"no session {session.id}")  # Ended by another request meanwhile
+            if session.ended:
+                return ""
+            session.ended = True  # Commands still waiting for the lock are refused
+            return _capture(execute_command, session.revive(), session.snapshots, "quit")[0] + \
+                _capture(_final_results, session.ecosystem)[0]
+
+    def evict_idle(self):
+        """Evict the sessions idle for idle_seconds; returns how many"""
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = [session for session in self.sessions.values()
+                if not session.evicted and not session.lock.locked() and session.last_used <= cutoff]
+        for session in idle:
+            session.evict()
+        return len(idle)
+
+    async def _evict_periodically(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_seconds / 10))
+            self.evict_idle()
+
+    # HTTP
+
+    async def _route(self, method, path, body):
+        """Serve one request; returns (status, reply)"""
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if not parts or parts[0] != 'sessions' or len(parts) > 3:
+            raise RequestError(404, f"no such resource: {path}")
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, {'sessions': [session.info() for session in self.sessions.values()]}
+            if method == 'POST':
+                options = _json_body(body) if body.strip() else {}
+                session, output = self.create_session(options.get('seed'), options.get('params'))
+                return 201, dict(session.info(), output=output)
+            raise RequestError(405, f"{method} is not allowed on {path}")
+        session = self.session(parts[1])
+        if len(parts) == 2:
+            if method == 'GET':
+                return 200, session.info()
+            if method == 'DELETE':
+                output = await self.end_session(session)
+                return 200, dict(session.info(), output=output, ended=True)
+            raise RequestError(405, f"{method} is not allowed on {path}")
+        if parts[2] != 'commands':
+            raise RequestError(404, f"no such resource: {path}")
+        if method != 'POST':
+            raise RequestError(405, f"{method} is not allowed on {path}")
+        return 200, await self._command_reply(session, _command_body(body))
+
+    async def _command_reply(self, session, command_input):
+        output = await self.execute(session, command_input)
+        return dict(session.info(), output=output)
+
+    async def handle(self, reader, writer):
+        """Serve one connection: HTTP requests until it closes, or a WebSocket"""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if headers.get('upgrade', '').lower() == 'websocket':
+                    await self._websocket(reader, writer, path, headers)
+                    break
+                try:
+                    status, reply = await self._route(method, path, body)
+                except RequestError as error:
+                    status, reply = error.status, {'error': str(error)}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                _write_response(writer, status, reply, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except RequestError as error:
+            _write_response(writer, error.status, {'error': str(error)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # WebSocket
+
+    async def _websocket(self, reader, writer, path, headers):
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if len(parts) != 3 or parts[0] != 'sessions' or parts[2] != 'ws':
+            raise RequestError(404, f"no such resource: {path}")
+        session = self.session(parts[1])
+        key = headers.get('sec-websocket-key')
+        if key is None:
+            raise RequestError(400, "missing Sec-WebSocket-Key")
+        accept = base64.b64encode(hashlib.sha1((key + _WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        await writer.drain()
+        message = b''
+        while True:
+            final, opcode, payload = await _read_frame(reader)
+            if opcode == _CLOSE:
+                writer.write(_frame(_CLOSE, payload[:2]))
+                await writer.drain()
+                return
+            if opcode == _PING:
+                writer.write(_frame(_PONG, payload))
+            elif opcode != _PONG:
+                message += payload
+                if len(message) > MAX_BODY:
+                    writer.write(_frame(_CLOSE, struct.pack('>H', 1009)))
+                    await writer.drain()
+                    return
+                if final:
+                    try:
+                        reply = await self._command_reply(session, message.decode('utf-8', 'replace'))
+                    except RequestError as error:
+                        reply = {'error': str(error)}
+                    writer.write(_frame(_TEXT, json.dumps(reply).encode()))
+                    message = b''
+            await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """Serve until cancelled"""
+        server = await asyncio.start_server(self.handle, host, port)
+        evictor = asyncio.create_task(self._evict_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+
+
+def _json_body(body):
+    try:
+        options = json.loads(body)
+    except ValueError as error:
+        raise RequestError(400, f"invalid JSON: {error}")
+    if not isinstance(options, dict):
+        raise RequestError(400, "expected a JSON object")
+    return options
+
+
+def _command_body(body):
+    """The command line of a request body: {"command": ...} or plain text"""
+    text = body.decode('utf-8', 'replace')
+    if text.lstrip().startswith('{'):
+        command_input = _json_body(body).get('command')
+        if not isinstance(command_input, str):
+            raise RequestError(400, "expected {\"command\": \"...\"}")
+        return command_input
+    return text
+
+
+async def _read_request(reader):
+    """(method, path, headers, body) of the next request, or None at the end of the connection"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, path, _ = line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise RequestError(400, "malformed Content-Length")
+    if length < 0:
+        raise RequestError(400, "malformed Content-Length")
+    if length > MAX_BODY:
+        raise RequestError(413, f"bodies are limited to {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, headers, body
+
+
+def _write_response(writer, status, reply, keep_alive=True):
+    body = json.dumps(reply).encode()
+    writer.write((f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                  "Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body)
+
+
+async def _read_frame(reader):
+    """(final, opcode, payload) of the next WebSocket frame, unmasked"""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('>H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('>Q', await reader.readexactly(8))
+    if length > MAX_BODY:
+        raise ConnectionError("WebSocket frame too long")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask is not None and length:
+        key = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+def _frame(opcode, payload):
+    """A final, unmasked WebSocket frame, as servers send them"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('>BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('>BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host interactive simulation sessions over HTTP and WebSocket")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on")
+    parser.add_argument('--workers', type=int, help="worker processes for long commands (default: all cores)")
+    parser.add_argument('--idle', type=float, default=IDLE_SECONDS, help="seconds before an idle session is evicted")
+    parser.add_argument('--long-days', type=int, default=LONG_COMMAND_DAYS,
+                        help="simulation commands of at least this many days run in a worker")
+    args = parser.parse_args()
+
+    server = SimulationServer(args.workers, args.idle, args.long_days)
+    print(f"Serving simulation sessions on http://{args.host}:{args.port}/sessions")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
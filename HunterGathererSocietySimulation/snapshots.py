@@ -0,0 +1,57 @@
+"""Undo for the interactive simulation.
+
+A SnapshotRing keeps snapshots of an ecosystem taken before each command and
+can rewind to any of the last `capacity` of them. A snapshot copies the small
+state (populations, rates, active events, random stream, running statistics)
+but only notes the length of a growing history: histories are append-only, so
+rewinding truncates the history to that length, and the records before it are
+shared by every snapshot instead of copied. Ring histories are bounded and are
+copied.
+"""
+import copy
+from collections import deque, namedtuple
+
+from history import History
+
+# Ecosystem attributes that are not simulated state and survive a rewind
+_KEPT = ('history', 'sink', 'profiler', 'replay', 'publisher')
+
+Snapshot = namedtuple('Snapshot', 'label days state history commands')
+
+
+class SnapshotRing:
+    """The last `capacity` snapshots of one ecosystem"""
+    def __init__(self, capacity=100):
+        self.snapshots = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def take(self, ecosystem, label):
+        """Snapshot the ecosystem before a command described by label"""
+        # One deepcopy call, so active_events stays the scheduler's own dict
+        state = copy.deepcopy({name: value for name, value in vars(ecosystem).items() if name not in _KEPT})
+        history = ecosystem.history
+        saved = history.to_bytes() if getattr(history, 'ring', None) else history.recorded
+        commands = None if ecosystem.replay is None else len(ecosystem.replay.commands)
+        self.snapshots.append(Snapshot(label, ecosystem.days, state, saved, commands))
+
+    def rewind(self, ecosystem, steps=1):
+        """Restore the ecosystem to the snapshot `steps` commands back, dropping that and later snapshots
+
+        Returns the snapshot restored.
+        """
+        if not 1 <= steps <= len(self.snapshots):
+            raise ValueError(f"only {len(self.snapshots)} command(s) can be undone")
+        for _ in range(steps):
+            snapshot = self.snapshots.pop()
+        vars(ecosystem).update(snapshot.state)
+        if isinstance(snapshot.history, bytes):
+            rollup = ecosystem.history.rollup
+            ecosystem.history = History.from_bytes(snapshot.history, rollup=rollup is not None,
+                                                   days_in_season=getattr(rollup, 'days_in_season', 30))
+        else:
+            ecosystem.history.truncate(snapshot.history)
+        if ecosystem.replay is not None and snapshot.commands is not None:
+            ecosystem.replay.rewind(snapshot.days, snapshot.commands)
+        return snapshot
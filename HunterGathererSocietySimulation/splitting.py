@@ -0,0 +1,246 @@
+"""Rare event estimation by multilevel splitting.
+
+Extinction of an established settlement is too rare for plain Monte Carlo to
+estimate without millions of runs. Fixed-effort multilevel splitting breaks
+the event into a chain of likelier steps: the population falling below each
+of a series of danger levels (by default fewer than 20, 10 and 5 humans, then
+none). Each stage runs a fixed number of trajectories from the states in which
+earlier trajectories crossed the previous level, with fresh random streams,
+and keeps the states in which they cross the next one. Trajectories that reach
+the time horizon first are dropped. The probability of the event is the
+product of the fractions that cross each level.
+
+Independent replications of the whole procedure give the confidence interval:
+
+    python splitting.py --burn-in 3600 --days 3600 --trajectories 500 --replications 10
+    python splitting.py --days 720 --script blight_and_drought.txt --levels 30,15,5,1 --field plants
+
+Scripts are montecarlo god mode scripts, with days counted from the start of
+the horizon.
+"""
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import checkpoint
+from events import NullSink
+from huntergathersim import SimpleEcosystem, apply_god_command
+from montecarlo import load_script, parse_script
+from rng import RandomStream
+
+# Fewer than 20, 10 and 5 humans, then extinction
+DEFAULT_LEVELS = (20, 10, 5, 1)
+
+
+def _advance(ecosystem, field, level, end_day, script):
+    """Simulate until field is below level (True) or end_day is reached (False)"""
+    if getattr(ecosystem, field) < level:
+        return True  # Entered this stage already below the next level too
+    pending = [entry for entry in script if entry[0] >= ecosystem.days]
+    position = 0
+    while ecosystem.days < end_day:
+        while position < len(pending) and pending[position][0] <= ecosystem.days:
+            _, command, value = pending[position]
+            apply_god_command(ecosystem, command, value)
+            position += 1
+        ecosystem.update()
+        if getattr(ecosystem, field) < level:
+            return True
+    return False
+
+
+def _run_trajectories(states, field, level, end_day, script, entropy, key, indices):
+    """Worker: run trajectories from entrance states
+
+    Trajectory i starts from states[i % len(states)] with the stream
+    RandomStream(entropy, key + (i,)), so results do not depend on how
+    trajectories are spread over processes. Returns the (i, state) of the
+    trajectories that crossed the level and the number of days simulated.
+    """
+    crossings = []
+    simulated = 0
+    for index in indices:
+        ecosystem = checkpoint.loads(states[index % len(states)], NullSink())
+        ecosystem.rng = RandomStream(entropy, key + (index,))
+        start = ecosystem.days
+        if _advance(ecosystem, field, level, end_day, script):
+            crossings.append((index, checkpoint.dumps(ecosystem, history=False)))
+        simulated += ecosystem.days - start
+    return crossings, simulated
+
+
+class SplittingResult:
+    """Estimates from independent replications of multilevel splitting"""
+    def __init__(self, field, levels, days, trajectories, fractions, simulated_days, seconds, seed=None):
+        self.field = field
+        self.levels = levels
+        self.days = days
+        self.trajectories = trajectories
+        self.fractions = fractions  # fractions[replication][stage] = share of trajectories crossing that level
+        self.simulated_days = simulated_days
+        self.seconds = seconds
+        self.seed = seed  # master seed, enough to reproduce the estimate
+
+    @property
+    def replications(self):
+        return len(self.fractions)
+
+    @property
+    def estimates(self):
+        """Probability estimate of each replication"""
+        return [math.prod(fractions) for fractions in self.fractions]
+
+    @property
+    def probability(self):
+        estimates = self.estimates
+        return sum(estimates) / len(estimates)
+
+    @property
+    def standard_error(self):
+        estimates = self.estimates
+        count = len(estimates)
+        if count < 2:
+            return self._delta_standard_error()
+        mean = sum(estimates) / count
+        return math.sqrt(sum((estimate - mean) ** 2 for estimate in estimates) / (count - 1) / count)
+
+    def _delta_standard_error(self):
+        # Relative variance of a product of independent binomial fractions, to first order
+        fractions = self.fractions[0]
+        if not all(fractions):
+            return 0.0
+        relative = sum((1 - p) / (self.trajectories * p) for p in fractions)
+        return self.probability * math.sqrt(relative)
+
+    def confidence_interval(self, confidence=0.95):
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        error = z * self.standard_error
+        return max(0.0, self.probability - error), self.probability + error
+
+    def level_fractions(self):
+        """Mean share of trajectories crossing each level"""
+        return [sum(fractions[stage] for fractions in self.fractions) / self.replications
+                for stage in range(len(self.levels))]
+
+    def equivalent_runs(self):
+        """Plain Monte Carlo runs needed for the same standard error"""
+        p = self.probability
+        error = self.standard_error
+        return p * (1 - p) / error ** 2 if error else math.inf
+
+    def report(self, confidence=0.95):
+        low, high = self.confidence_interval(confidence)
+        print(f"\n===== MULTILEVEL SPLITTING: {self.field} below {self.levels[-1]} within {self.days} days =====")
+        print(f"Seed: {self.seed}")
+        print(f"{self.replications} replications of {self.trajectories} trajectories per level")
+        print(f"Probability: {self.probability:.3e} ({confidence:.0%} CI {low:.3e} to {high:.3e})")
+        print("\nLevel  Crossing fraction")
+        for level, fraction in zip(self.levels, self.level_fractions()):
+            print(f"{'< ' + str(level):>5}  {fraction:.4f}")
+        runs = self.equivalent_runs()
+        print(f"\nSimulated {self.simulated_days} days in {self.seconds:.1f} seconds")
+        if math.isfinite(runs):
+            naive = runs * self.days
+            print(f"Plain Monte Carlo would need about {runs:,.0f} runs ({naive:,.0f} days, "
+                  f"{naive / max(1, self.simulated_days):,.0f}x as many) for the same precision")
+
+
+def run_splitting(days, levels=DEFAULT_LEVELS, trajectories=1000, replications=10, start=None,
+                  script=(), seed=None, processes=None, field='humans'):
+    """Estimate the probability that field drops below levels[-1] within days
+
+    levels: decreasing danger levels; crossing one means field < level
+    trajectories: trajectories run at each level
+    start: the ecosystem to start from (a fresh one by default); it is not modified
+    script: god mode commands as (day, command, value), days counted from the start
+
+    Levels the start state is already below count as crossed with certainty.
+    Every trajectory gets its own substream of a master RandomStream, so an
+    estimate is reproducible for a given seed regardless of the number of
+    processes.
+    """
+    if isinstance(script, str):
+        script = parse_script(script.splitlines())
+    if any(high <= low for high, low in zip(levels, levels[1:])):
+        raise ValueError("levels must be decreasing")
+    master = RandomStream(seed)
+    entropy = master.entropy
+    if start is None:
+        start = SimpleEcosystem(sink=NullSink(), seed=master.spawn(1)[0])
+    initial = checkpoint.dumps(start, history=False)
+    end_day = start.days + days
+    script = [(start.days + day, command, value) for day, command, value in script]
+
+    processes = processes or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    began = time.perf_counter()
+    simulated_days = 0
+    fractions = []
+    try:
+        for replication in range(replications):
+            states = [initial]
+            stage_fractions = []
+            for stage, level in enumerate(levels):
+                if not states:
+                    stage_fractions.append(0.0)  # No trajectory got this far
+                    continue
+                key = (replication, stage)
+                if pool is None:
+                    parts = [_run_trajectories(states, field, level, end_day, script, entropy, key,
+                                               range(trajectories))]
+                else:
+                    chunk_count = min(trajectories, processes * 4)
+                    chunks = [range(i, trajectories, chunk_count) for i in range(chunk_count)]
+                    parts = pool.map(_run_trajectories, [states] * chunk_count, [field] * chunk_count,
+                                     [level] * chunk_count, [end_day] * chunk_count,
+                                     [script] * chunk_count, [entropy] * chunk_count,
+                                     [key] * chunk_count, chunks)
+                crossings = []
+                for part, simulated in parts:
+                    crossings.extend(part)
+                    simulated_days += simulated
+                crossings.sort()
+                stage_fractions.append(len(crossings) / trajectories)
+                states = [state for _, state in crossings]
+            fractions.append(stage_fractions)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return SplittingResult(field, tuple(levels), days, trajectories, fractions, simulated_days,
+                           time.perf_counter() - began, entropy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate rare event probabilities by multilevel splitting")
+    parser.add_argument('--days', type=int, default=3600, help="time horizon in days")
+    parser.add_argument('--levels', default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="decreasing danger levels, comma separated (default: 20,10,5,1)")
+    parser.add_argument('--field', choices=('humans', 'animals', 'plants'), default='humans',
+                        help="population the levels apply to")
+    parser.add_argument('--trajectories', type=int, default=1000, help="trajectories per level")
+    parser.add_argument('--replications', type=int, default=10, help="independent replications")
+    parser.add_argument('--burn-in', type=int, default=0, help="days to simulate before the horizon starts")
+    parser.add_argument('--checkpoint', help="start from a saved checkpoint instead of a new ecosystem")
+    parser.add_argument('--script', help="god mode script file with 'day command [value]' lines")
+    parser.add_argument('--seed', type=int, help="master seed for reproducible estimates")
+    parser.add_argument('--processes', type=int, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if args.checkpoint:
+        start = checkpoint.load(args.checkpoint, NullSink())
+    else:
+        start = SimpleEcosystem(sink=NullSink(), seed=args.seed)
+    if args.burn_in:
+        start.fast_forward(args.burn_in)
+    script = load_script(args.script) if args.script else ()
+    levels = tuple(int(level) for level in args.levels.split(','))
+    result = run_splitting(args.days, levels, args.trajectories, args.replications, start, script,
+                           args.seed, args.processes, args.field)
+    result.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""Live streaming of a running simulation's state to many subscribers.
+
+    publisher = StatePublisher.attach(ecosystem)
+    updates = publisher.subscribe_queue()     # A multiprocessing queue of batches
+    port = publisher.listen(8766)             # Or newline-delimited JSON over TCP
+
+After each day, update() hands the publisher the day's state and the events
+emitted that day, by appending one tuple to a deque; that is all the work done
+on the simulation's thread. A publishing thread wakes `rate` times a second
+and passes the days since its last visit to every subscriber, as batches of
+per-day deltas holding only the fields that changed since the day before:
+
+    {"every": 1, "updates": [{"day": 120, "changes": {"humans": 11, "rainfall": 64},
+                              "events": [["human_growth", [1]]]}, ...]}
+
+A subscriber's first update has every field. Subscribers that cannot take a
+batch when it is ready (a full queue, or a socket whose last batch is still
+unsent) fall behind. Their days wait and go out together in one batch, and
+if too many wait they are downsampled: only every 2nd, 4th, ... day is kept,
+with the events of the days dropped carried into the next day kept, so
+deltas still apply in order. A subscriber that keeps up again is sent more
+days. If the publishing thread itself falls behind, the oldest days are
+dropped and counted in the next batch's "lost".
+
+The hook adds about 2 microseconds to each day of update(), but the publishing
+thread holds the interpreter lock while it encodes and delivers, and update()
+waits for it. On a 49 microsecond day, one queue subscriber made update()
+about 30% slower and one socket subscriber about 20% slower. It slows down
+more when the consumers run on the simulation's CPU core.
+"""
+import json
+import multiprocessing
+import operator
+import queue
+import socket
+import threading
+import time
+from collections import deque
+
+from events import EVENT_TYPES
+
+# State sent to subscribers, with 'active_events' (a bitmask, as in history.py) after them
+STATE_FIELDS = (
+    'humans', 'animals', 'plants', 'rainfall', 'food_storage', 'max_food_storage',
+    'survival_knowledge', 'farming_level', 'tools_quality', 'current_season',
+    'animal_reserves', 'plant_reserves', 'sister_settlements', 'total_migrations',
+)
+STREAM_FIELDS = STATE_FIELDS + ('active_events',)
+MAX_EVENTS = 100   # Events sent per day; the rest are only counted
+
+_state = operator.attrgetter(*STATE_FIELDS)
+_EVENT_BITS = {event: 1 << bit for bit, event in enumerate(EVENT_TYPES)}
+
+
+class _EventCollector:
+    """Passes events on to the ecosystem's sink, keeping them for the publisher"""
+    def __init__(self, sink):
+        self.sink = sink
+        self.events = []
+
+    def emit(self, kind, day, payload):
+        self.events.append((kind, payload))
+        self.sink.emit(kind, day, payload)
+
+
+def _thin(days, every, limit):
+    """Keep the days divisible by every and the last, then at most limit of them (if not None)
+
+    Events of dropped days move to the next day kept.
+    """
+    kept = []
+    carried = []
+    last = len(days) - 1
+    for index, (day, values, events) in enumerate(days):
+        if day % every and index != last:
+            carried.extend(events)
+            continue
+        kept.append((day, values, carried + events if carried else events))
+        carried = []
+    if limit is not None and len(kept) > limit:
+        excess = len(kept) - limit
+        carried = [event for _, _, events in kept[:excess + 1] for event in events]
+        day, values, _ = kept[excess]
+        kept = [(day, values, carried)] + kept[excess + 1:]
+    return kept
+
+
+def _deltas(days, last):
+    """Per-day updates: the fields changed since the day before (all of them after None) and the events"""
+    updates = []
+    for day, values, events in days:
+        update = {'day': day}
+        if last is None:
+            update['changes'] = dict(zip(STREAM_FIELDS, values))
+        else:
+            changes = {name: value for name, value, old in zip(STREAM_FIELDS, values, last) if value != old}
+            if changes:
+                update['changes'] = changes
+        if events:
+            update['events'] = events[:MAX_EVENTS]
+            if len(events) > MAX_EVENTS:
+                update['events_dropped'] = len(events) - MAX_EVENTS
+        updates.append(update)
+        last = values
+    return updates
+
+
+def _dumps(batch):
+    return json.dumps(batch, separators=(',', ':'), default=str).encode() + b'\n'
+
+
+class _Batch:
+    """The days of one publishing pass, encoded once for all subscribers that are up to date with them"""
+    def __init__(self, days, previous):
+        self.days = days            # (day, values, events)
+        self.previous = previous    # Values of the day before the first
+        self._message = None
+        self._json = None
+
+    def message(self):
+        if self._message is None:
+            self._message = {'every': 1, 'updates': _deltas(self.days, self.previous)}
+        return self._message
+
+    def json(self):
+        if self._json is None:
+            self._json = _dumps(self.message())
+        return self._json
+
+
+class Subscriber:
+    """Per-subscriber batching, downsampling and delta encoding; subclasses deliver the batches
+
+    every: send every `every`-th day at most (1 for all of them)
+    max_every: coarsest downsampling for a subscriber that falls behind
+    max_batch: days held for a subscriber that is behind before it is downsampled
+    """
+    def __init__(self, every=1, max_every=1024, max_batch=1000):
+        self.min_every = self.every = every
+        self.max_every = max(every, max_every)
+        self.max_batch = max_batch
+        self.pending = []       # (day, values, events) not sent yet
+        self.last = None        # Values of the last day sent
+        self.lost = 0           # Days the publisher dropped before this subscriber saw them
+        self.closed = False
+        self._kept_up = 0
+
+    def ready(self):
+        """Whether a batch can be delivered now"""
+        return True
+
+    def send(self, message):
+        """Deliver a message; returns False if it could not be, to send its days again later"""
+        raise NotImplementedError
+
+    def send_shared(self, batch):
+        """Deliver a publishing pass as encoded for every up-to-date subscriber"""
+        return self.send(batch.message())
+
+    def close(self):
+        self.closed = True
+
+    def finish(self, timeout=1.0):
+        """Deliver the days still pending, waiting up to timeout seconds for the subscriber to take them"""
+        deadline = time.monotonic() + timeout
+        while not self.closed and time.monotonic() < deadline:
+            ready = self.ready()
+            if ready and not self.pending:
+                return
+            if ready:
+                self.offer(_Batch([], self.last))
+            else:
+                time.sleep(0.01)
+
+    def offer(self, batch, lost=0):
+        """Take a publishing pass, sending what is pending if the subscriber can take it"""
+        self.lost += lost
+        up_to_date = not self.pending and self.last is batch.previous
+        self.pending.extend(batch.days)
+        if not self.pending or self.closed:
+            return
+        if not self.ready():
+            self._kept_up = 0
+            if len(self.pending) > self.max_batch:
+                self.every = min(self.every * 2, self.max_every)
+                self.pending = _thin(self.pending, self.every, self.max_batch)
+            return
+        self._kept_up += 1
+        if self._kept_up >= 10 and self.every > self.min_every:
+            self.every //= 2  # Caught up for a while: send more days again
+            self._kept_up = 0
+        if up_to_date and self.every == 1 and not self.lost:
+            days = batch.days
+            sent = self.send_shared(batch)
+        else:
+            days = _thin(self.pending, self.every, None)
+            message = {'every': self.every, 'updates': _deltas(days, self.last)}
+            if self.lost:
+                message['lost'] = self.lost
+            sent = self.send(message)
+        if sent:
+            self.last = days[-1][1]
+            self.lost = 0
+            self.pending = []
+        else:
+            self.pending = days
+
+
+class QueueSubscriber(Subscriber):
+    """Delivers batches as dicts to a multiprocessing (or queue.Queue) queue, behind while it is full"""
+    def __init__(self, updates, **options):
+        super().__init__(**options)
+        self.queue = updates
+
+    def ready(self):
+        return not self.queue.full()
+
+    def send(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            return False  # Filled up since ready()
+        except (OSError, ValueError):
+            self.close()  # Queue closed
+        return True
+
+
+class SocketSubscriber(Subscriber):
+    """Delivers batches as JSON lines to a connected socket, behind while a batch is still unsent"""
+    def __init__(self, connection, **options):
+        super().__init__(**options)
+        self.connection = connection
+        connection.setblocking(False)
+        self._unsent = b''
+
+    def _write(self):
+        try:
+            sent = self.connection.send(self._unsent)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.close()
+            return
+        self._unsent = self._unsent[sent:]
+
+    def ready(self):
+        if self._unsent:
+            self._write()
+        return not self._unsent and not self.closed
+
+    def send(self, message):
+        self._unsent = _dumps(message)
+        self._write()
+        return True
+
+    def send_shared(self, batch):
+        self._unsent = batch.json()
+        self._write()
+        return True
+
+    def close(self):
+        super().close()
+        self.connection.close()
+
+
+class StatePublisher:
+    """Collects each day of one ecosystem and streams it to subscribers from a thread
+
+    rate: publishing passes per second
+    backlog: days held for the publishing thread before the oldest are dropped
+    """
+    def __init__(self, rate=20, backlog=100000):
+        self.interval = 1 / rate
+        self.days = deque(maxlen=backlog)  # (day, state, active event types, events), from update() to the thread
+        self._next_day = None
+        self._previous = None  # Values of the last day published
+        self.subscribers = []
+        self.collector = None
+        self.ecosystem = None
+        self._listener = None
+        self._subscribe_options = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='StatePublisher', daemon=True)
+
+    @classmethod
+    def attach(cls, ecosystem, rate=20, backlog=100000):
+        """Publish every day of the ecosystem from now on"""
+        publisher = cls(rate, backlog)
+        publisher.collector = _EventCollector(ecosystem.sink)
+        ecosystem.sink = publisher.collector
+        ecosystem.publisher = publisher
+        publisher.ecosystem = ecosystem
+        publisher._thread.start()
+        return publisher
+
+    def day_finished(self, ecosystem):
+        """Called by update() after each day; only queues the day's state for the thread"""
+        collector = self.collector
+        events = collector.events
+        if events:
+            collector.events = []
+        active = ecosystem.events.active
+        self.days.append((ecosystem.days - 1, _state(ecosystem), tuple(active) if active else (), events))
+
+    # Subscribers
+
+    def subscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def subscribe_queue(self, maxsize=64, **options):
+        """A new multiprocessing queue receiving batches (see Subscriber for options)"""
+        updates = multiprocessing.Queue(maxsize)
+        self.subscribe(QueueSubscriber(updates, **options))
+        return updates
+
+    def listen(self, port=0, host='127.0.0.1', **options):
+        """Accept socket subscribers on host:port, each getting JSON lines; returns the port"""
+        listener = socket.create_server((host, port))
+        listener.setblocking(False)
+        self._listener = listener
+        self._subscribe_options = options
+        return listener.getsockname()[1]
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self._listener.accept()
+            except (BlockingIOError, OSError):
+                return
+            self.subscribe(SocketSubscriber(connection, **self._subscribe_options))
+
+    # Publishing
+
+    def publish(self):
+        """Pass the days collected since the last call to every subscriber"""
+        if self._listener is not None:
+            self._accept()
+        days = self.days
+        taken = []
+        lost = 0
+        for _ in range(len(days)):
+            day, values, active, events = days.popleft()
+            if self._next_day is not None and day > self._next_day:
+                lost += day - self._next_day  # Dropped from the full deque
+            self._next_day = day + 1
+            mask = sum(_EVENT_BITS[event] for event in active) if active else 0
+            taken.append((day, values + (mask,), events))
+        batch = _Batch(taken, self._previous)
+        if taken:
+            self._previous = taken[-1][1]
+        with self._lock:
+            subscribers = self.subscribers
+            for subscriber in subscribers:
+                subscriber.offer(batch, lost)
+            if any(subscriber.closed for subscriber in subscribers):
+                self.subscribers = [subscriber for subscriber in subscribers if not subscriber.closed]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.publish()
+
+    def close(self, timeout=1.0):
+        """Publish the last days, stop the thread, close socket subscribers and detach from the ecosystem
+
+        Each subscriber gets up to `timeout` seconds to take the days it is behind on.
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.publish()
+        with self._lock:
+            for subscriber in self.subscribers:
+                subscriber.finish(timeout)
+                if isinstance(subscriber, SocketSubscriber):
+                    subscriber.close()
+            self.subscribers = []
+        if self._listener is not None:
+            self._listener.close()
+        if self.ecosystem is not None:
+            if self.ecosystem.sink is self.collector:
+                self.ecosystem.sink = self.collector.sink
+            self.ecosystem.publisher = None
+            self.ecosystem = None
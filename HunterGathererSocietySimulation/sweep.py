@@ -0,0 +1,252 @@
+"""Parameter sweeps over SimpleEcosystem constants.
+
+A sweep runs every parameter point of a design (grid, random sample or Latin
+hypercube) for a set of seeds, in parallel, and returns a tidy table with one
+row per run. Finished runs are cached on disk by (model version, parameters,
+seed, days, script), so repeating or extending a sweep only runs what is new:
+
+    python sweep.py --param plant_growth_rate=0.15,0.2,0.25 --param max_food_storage=30,50 \\
+        --seeds 20 --days 3600 --cache sweep_cache --output results.csv
+    python sweep.py --design lhs --samples 50 --param human_reproduction_rate=0.03:0.09 \\
+        --param season_plant_modifiers.Winter=0.1:0.5 --seeds 5 --cache sweep_cache
+
+Parameter names are those of huntergathersim.PARAMETER_NAMES; season tables
+are swept one season at a time, e.g. season_animal_modifiers.Winter.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from events import NullSink
+from huntergathersim import SimpleEcosystem
+from montecarlo import load_script, run_once
+from rng import RandomStream
+from runcache import run_key
+
+# Outcome columns of a result row, after the parameter columns
+OUTCOME_FIELDS = (
+    'seed', 'days', 'extinct', 'extinction_day',
+    'final_humans', 'final_animals', 'final_plants',
+    'mean_humans', 'min_humans', 'max_humans',
+    'total_migrations', 'sister_settlements', 'survival_knowledge', 'farming_level',
+)
+
+
+# Designs
+
+def grid(space):
+    """Every combination of {name: [values]}"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def _scale(low, high, u):
+    # Integer ranges give integers, including both end points
+    if isinstance(low, int) and isinstance(high, int):
+        return min(high, low + int(u * (high - low + 1)))
+    return low + (high - low) * u
+
+
+def random_design(space, samples, seed=None):
+    """samples points drawn uniformly from {name: (low, high)}"""
+    rng = RandomStream(seed)
+    return [{name: _scale(low, high, rng.random()) for name, (low, high) in space.items()}
+            for _ in range(samples)]
+
+
+def latin_hypercube(space, samples, seed=None):
+    """samples points from {name: (low, high)}, one in each of samples equal strata per parameter"""
+    rng = RandomStream(seed)
+    points = [{} for _ in range(samples)]
+    for name, (low, high) in space.items():
+        strata = list(range(samples))
+        rng.shuffle(strata)
+        for point, stratum in zip(points, strata):
+            point[name] = _scale(low, high, (stratum + rng.random()) / samples)
+    return points
+
+
+# Cache
+
+class SweepCache:
+    """Result rows on disk, one JSON file per run key"""
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, row):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(row, f)
+        os.replace(temporary, path)  # Readers never see a half-written file
+
+
+# Running
+
+def run_point(days, script, task):
+    """Run one (params, seed) task and return its result row"""
+    params, seed = task
+    ecosystem, humans = run_once(days, script, seed, params)
+    extinct = ecosystem.humans == 0
+    row = dict(params)
+    row.update(
+        seed=seed,
+        days=days,
+        extinct=extinct,
+        extinction_day=len(humans) if extinct else None,
+        final_humans=ecosystem.humans,
+        final_animals=ecosystem.animals,
+        final_plants=ecosystem.plants,
+        mean_humans=sum(humans) / days,  # Days after an extinction count as zero
+        min_humans=min(humans),
+        max_humans=max(humans),
+        total_migrations=ecosystem.total_migrations,
+        sister_settlements=ecosystem.sister_settlements,
+        survival_knowledge=ecosystem.survival_knowledge,
+        farming_level=ecosystem.farming_level,
+    )
+    return row
+
+
+def _typed(params, defaults):
+    """params with values of integer parameters (such as carrying_capacity) rounded to ints"""
+    return {name: round(value) if isinstance(defaults.get(name), int) and isinstance(value, float) else value
+            for name, value in params.items()}
+
+
+def run_sweep(points, seeds=range(10), days=3600, script=(), processes=None, cache=None):
+    """Run every point for every seed and return one row per run
+
+    cache: a SweepCache or directory name; runs found there are not repeated.
+    """
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    if isinstance(cache, str):
+        cache = SweepCache(cache)
+    defaults = SimpleEcosystem(sink=NullSink()).parameters()
+    points = [_typed(params, defaults) for params in points]
+    for params in points:
+        SimpleEcosystem(sink=NullSink(), params=params)  # Fail fast on unknown parameter names
+    tasks = [(params, seed) for params in points for seed in seeds]
+    rows = [None] * len(tasks)
+    pending = []
+    for index, (params, seed) in enumerate(tasks):
+        row = cache.get(run_key(params, seed, days, script)) if cache else None
+        if row is None:
+            pending.append(index)
+        else:
+            rows[index] = row
+
+    run = partial(run_point, days, script)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(pending) <= 1:
+        results = map(run, [tasks[index] for index in pending])
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=processes)
+        chunksize = max(1, len(pending) // (processes * 4))
+        results = pool.map(run, [tasks[index] for index in pending], chunksize=chunksize)
+    try:
+        # Cache each row as it arrives, so an interrupted sweep keeps its finished runs
+        for index, row in zip(pending, results):
+            rows[index] = row
+            if cache:
+                params, seed = tasks[index]
+                cache.put(run_key(params, seed, days, script), row)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return rows
+
+
+def write_csv(rows, path):
+    """Write result rows as CSV, parameter columns first"""
+    parameters = [name for name in rows[0] if name not in OUTCOME_FIELDS] if rows else []
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=parameters + list(OUTCOME_FIELDS))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize(rows):
+    """Print extinction rate and mean outcomes for each parameter point"""
+    groups = {}
+    for row in rows:
+        params = tuple((name, value) for name, value in row.items() if name not in OUTCOME_FIELDS)
+        groups.setdefault(params, []).append(row)
+    print(f"\n===== SWEEP: {len(groups)} parameter sets, {len(rows)} runs =====")
+    for params, group in groups.items():
+        runs = len(group)
+        extinct = sum(row['extinct'] for row in group)
+        mean_humans = sum(row['mean_humans'] for row in group) / runs
+        migrations = sum(row['total_migrations'] for row in group) / runs
+        settings = ", ".join(f"{name}={value:.4g}" if isinstance(value, float) else f"{name}={value}"
+                             for name, value in params) or "defaults"
+        print(f"{settings}\n  extinction {extinct}/{runs}, mean humans {mean_humans:.1f}, "
+              f"mean migrations {migrations:.0f}")
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep SimpleEcosystem parameters")
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUES',
+                        help="grid values 'name=a,b,c' or a range 'name=low:high' for random/lhs designs")
+    parser.add_argument('--design', choices=('grid', 'random', 'lhs'), default='grid')
+    parser.add_argument('--samples', type=int, default=20, help="points for random and lhs designs")
+    parser.add_argument('--design-seed', type=int, help="seed for random and lhs designs")
+    parser.add_argument('--seeds', type=int, default=10, help="runs per point, with seeds 0..n-1")
+    parser.add_argument('--days', type=int, default=3600, help="days per run")
+    parser.add_argument('--script', help="god mode script file with 'day command [value]' lines")
+    parser.add_argument('--processes', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--cache', help="directory for cached run results")
+    parser.add_argument('--output', help="write the results table as CSV")
+    args = parser.parse_args()
+    if args.days < 1:
+        parser.error("--days must be at least 1")
+
+    space = {}
+    for spec in args.param:
+        name, _, values = spec.partition('=')
+        if args.design == 'grid':
+            space[name] = [_number(value) for value in values.split(',')]
+        else:
+            low, _, high = values.partition(':')
+            space[name] = (_number(low), _number(high))
+
+    if args.design == 'grid':
+        points = grid(space)
+    elif args.design == 'random':
+        points = random_design(space, args.samples, args.design_seed)
+    else:
+        points = latin_hypercube(space, args.samples, args.design_seed)
+
+    script = load_script(args.script) if args.script else ()
+    rows = run_sweep(points, range(args.seeds), args.days, script, args.processes, args.cache)
+    summarize(rows)
+    if args.output:
+        write_csv(rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
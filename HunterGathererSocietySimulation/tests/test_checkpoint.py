@@ -0,0 +1,35 @@
+import checkpoint
+from events import NullSink
+from history import History
+from historyfile import MappedHistory
+from huntergathersim import SimpleEcosystem
+
+
+def _run(ecosystem, days):
+    for _ in range(days):
+        ecosystem.update()
+    return ecosystem
+
+
+def test_round_trip_continues_the_run():
+    ecosystem = _run(SimpleEcosystem(sink=NullSink(), seed=1), 200)
+    restored = checkpoint.loads(checkpoint.dumps(ecosystem), NullSink())
+    _run(ecosystem, 100)
+    _run(restored, 100)
+    assert restored.humans == ecosystem.humans
+    assert list(restored.history['humans']) == list(ecosystem.history['humans'])
+
+
+def test_rollup_index_survives_a_round_trip():
+    ecosystem = _run(SimpleEcosystem(sink=NullSink(), seed=1, history=History(rollup=True)), 300)
+    restored = checkpoint.loads(checkpoint.dumps(ecosystem), NullSink())
+    assert restored.history.rollup is not None
+    assert restored.history.rollup.days('humans', 50, 250) == ecosystem.history.rollup.days('humans', 50, 250)
+
+
+def test_mapped_history_round_trip(tmp_path):
+    ecosystem = _run(SimpleEcosystem(sink=NullSink(), seed=1, history=MappedHistory(str(tmp_path))), 200)
+    restored = checkpoint.loads(checkpoint.dumps(ecosystem), NullSink())
+    assert restored.days == ecosystem.days
+    assert restored.history.rollup is None
+    assert list(restored.history['humans']) == list(ecosystem.history['humans'])
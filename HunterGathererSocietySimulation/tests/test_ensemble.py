@@ -0,0 +1,67 @@
+import numpy as np
+
+from ensemble import EcosystemEnsemble
+from events import NullSink
+from huntergathersim import SEASON_RAINFALL_BASE, SimpleEcosystem
+
+
+def _scalar(seed):
+    ecosystem = SimpleEcosystem(sink=NullSink(), seed=seed)
+    ecosystem.humans = 100
+    return ecosystem
+
+
+def _ensemble(size):
+    ensemble = EcosystemEnsemble(size, seed=1, template=SimpleEcosystem(sink=NullSink(), seed=0))
+    ensemble.humans[:] = 100
+    return ensemble
+
+
+def test_overlapping_events_keep_the_same_window_in_both_engines():
+    ecosystem, ensemble = _scalar(0), _ensemble(3)
+    windows = []
+    for day in range(12):
+        if day in (0, 3):
+            ecosystem.trigger_drought(6 if day == 0 else 2)
+            ensemble.trigger_event('drought', 6 if day == 0 else 2)
+        if day == 3:
+            assert [stack for event, stack in ecosystem.events.stacks()] == [2]
+            assert (ensemble._stack_depth('drought') == 2).all()
+        windows.append((ecosystem.active_events['drought'], ensemble.active_events['drought'].tolist()))
+        ecosystem.process_active_events()
+        ecosystem.days += 1
+        ensemble.process_active_events()
+    assert [scalar for scalar, _ in windows] == [6, 5, 4, 3, 2, 1, 0, 0, 0, 0, 0, 0]
+    assert all(members == [scalar] * 3 for scalar, members in windows)
+
+
+def test_stacked_plagues_strike_once_per_instance_in_both_engines():
+    scalar = []
+    for seed in range(400):
+        ecosystem = _scalar(seed)
+        ecosystem.trigger_plague(5)
+        ecosystem.trigger_plague(5)
+        ecosystem.process_active_events()
+        scalar.append(100 - ecosystem.humans)
+    ensemble = _ensemble(4000)
+    ensemble.trigger_event('plague', 5)
+    ensemble.trigger_event('plague', 5)
+    ensemble.process_active_events()
+    lost = 100 - ensemble.humans
+    # A single plague kills at most 8 of 100
+    assert min(scalar) > 2 and lost.min() > 2
+    assert abs(np.mean(scalar) - lost.mean()) < 0.5
+
+
+def test_extend_widens_event_instances():
+    ensemble, other = _ensemble(2), _ensemble(1)
+    other.trigger_event('plague', 4)
+    other.trigger_event('plague', 2)
+    ensemble.extend(other)
+    assert ensemble.event_instances['plague'].tolist() == [[0, 0], [0, 0], [4, 2]]
+    assert ensemble.active_events['plague'].tolist() == [0, 0, 4]
+
+
+def test_season_tables_follow_the_scalar_engine():
+    ensemble = _ensemble(1)
+    assert ensemble.season_rainfall_base.tolist() == list(SEASON_RAINFALL_BASE.values())
@@ -0,0 +1,58 @@
+import pytest
+
+from montecarlo import parse_script, run_monte_carlo, run_once
+
+
+def test_script_values_take_the_type_of_the_default():
+    script = parse_script(["# early boost", "100 knowledge 0.5", "120 food 12", "90 plague"])
+    assert script == [(90, 'plague', None), (100, 'knowledge', 0.5), (120, 'food', 12)]
+    assert isinstance(script[2][2], int)
+
+
+def test_script_with_a_fractional_value_runs():
+    ecosystem, _ = run_once(150, parse_script(["100 knowledge 0.5"]), seed=1)
+    baseline, _ = run_once(150, (), seed=1)
+    assert ecosystem.survival_knowledge > baseline.survival_knowledge
+
+
+def test_invalid_script_value_names_the_line():
+    with pytest.raises(ValueError, match="line 2"):
+        parse_script(["10 plague 3", "20 food lots"])
+
+
+@pytest.mark.parametrize('runs, days', [(0, 30), (5, 0)])
+def test_empty_batches_are_rejected(runs, days):
+    with pytest.raises(ValueError):
+        run_monte_carlo(runs, days, processes=1)
+
+
+def test_batch_report(capsys):
+    result = run_monte_carlo(4, 60, seed=1, processes=1)
+    result.report()
+    assert "4 runs of 60 days" in capsys.readouterr().out
+
+
+def test_schedule_lines_parse_as_in_the_repl():
+    script = parse_script(["10 schedule drought 50", "20 schedule plague 80 3 120"])
+    assert script == [(10, 'schedule', ('drought', 50, 10, None)), (20, 'schedule', ('plague', 80, 3, 120))]
+
+
+def test_scheduled_event_starts_on_its_day():
+    from events import NullSink
+    from huntergathersim import SimpleEcosystem, apply_god_command
+    ecosystem = SimpleEcosystem(sink=NullSink(), seed=1)
+    ((day, command, value),) = parse_script(["5 schedule drought 40 6"])
+    active = []
+    for _ in range(60):
+        if ecosystem.days == day:
+            apply_god_command(ecosystem, command, value)
+        ecosystem.update()
+        active.append(ecosystem.active_events['drought'] > 0)
+    assert not any(active[:39]) and any(active[39:46])
+    assert run_once(60, [(day, command, value)], seed=1)[0].days == 60
+
+
+@pytest.mark.parametrize('line', ["5 schedule", "5 schedule flood 40", "5 schedule drought soon", "5 schedule drought 40 0"])
+def test_bad_schedule_lines_are_rejected(line):
+    with pytest.raises(ValueError, match="line 1"):
+        parse_script([line])
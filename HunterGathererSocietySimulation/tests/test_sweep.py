@@ -0,0 +1,15 @@
+import pytest
+
+from sweep import latin_hypercube, run_sweep
+
+
+def test_integer_parameters_are_rounded():
+    points = latin_hypercube({'carrying_capacity': (100.0, 400.0), 'plant_growth_rate': (0.15, 0.25)}, 3, seed=1)
+    rows = run_sweep(points, seeds=[0], days=30, processes=1)
+    assert all(isinstance(row['carrying_capacity'], int) for row in rows)
+    assert all(isinstance(row['plant_growth_rate'], float) for row in rows)
+
+
+def test_runs_of_no_days_are_rejected():
+    with pytest.raises(ValueError):
+        run_sweep([{}], seeds=[0], days=0, processes=1)
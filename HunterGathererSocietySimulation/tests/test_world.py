@@ -0,0 +1,46 @@
+import numpy as np
+
+from events import NullSink
+from huntergathersim import SimpleEcosystem
+from world import FOUNDING_SIZE, World
+
+
+def _world(**params):
+    template = SimpleEcosystem(sink=NullSink(), seed=1, params=params)
+    return World(16, 16, radius=1, tile_size=1, seed=2, template=template)
+
+
+def _leave(world, migrants, overflow):
+    tile = world.tiles[0]
+    tile.migrants = np.array([migrants])
+    tile.overflow = np.array([overflow])
+    world._found_settlements()
+
+
+def test_groups_found_settlements_separately():
+    world = _world()
+    _leave(world, FOUNDING_SIZE - 1, FOUNDING_SIZE - 1)
+    assert len(world) == 1
+    _leave(world, FOUNDING_SIZE, 0)
+    assert len(world) == 2
+    assert world.gather('humans', np.array([1]))[0] == FOUNDING_SIZE
+    _leave(world, 0, FOUNDING_SIZE + 1)
+    assert len(world) == 3
+
+
+def test_founded_settlements_keep_parameters_and_knowledge():
+    world = _world(carrying_capacity=300, max_food_storage=80)
+    world.tiles[0].survival_knowledge[:] = 2.5
+    _leave(world, FOUNDING_SIZE, 0)
+    child = world.tiles[world.tile[1]]
+    assert child.carrying_capacity == 300
+    assert world.gather('max_food_storage', np.array([1]))[0] == 80
+    assert world.gather('survival_knowledge', np.array([1]))[0] == 2.5
+    assert world.gather('plants', np.array([1]))[0] == world._fresh.plants
+
+
+def test_run_founds_settlements():
+    world = World(32, 32, seed=3)
+    world.run(360, threads=1)
+    assert len(world) > 1
+    assert (world.parent[1:] >= 0).all()
@@ -0,0 +1,390 @@
+"""Regions of settlements founded by migration, stepped as NumPy arrays.
+
+A World places settlements on a width x height grid of region cells, at most
+one per cell. Every settlement is a whole ecosystem with its own plants,
+animals, humans and knowledge, kept as a member of an EcosystemEnsemble: the
+grid is cut into square tiles, each tile's settlements form one ensemble, and
+a day is one vectorized step per tile, with tiles stepped concurrently in
+threads (NumPy releases the GIL inside array operations).
+
+When a group of at least five people leaves a settlement, through migration
+or newborns overflowing a full settlement (the groups that count as a new
+sister settlement in SimpleEcosystem), it founds a settlement on a free cell
+within `radius` of it. The two groups are counted separately, as there. The
+new settlement starts with fresh land and the founders under the world's
+parameters, and keeps the parent's knowledge, skills, storage and calendar.
+
+Sister settlement interactions happen between actual neighbors. A settlement's
+living neighbors within `radius` take the place of the sister_settlements
+counter in the interaction chance, and one of them is picked as the partner.
+Returning people and emergency food aid leave the partner settlement.
+
+    world = World(512, 512, seed=1)
+    world.run(3600)
+    world.report()
+
+or from the command line:
+
+    python world.py --size 512 --days 3600 --seed 1
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ensemble import FLOAT_FIELDS, INTERACTION_WEIGHTS, EcosystemEnsemble
+from events import NullSink
+from huntergathersim import SimpleEcosystem
+from rng import RandomStream
+
+# People leaving together in one group that found a settlement, as for sister_settlements
+FOUNDING_SIZE = 5
+
+# State a new settlement takes from its parent; everything else starts as in a
+# new SimpleEcosystem with the world's parameters
+INHERITED_FIELDS = (
+    'max_food_storage', 'farming_level', 'farming_efficiency', 'survival_knowledge', 'tools_quality',
+    'animal_conservation_level', 'plant_conservation_level',
+    'current_season', 'current_day_in_season', 'days',
+)
+
+
+def _pick(mask, draws):
+    """Column of a random True in each row of mask, from uniform draws; every row needs a True"""
+    k = (draws * mask.sum(axis=1)).astype(np.int64)
+    return np.argmax(np.cumsum(mask, axis=1) > k[:, None], axis=1)
+
+
+class _Tile(EcosystemEnsemble):
+    """The settlements in one tile, as an ensemble whose members interact across tiles"""
+    def __init__(self, seed, template):
+        super().__init__(0, seed=seed, template=template)
+        self.ids = np.zeros(0, dtype=np.int64)  # World id of each member
+        # People who left each member on the last day, by migration and by overflowing newborns
+        self.migrants = np.zeros(0, dtype=np.int64)
+        self.overflow = np.zeros(0, dtype=np.int64)
+
+    def step(self):
+        before = self.total_migrations.copy()
+        self.migrants = np.zeros(self.size, dtype=np.int64)
+        super().step()
+        self.overflow = self.total_migrations - before - self.migrants
+
+    def trigger_migration(self):
+        self.migrants = super().trigger_migration()
+        return self.migrants
+
+    def sister_settlement_interaction(self, key):
+        pass  # Needs every tile's day done; see interact()
+
+    def interact(self, world):
+        """Sister settlement interactions of the living members, each with a living neighbor"""
+        local = np.flatnonzero(self.humans > 0)
+        if not local.size:
+            return
+        neighbors = world._neighbors(self.ids[local])
+        living = world.alive[neighbors]
+        counts = living.sum(axis=1)
+        self.sister_settlements[local] = counts
+
+        modifiers = self.season_contact_modifiers[self._season_key()]
+        if np.ndim(modifiers):
+            modifiers = modifiers[local]
+        chance = np.minimum(0.15, 0.02 * counts) * modifiers
+        chosen = self._uniform(size=local.size) < chance
+        if not chosen.any():
+            return
+        local, neighbors = local[chosen], neighbors[chosen]
+        partners = neighbors[np.arange(local.size), _pick(living[chosen], self._uniform(size=local.size))]
+        # trade, knowledge, population_return, food_gift, hunting_party
+        kind = np.searchsorted(INTERACTION_WEIGHTS, self._uniform(size=local.size), side='right')
+        self._apply_interactions(world, local, partners, kind)
+
+    def _apply_interactions(self, world, local, partners, kind):
+        # Trade
+        members = local[kind == 0]
+        self.food_storage[members] = np.minimum(
+            self.max_food_storage[members], self.food_storage[members] + self._randint(2, 6, members.size))
+
+        # Knowledge exchange
+        members = local[kind == 1]
+        self.survival_knowledge[members] += self._uniform(0.1, 0.3, members.size)
+        members = members[self._uniform(size=members.size) < 0.4]
+        farming = self._uniform(size=members.size) < 0.5
+        farmers = members[farming]
+        self.farming_level[farmers] += 1
+        self.farming_efficiency[farmers] = 1.0 + (self.farming_level[farmers] * 0.15)
+        self.tools_quality[members[~farming]] += 0.1
+
+        # Population return, from the partner
+        rows = kind == 2
+        members, sources = local[rows], partners[rows]
+        returnees = np.minimum(self._randint(1, 3, members.size), self.carrying_capacity - self.humans[members])
+        returnees = world._grant('humans', sources, np.maximum(0, returnees), keep=1)
+        self.humans[members] += returnees
+
+        # Emergency food aid, from the partner's stores
+        rows = ((kind == 3) & (self.food_storage[local] < 10)
+                & ((self.plants[local] < 50) | (self.animals[local] < 20)))
+        members, sources = local[rows], partners[rows]
+        aid = np.minimum(self._randint(5, 12, members.size), self.max_food_storage[members] - self.food_storage[members])
+        aid = world._grant('food_storage', sources, np.maximum(0, aid))
+        self.food_storage[members] += aid
+
+        # Joint hunting party
+        members = local[kind == 4]
+        members = members[self.animals[members] > 30]
+        self.food_storage[members] = np.minimum(
+            self.max_food_storage[members], self.food_storage[members] + self._randint(2, 5, members.size))
+
+        # Rounding in shares of food can leave a partner's stores a hair below zero
+        world._clip_partners('food_storage', sources)
+
+
+class World:
+    """Settlements on a region grid, with founding by migration and neighbor interactions
+
+    width, height: region size in cells
+    radius: how far (in cells, along both axes) neighbors and new settlements can be
+    tile_size: cells along each side of a tile
+    seed: an int, a RandomStream or None for fresh entropy
+    template: the first settlement, placed in the middle (a new SimpleEcosystem by default)
+    """
+    def __init__(self, width=256, height=256, radius=2, tile_size=128, seed=None, template=None):
+        if radius < 1:
+            raise ValueError("radius must be at least 1")
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.tile_size = tile_size
+        self.stream = seed if isinstance(seed, RandomStream) else RandomStream(seed)
+        self.rng = np.random.default_rng(self.stream.getrandbits(128))
+        if template is None:
+            template = SimpleEcosystem(sink=NullSink(), seed=self.stream.spawn(1)[0])
+        self.template = template
+        # Initial state of founded settlements
+        self._fresh = SimpleEcosystem(sink=NullSink(), seed=0, params=template.parameters())
+
+        self.tiles = []        # _Tile objects, in the order they were first settled
+        self._tile_numbers = {}  # (tile column, tile row) -> position in tiles
+        # Per settlement, by world id (the order settlements were founded in)
+        self.x = np.zeros(0, dtype=np.int64)
+        self.y = np.zeros(0, dtype=np.int64)
+        self.tile = np.zeros(0, dtype=np.int64)   # Position of the settlement's tile in tiles
+        self.local = np.zeros(0, dtype=np.int64)  # Member index within the tile
+        self.parent = np.zeros(0, dtype=np.int64)  # World id of the founding settlement, -1 for the first
+        self.alive = np.zeros(1, dtype=bool)  # One extra False entry, so alive[-1] covers empty cells
+        # World id in each cell, -1 if empty, with a border of radius empty cells
+        self.cells = np.full((height + 2 * radius, width + 2 * radius), -1, dtype=np.int64)
+        dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        around = (dy != 0) | (dx != 0)
+        self._dy, self._dx = dy[around], dx[around]
+        self.days = 0
+
+        self._add(np.array([width // 2]), np.array([height // 2]), np.array([-1]),
+                  EcosystemEnsemble.from_ecosystems([template]))
+
+    def __len__(self):
+        """Number of settlements ever founded"""
+        return len(self.x)
+
+    # Settlement state
+
+    def _add(self, xs, ys, parents, members):
+        """Place the members of an ensemble in the given cells"""
+        first = len(self.x)
+        ids = np.arange(first, first + len(xs))
+        tiles = np.empty(len(xs), dtype=np.int64)
+        local = np.empty(len(xs), dtype=np.int64)
+        keys = list(zip((xs // self.tile_size).tolist(), (ys // self.tile_size).tolist()))
+        for key in dict.fromkeys(keys):
+            if key not in self._tile_numbers:
+                self._tile_numbers[key] = len(self.tiles)
+                self.tiles.append(_Tile(self.stream.spawn(1)[0], self.template))
+            number = self._tile_numbers[key]
+            tile = self.tiles[number]
+            rows = np.array([index for index, other in enumerate(keys) if other == key])
+            tiles[rows] = number
+            local[rows] = tile.size + np.arange(len(rows))
+            tile.extend(members, rows)
+            tile.ids = np.concatenate([tile.ids, ids[rows]])
+        self.x = np.concatenate([self.x, xs])
+        self.y = np.concatenate([self.y, ys])
+        self.tile = np.concatenate([self.tile, tiles])
+        self.local = np.concatenate([self.local, local])
+        self.parent = np.concatenate([self.parent, parents])
+        self.alive = np.concatenate([self.alive[:-1], members.humans > 0, [False]])
+        self.cells[ys + self.radius, xs + self.radius] = ids
+
+    def gather(self, field, ids=None):
+        """Values of a settlement field (such as 'humans') by world id"""
+        if ids is None:
+            ids = np.arange(len(self.x))
+        dtype = np.float64 if field in FLOAT_FIELDS else np.int64
+        values = np.empty(len(ids), dtype=bool if field == 'conservation_active' else dtype)
+        tiles = self.tile[ids]
+        for number in np.unique(tiles):
+            rows = tiles == number
+            values[rows] = getattr(self.tiles[number], field)[self.local[ids[rows]]]
+        return values
+
+    def _add_to(self, field, ids, amounts):
+        """Add amounts to a field of the given settlements, which may repeat"""
+        tiles = self.tile[ids]
+        for number in np.unique(tiles):
+            rows = tiles == number
+            np.add.at(getattr(self.tiles[number], field), self.local[ids[rows]], amounts[rows])
+
+    def _grant(self, field, ids, wanted, keep=0):
+        """Draw wanted amounts from a field of the given settlements, which may repeat; returns the amounts drawn
+
+        Several settlements can draw on the same one on a day, so the draws on
+        each are scaled down together to leave it at least keep.
+        """
+        if not ids.size:
+            return wanted
+        sources, which = np.unique(ids, return_inverse=True)
+        available = np.maximum(0, self.gather(field, sources) - keep)
+        total = np.bincount(which, weights=wanted, minlength=sources.size)
+        share = np.minimum(1.0, available / np.maximum(total, 1e-9))
+        granted = wanted * share[which]
+        if field not in FLOAT_FIELDS:
+            granted = granted.astype(np.int64)  # Rounded down, so the draws still fit
+        self._add_to(field, ids, -granted)
+        return granted
+
+    def _neighbors(self, ids):
+        """World ids in the cells around each settlement, -1 where empty: shape (len(ids), cells)"""
+        radius = self.radius
+        return self.cells[self.y[ids, None] + radius + self._dy, self.x[ids, None] + radius + self._dx]
+
+    # Simulation
+
+    def step(self):
+        """Advance every settlement by one day"""
+        self._step(None)
+
+    def run(self, days, threads=None, progress=None, progress_every=360):
+        """Step days times with tiles spread over threads (all cores by default)
+
+        progress is called with the world every progress_every days.
+        """
+        threads = threads or os.cpu_count() or 1
+        pool = ThreadPoolExecutor(max_workers=threads) if threads > 1 else None
+        try:
+            for _ in range(days):
+                self._step(pool)
+                if progress is not None and self.days % progress_every == 0:
+                    progress(self)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _step(self, pool):
+        tiles = self.tiles
+        if pool is None or len(tiles) == 1:
+            for tile in tiles:
+                tile.step()
+        else:
+            # Each tile draws from its own stream, so results do not depend on the threads
+            list(pool.map(_Tile.step, tiles))
+        for tile in tiles:
+            self.alive[tile.ids] = tile.humans > 0
+        self._interact()
+        self._found_settlements()
+        self.days += 1
+
+    def _interact(self):
+        """Sister settlement interactions, each with a living neighbor"""
+        for tile in self.tiles:
+            tile.interact(self)
+
+    def _clip_partners(self, field, ids):
+        tiles = self.tile[ids]
+        for number in np.unique(tiles):
+            values = getattr(self.tiles[number], field)
+            rows = self.local[ids[tiles == number]]
+            values[rows] = np.maximum(0, values[rows])
+
+    def _found_settlements(self):
+        """Found a settlement for every group that left a settlement on the last day and is large enough"""
+        parents, founders = [], []
+        for tile in self.tiles:
+            for leaving in (tile.migrants, tile.overflow):
+                group = leaving >= FOUNDING_SIZE
+                parents.append(tile.ids[group])
+                founders.append(leaving[group])
+        parents, founders = np.concatenate(parents), np.concatenate(founders)
+        if not parents.size:
+            return
+        # Each group settles a random empty cell around its settlement; if there
+        # is none, the migrants are lost to the region
+        xs = self.x[parents, None] + self._dx
+        ys = self.y[parents, None] + self._dy
+        free = ((self._neighbors(parents) == -1) & (xs >= 0) & (xs < self.width)
+                & (ys >= 0) & (ys < self.height))
+        room = free.any(axis=1)
+        parents, founders, xs, ys, free = parents[room], founders[room], xs[room], ys[room], free[room]
+        if not parents.size:
+            return
+        rows = np.arange(parents.size)
+        columns = _pick(free, self.rng.random(parents.size))
+        xs, ys = xs[rows, columns], ys[rows, columns]
+        # Of groups picking the same cell, the first settles it
+        _, first = np.unique(ys * self.width + xs, return_index=True)
+        first.sort()
+        parents, founders, xs, ys = parents[first], founders[first], xs[first], ys[first]
+
+        settlements = EcosystemEnsemble(parents.size, seed=0, template=self._fresh)
+        for field in INHERITED_FIELDS:
+            getattr(settlements, field)[:] = self.gather(field, parents)
+        settlements.humans[:] = founders
+        self._add(xs, ys, parents, settlements)
+
+    # Reporting
+
+    def totals(self):
+        """Total humans, animals and plants over all settlements"""
+        return tuple(sum(int(getattr(tile, field).sum()) for tile in self.tiles)
+                     for field in ('humans', 'animals', 'plants'))
+
+    def report(self):
+        humans, animals, plants = self.totals()
+        living = int(self.alive[:-1].sum())
+        print(f"\n===== WORLD: DAY {self.days} =====")
+        print(f"Region: {self.width}x{self.height} cells in {len(self.tiles)} settled tiles")
+        print(f"Settlements: {living} living of {len(self)} founded")
+        print(f"Humans: {humans} ({humans / max(1, living):.1f} per living settlement)")
+        print(f"Animals: {animals}, plants: {plants}")
+        if living:
+            ids = np.flatnonzero(self.alive[:-1])
+            xs, ys = self.x[ids], self.y[ids]
+            print(f"Settled area: x {xs.min()}-{xs.max()}, y {ys.min()}-{ys.max()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a region of settlements founded by migration")
+    parser.add_argument('--days', type=int, default=3600, help="days to simulate")
+    parser.add_argument('--size', type=int, default=256, help="region width and height in cells")
+    parser.add_argument('--radius', type=int, default=2, help="neighbor and founding radius in cells")
+    parser.add_argument('--tile-size', type=int, default=128, help="tile width and height in cells")
+    parser.add_argument('--threads', type=int, help="threads stepping tiles (default: all cores)")
+    parser.add_argument('--seed', type=int, help="random seed for a reproducible run")
+    args = parser.parse_args()
+
+    world = World(args.size, args.size, args.radius, args.tile_size, seed=args.seed)
+
+    def progress(world):
+        humans, _, _ = world.totals()
+        print(f"  ...year {world.days // 360}: {int(world.alive[:-1].sum())} settlements, {humans} humans")
+
+    start = time.perf_counter()
+    world.run(args.days, args.threads, progress)
+    print(f"Simulated {args.days} days in {time.perf_counter() - start:.1f} seconds")
+    world.report()
+
+
+if __name__ == "__main__":
+    main()